@@ -0,0 +1,539 @@
+from builtins import range
+from past.builtins import long
+
+from CryptoAttacks.Math import invmod, iter_primes
+from CryptoAttacks.Utils import log
+from fractions import Fraction
+import math
+import time
+
+import gmpy2
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class _PrecisionError(Exception):
+    pass
+
+
+def _dot(u, v):
+    return sum(a * b for a, b in zip(u, v))
+
+
+def _integral_gso(basis):
+    """Exact Gram-Schmidt data in integers (Cohen, 2.6.7)
+
+    Returns:
+        list: d, d[i+1] is Gram determinant of first i+1 vectors, d[0] == 1
+        list: lam, lam[k][j] == mu_kj * d[j+1]
+    """
+    n = len(basis)
+    d = [gmpy2.mpz(1)] + [gmpy2.mpz(0)] * n
+    lam = [[gmpy2.mpz(0)] * n for _ in range(n)]
+    for k in range(n):
+        for j in range(k + 1):
+            u = _dot(basis[k], basis[j])
+            for i in range(j):
+                u = (d[i + 1] * u - lam[k][i] * lam[j][i]) // d[i]
+            if j < k:
+                lam[k][j] = u
+            else:
+                d[k + 1] = u
+        if d[k + 1] == 0:
+            raise ValueError("Vectors are linearly dependent")
+    return d, lam
+
+
+def _lll_exact(basis, delta):
+    """Integral LLL (Cohen, A Course in Computational Algebraic Number Theory, 2.6.7), exact arithmetic"""
+    delta = Fraction(delta).limit_denominator(2**16)
+    num, den = delta.numerator, delta.denominator
+    B = [[gmpy2.mpz(x) for x in row] for row in basis]
+    n = len(B)
+    if n < 2:
+        return B
+    d = [gmpy2.mpz(1)] + [gmpy2.mpz(0)] * n
+    lam = [[gmpy2.mpz(0)] * n for _ in range(n)]
+
+    def reduce(k, l):
+        if 2 * abs(lam[k][l]) > d[l + 1]:
+            q = (2 * lam[k][l] + d[l + 1]) // (2 * d[l + 1])
+            B[k] = [a - q * b for a, b in zip(B[k], B[l])]
+            lam[k][l] -= q * d[l + 1]
+            for i in range(l):
+                lam[k][i] -= q * lam[l][i]
+
+    def swap(k):
+        B[k], B[k - 1] = B[k - 1], B[k]
+        for j in range(k - 1):
+            lam[k][j], lam[k - 1][j] = lam[k - 1][j], lam[k][j]
+        l = lam[k][k - 1]
+        new_d = (d[k - 1] * d[k + 1] + l * l) // d[k]
+        for i in range(k + 1, k_max + 1):
+            t = lam[i][k]
+            lam[i][k] = (d[k + 1] * lam[i][k - 1] - l * t) // d[k]
+            lam[i][k - 1] = (new_d * t + l * lam[i][k]) // d[k + 1]
+        d[k] = new_d
+
+    d[1] = _dot(B[0], B[0])
+    k, k_max = 1, 0
+    while k < n:
+        if k > k_max:
+            k_max = k
+            for j in range(k + 1):
+                u = _dot(B[k], B[j])
+                for i in range(j):
+                    u = (d[i + 1] * u - lam[k][i] * lam[j][i]) // d[i]
+                if j < k:
+                    lam[k][j] = u
+                else:
+                    d[k + 1] = u
+            if d[k + 1] == 0:
+                raise ValueError("Vectors are linearly dependent")
+
+        reduce(k, k - 1)
+        if den * d[k + 1] * d[k - 1] < num * d[k] * d[k] - den * lam[k][k - 1] * lam[k][k - 1]:
+            swap(k)
+            k = max(1, k - 1)
+        else:
+            for l in range(k - 2, -1, -1):
+                reduce(k, l)
+            k += 1
+    return B
+
+
+def _exponent(row):
+    """Shift making entries of row fit in doubles (squares and dot products included)"""
+    return max(0, max(gmpy2.bit_length(gmpy2.mpz(x)) for x in row) - 480)
+
+
+def _to_float(row, shift):
+    if shift:
+        row = row >> shift
+    return row.astype(float)
+
+
+def _dot_float(u, v, shift):
+    """Exact inner product times 2**-shift as double, (u.v) >> shift would lose fractional bits"""
+    dot = u.dot(v)
+    low = min(shift, max(0, gmpy2.bit_length(dot) - 64))
+    return math.ldexp(float(dot >> low), low - shift)
+
+
+def _lll_float(B, delta, eta=0.51):
+    """LLL with Gram-Schmidt in doubles (Schnorr-Euchner, lazy size reduction like in L2)
+    Basis is kept exact (numpy object arrays), i-th row is approximated by doubles scaled by 2**-e[i]
+    Gram-Schmidt values are kept in these units: r[k, j] is <b_k, b*_j> * 2**-(e[k] + e[j])
+    and mu[k, j] is r[k, j] / r[j, j] (so true mu_kj is mu[k, j] * 2**(e[k] - e[j]))
+
+    Raises:
+        _PrecisionError: if doubles are not precise enough, B is still a basis of the same lattice
+    """
+    n = len(B)
+    e = [_exponent(row) for row in B]
+    F = numpy.array([_to_float(row, shift) for row, shift in zip(B, e)])
+    lengths = numpy.einsum('ij,ij->i', F, F)
+    r = numpy.zeros((n, n))
+    mu = numpy.eye(n)
+    r[0, 0] = lengths[0]
+    if r[0, 0] == 0:
+        raise _PrecisionError()
+    k = 1
+    # after swap Gram-Schmidt of b_(k-1) is known and it is size reduced
+    known_norm = None
+    # size reduction gains about 50 bits per pass
+    max_passes = 64 + max(e) // 32
+    iterations, max_iterations = 0, 64 * n * n * (max(e) + 64)
+    while k < n:
+        iterations += 1
+        if iterations > max_iterations:
+            raise _PrecisionError()
+
+        if known_norm is None:
+            # when size reduction stops making progress, errors of float inner products (relative to
+            # |b_k| * |b_j|, which may be much bigger than |b*_j|) dominate, so they are computed exactly
+            exact = False
+            for _ in range(max_passes):
+                if exact:
+                    dots = numpy.array([_dot_float(B[k], B[j], e[k] + e[j]) for j in range(k)])
+                else:
+                    dots = F[:k].dot(F[k])
+                    # cancellation: recompute inner product exactly
+                    for j in numpy.nonzero(dots * dots < 2.0**-52 * lengths[k] * lengths[:k])[0]:
+                        dots[j] = _dot_float(B[k], B[j], e[k] + e[j])
+                # r_kj = <b_k, b_j> - sum(mu_ji * r_ki, i < j), unit lower triangular system
+                r[k, :k] = numpy.linalg.solve(mu[:k, :k], dots)
+                mu[k, :k] = r[k, :k] / r.diagonal()[:k]
+                row = mu[k]
+                reduce = numpy.nonzero(numpy.abs(numpy.ldexp(row[:k], e[k] - numpy.array(e[:k]))) > eta)[0]
+                if len(reduce) == 0:
+                    break
+                j = reduce[-1]
+                while j >= 0:
+                    # true mu may not fit in double, then only its top bits are used
+                    shift = e[k] - e[j]
+                    low = max(0, math.frexp(row[j])[1] + shift - 960)
+                    x = round(numpy.ldexp(row[j], shift - low))
+                    if x:
+                        if not numpy.isfinite(x):
+                            raise _PrecisionError()
+                        B[k] = B[k] - (int(x) << low) * B[j]
+                        row[:j] -= numpy.ldexp(x, low - shift) * mu[j, :j]
+                    j -= 1
+                previous, previous_e = lengths[k], e[k]
+                e[k] = _exponent(B[k])
+                F[k] = _to_float(B[k], e[k])
+                lengths[k] = F[k].dot(F[k])
+                if numpy.ldexp(lengths[k], 2 * (e[k] - previous_e)) > 0.25 * previous:
+                    exact = True
+            else:
+                raise _PrecisionError()
+            # cancellation may make norm of b*_k inaccurate (even negative), but then swap is right anyway
+            norm = lengths[k] - mu[k, :k].dot(r[k, :k])
+        else:
+            norm, known_norm = known_norm, None
+
+        # in units of 2**(2 * e[k])
+        projected = norm + mu[k, k - 1] * r[k, k - 1]
+        if delta * numpy.ldexp(r[k - 1, k - 1], 2 * (e[k - 1] - e[k])) > projected:
+            B[k - 1], B[k] = B[k], B[k - 1]
+            e[k - 1], e[k] = e[k], e[k - 1]
+            F[[k - 1, k]] = F[[k, k - 1]]
+            lengths[k - 1], lengths[k] = lengths[k], lengths[k - 1]
+            if k == 1:
+                r[0, 0] = lengths[0]
+            else:
+                mu[k - 1, :k - 1] = mu[k, :k - 1]
+                r[k - 1, :k - 1] = r[k, :k - 1]
+                known_norm = projected
+                k -= 1
+        else:
+            if not lengths[k] * 2.0**-40 < norm < numpy.inf:
+                raise _PrecisionError()
+            r[k, k] = norm
+            k += 1
+    return B
+
+
+def lll(basis, delta=0.99, method=None):
+    """LLL reduction
+    'float': Gram-Schmidt coefficients in doubles (Schnorr-Euchner, lazy size reduction), exact integer basis
+    'exact': integral LLL with exact Gram-Schmidt (Cohen 2.6.7), slow, for small dimensions or huge entries
+    By default float is used and if it turns out to be not precise enough, reduction continues with exact one
+
+    Args:
+        basis(list): rows (lists of ints), linearly independent
+        delta(float): Lovasz constant, 1/4 < delta < 1
+        method(string/None): 'float', 'exact' or None (float with exact fallback)
+
+    Returns:
+        list: reduced basis (lists of ints)
+    """
+    if method not in [None, 'float', 'exact']:
+        log.critical_error("Unknown method {}".format(method))
+    if len(basis) == 0:
+        return []
+
+    B = [[gmpy2.mpz(x) for x in row] for row in basis]
+    if method != 'exact' and len(B) > 1:
+        if numpy is None:
+            if method == 'float':
+                log.critical_error("Float LLL requires numpy")
+        else:
+            rows = [numpy.array(row, dtype=object) for row in B]
+            try:
+                # rows scaled by far apart exponents overflow to inf in comparisons (size reduction check,
+                # cancellation check, Lovasz condition), inf is on the right side of all of them: true mu is huge,
+                # inner product is not cancelled, b*_(k-1) is much longer than b_k; inf norm raises _PrecisionError
+                with numpy.errstate(over='ignore'):
+                    B = [list(row) for row in _lll_float(rows, delta)]
+                method = 'float'
+            except _PrecisionError:
+                if method == 'float':
+                    log.critical_error("Not enough precision for float LLL")
+                log.debug("Not enough precision for float LLL, using exact")
+                B = [list(row) for row in rows]
+    if method != 'float':
+        B = _lll_exact(B, delta)
+    return [[long(x) for x in row] for row in B]
+
+
+def is_lll_reduced(basis, delta=0.99, eta=0.5):
+    """Check (exactly) if basis is size reduced (|mu_kj| <= eta) and satisfies Lovasz condition with delta
+
+    Returns:
+        bool
+    """
+    d, lam = _integral_gso(basis)
+    delta, eta = Fraction(delta), Fraction(eta)
+    for k in range(len(basis)):
+        for j in range(k):
+            if abs(Fraction(long(lam[k][j]), long(d[j + 1]))) > eta:
+                return False
+        if k:
+            # ||b*_k||**2 >= (delta - mu**2) * ||b*_(k-1)||**2
+            mu = Fraction(long(lam[k][k - 1]), long(d[k]))
+            if Fraction(long(d[k + 1]), long(d[k])) < (delta - mu * mu) * Fraction(long(d[k]), long(d[k - 1])):
+                return False
+    return True
+
+
+def _gso_float(B):
+    """Gram-Schmidt in doubles: squared norms of b*_i and mu (lists)"""
+    shift = max(_exponent(row) for row in B)
+    F = numpy.array([_to_float(numpy.array(row, dtype=object), shift) for row in B])
+    R = numpy.linalg.qr(F.T, mode='r')
+    diagonal = R.diagonal()
+    mu = (R / diagonal[:, None]).T
+    return list(diagonal * diagonal), mu.tolist()
+
+
+def _enumerate(r, mu, start, end, radius):
+    """Schnorr-Euchner enumeration of the shortest vector in projected block
+
+    Args:
+        r(list): squared norms of b*_i
+        mu(list): Gram-Schmidt coefficients
+        start(int), end(int): block
+        radius(float): search only for squared norms below it
+
+    Returns:
+        NoneType/list: coefficients of vector (for b_start, ..., b_(end-1))
+    """
+    n = end - start
+    r = r[start:end]
+    mu = [row[start:end] for row in mu[start:end]]
+    x, base, sign, step, center = [0] * n, [0] * n, [1] * n, [0] * n, [0.0] * n
+    partial = [0.0] * (n + 1)
+    best = None
+    i = n - 1
+    while True:
+        length = partial[i + 1] + (x[i] - center[i]) ** 2 * r[i]
+        if length < radius:
+            if i > 0:
+                partial[i] = length
+                i -= 1
+                center[i] = -sum(x[j] * mu[j][i] for j in range(i + 1, n))
+                base[i] = x[i] = int(round(center[i]))
+                sign[i] = 1 if center[i] >= base[i] else -1
+                step[i] = 0
+                continue
+            if length > 0:
+                radius, best = length, x[:]
+        else:
+            i += 1
+            if i == n:
+                return best
+        # next value: zigzag around center, only positive if all higher coefficients are zero (v ~ -v)
+        step[i] += 1
+        if partial[i + 1] == 0:
+            x[i] = base[i] + step[i]
+        else:
+            x[i] = base[i] + sign[i] * ((step[i] + 1) // 2) * (1 if step[i] % 2 else -1)
+
+
+def _insert(B, start, coefficients):
+    """Replace block starting at start with unimodularly equivalent one, with sum(c_i * b_i) as first vector"""
+    block = [numpy.array(row, dtype=object) for row in B[start:start + len(coefficients)]]
+    u = [gmpy2.mpz(c) for c in coefficients]
+    for i in range(len(u) - 1, 0, -1):
+        a, b = u[i - 1], u[i]
+        if b == 0:
+            continue
+        g, s, t = gmpy2.gcdext(a, b)
+        block[i - 1], block[i] = (a // g) * block[i - 1] + (b // g) * block[i], -t * block[i - 1] + s * block[i]
+        u[i - 1], u[i] = g, 0
+    if u[0] < 0:
+        block[0] = -block[0]
+    return B[:start] + [list(row) for row in block] + B[start + len(coefficients):]
+
+
+def bkz(basis, block_size=10, delta=0.99, max_tours=16):
+    """BKZ reduction (Schnorr-Euchner), LLL with shortest vectors of projected blocks found by enumeration
+    Cost grows exponentially with block_size, 10-20 is practical
+
+    Args:
+        basis(list): rows (lists of ints), linearly independent
+        block_size(int)
+        delta(float): Lovasz constant, 1/4 < delta < 1
+        max_tours(int): maximal amount of passes through the basis
+
+    Returns:
+        list: reduced basis (lists of ints)
+    """
+    if numpy is None:
+        log.critical_error("bkz requires numpy")
+    B = lll(basis, delta)
+    n = len(B)
+    for tour in range(max_tours):
+        changed = False
+        r, mu = _gso_float(B)
+        for k in range(n - 1):
+            end = min(k + block_size, n)
+            coefficients = _enumerate(r, mu, k, end, delta * r[k])
+            if coefficients is None:
+                continue
+            # span of block does not change, so only its prefix needs LLL
+            B = _insert(B, k, coefficients)
+            B = lll(B[:end], delta) + B[end:]
+            r, mu = _gso_float(B)
+            changed = True
+        log.debug("BKZ tour {}: ||b_0||**2 = {}".format(tour, r[0]))
+        if not changed:
+            break
+        # vectors after the last changed block may be not size reduced
+        B = lll(B, delta)
+    return B
+
+
+def _poly_mul(f, g, modulus=None):
+    result = [0] * (len(f) + len(g) - 1)
+    for i, a in enumerate(f):
+        for j, b in enumerate(g):
+            result[i + j] += a * b
+    if modulus is not None:
+        result = [c % modulus for c in result]
+    return result
+
+
+def _poly_eval(f, x, modulus=None):
+    result = 0
+    for c in reversed(f):
+        result = result * x + c
+        if modulus is not None:
+            result %= modulus
+    return result
+
+
+def _poly_derivative(f):
+    return [i * c for i, c in enumerate(f)][1:]
+
+
+def _integer_roots(f, bound):
+    """Integer roots x of f with |x| < bound
+    Roots modulo small prime p (for which they are all simple) are lifted (Newton) to modulo p**k > 2*bound
+
+    Args:
+        f(list): coefficients (ints), f[i] at x**i
+
+    Returns:
+        set: roots
+    """
+    f = [gmpy2.mpz(c) for c in f]
+    while f and f[-1] == 0:
+        f.pop()
+    roots = set()
+    if f and f[0] == 0:
+        roots.add(0)
+        while f[0] == 0:
+            f.pop(0)
+    if len(f) < 2:
+        return roots
+
+    derivative = _poly_derivative(f)
+    for p in iter_primes(101, 2**12):
+        if f[-1] % p == 0:
+            continue
+        f_p, derivative_p = [c % p for c in f], [c % p for c in derivative]
+        residues = [x for x in range(p) if _poly_eval(f_p, x, p) == 0]
+        if any(_poly_eval(derivative_p, x, p) == 0 for x in residues):
+            continue
+        for x in residues:
+            x, modulus = gmpy2.mpz(x), gmpy2.mpz(p)
+            while modulus <= 2 * bound:
+                modulus *= modulus
+                x = (x - _poly_eval(f, x, modulus) * invmod(_poly_eval(derivative, x, modulus), modulus)) % modulus
+            if x > modulus // 2:
+                x -= modulus
+            if abs(x) < bound and _poly_eval(f, x) == 0:
+                roots.add(long(x))
+        return roots
+    log.debug("No prime with simple roots found, polynomial has multiple roots")
+    return roots
+
+
+def coppersmith_parameters(n, degree, beta=1.0, epsilon=None, bound=None):
+    """Parameters of Coppersmith lattice (as in Sage's small_roots)
+    bound = n**(beta**2/degree - epsilon) / 2, so if bound is given epsilon is computed from it
+
+    Returns:
+        tuple: m (power of n), t (amount of x**i * f**m polynomials), bound; lattice dimension is degree*m + t
+    """
+    beta, log_n = float(beta), math.log(long(n), 2)
+    if epsilon is None:
+        if bound is None:
+            epsilon = beta / 8.
+        else:
+            epsilon = beta**2 / degree - (math.log(long(bound), 2) + 1) / log_n
+            if epsilon <= 0:
+                log.critical_error("Bound too large, at most 2**{} for beta={}".format(
+                    int(log_n * beta**2 / degree) - 1, beta))
+    if bound is None:
+        bound = 2**max(0, int(log_n * (beta**2 / degree - epsilon)) - 1)
+    m = int(math.ceil(beta**2 / (degree * epsilon)))
+    t = int(degree * m * (1 / beta - 1))
+    return m, t, bound
+
+
+def small_roots(f, n, bound=None, beta=1.0, epsilon=None):
+    """Coppersmith method (Howgrave-Graham): small roots of polynomial modulo unknown divisor b >= n**beta of n
+    Sage's small_roots without Sage, lattice is reduced with lll, its dimension and reduction time are logged
+
+    Args:
+        f(list): coefficients (ints), f[i] at x**i, leading one invertible modulo n
+        n(int)
+        bound(int/None): roots are searched in (-bound, bound), computed from epsilon if None
+        beta(float): 0 < beta <= 1, 1 for roots modulo n
+        epsilon(float/None): smaller is slower, but allows larger bound
+                             if None computed from bound, or beta/8 if bound is None too
+
+    Returns:
+        list: roots x (ints), |x| < bound and gcd(f(x), n) >= n**beta
+    """
+    n = gmpy2.mpz(n)
+    f = [gmpy2.mpz(c) % n for c in f]
+    while f and f[-1] == 0:
+        f.pop()
+    degree = len(f) - 1
+    if degree < 1:
+        log.critical_error("Polynomial must have positive degree modulo n")
+    if gmpy2.gcd(f[-1], n) != 1:
+        log.critical_error("Leading coefficient is not invertible modulo n")
+    inverse = invmod(f[-1], n)
+    f = [c * inverse % n for c in f]
+
+    m, t, bound = coppersmith_parameters(n, degree, beta, epsilon, bound)
+    dimension = degree * m + t
+    polynomials = []
+    power = [gmpy2.mpz(1)]
+    for i in range(m):
+        for j in range(degree):
+            polynomials.append([0] * j + [c * n**(m - i) for c in power])
+        power = _poly_mul(power, f, n**(i + 1))
+    for i in range(t):
+        polynomials.append([0] * i + power)
+    basis = [[c * bound**k for k, c in enumerate(polynomial)] + [0] * (dimension - len(polynomial))
+             for polynomial in polynomials]
+
+    start = time.time()
+    reduced = lll(basis)
+    log.info("Coppersmith lattice: dimension {} (m={}, t={}), bound 2**{:.1f}, LLL {:.2f}s".format(
+        dimension, m, t, math.log(long(bound), 2) if bound > 0 else 0, time.time() - start))
+
+    # Howgrave-Graham: if ||h(x*bound)|| < n**(beta*m) / sqrt(dimension), small roots of h mod b**m are over integers
+    log_n = math.log(long(n), 2)
+    limit = 2 * beta * m * log_n - math.log(dimension, 2)
+    roots = set()
+    for row_no, row in enumerate(reduced):
+        if row_no and math.log(long(sum(x * x for x in row)), 2) >= limit:
+            break
+        roots |= _integer_roots([c // bound**k for k, c in enumerate(row)], bound)
+
+    result = []
+    for x in sorted(roots):
+        divisor = gmpy2.gcd(_poly_eval(f, x, n), n)
+        if math.log(long(divisor), 2) >= beta * log_n - 1e-9:
+            result.append(x)
+    return result
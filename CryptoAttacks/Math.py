@@ -1,39 +1,44 @@
 from builtins import int, range, pow
+from past.builtins import long
 from functools import reduce
 
 from CryptoAttacks.Utils import log
 import operator
+import itertools
+import array
+import math
+import time
+import random
+import multiprocessing
+
+import gmpy2
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def iter_continued_fractions(n, d):
+    """Yield quotients of continued fraction of n/d, one by one"""
+    while d:
+        q, r = divmod(n, d)
+        yield q
+        n, d = d, r
+
 
 def continued_fractions(n, d):
-    fractions = []
-    r = 1
-    while r:
-        q = n // d
-        r = n % d
-        fractions.append(q)
-        n, d = d, r
-    return fractions
+    return list(iter_continued_fractions(n, d))
 
 
 def convergents(e):
-    """ from https://sagi.io/2016/04/crypto-classics-wieners-rsa-attack/#fn:6bca21c36a35b17c8f971fe0bb59ec27:2 """
-    n = []  # Nominators
-    d = []  # Denominators
-
-    for i in range(len(e)):
-        if i == 0:
-            ni = e[i]
-            di = 1
-        elif i == 1:
-            ni = e[i]*e[i-1] + 1
-            di = e[i]
-        else:  # i > 1
-            ni = e[i]*n[i-1] + n[i-2]
-            di = e[i]*d[i-1] + d[i-2]
-
-        n.append(ni)
-        d.append(di)
-        yield (ni, di)
+    """ from https://sagi.io/2016/04/crypto-classics-wieners-rsa-attack/#fn:6bca21c36a35b17c8f971fe0bb59ec27:2
+    e may be generator (iter_continued_fractions), convergents are computed as quotients come
+    """
+    n_prev, n = 0, 1  # Nominators
+    d_prev, d = 1, 0  # Denominators
+    for quotient in e:
+        n_prev, n = n, quotient * n + n_prev
+        d_prev, d = d, quotient * d + d_prev
+        yield (n, d)
 
 
 def product(numbers):
@@ -46,9 +51,93 @@ def product(numbers):
     return False
 
 
+def product_tree(numbers, modulus=None):
+    """Compute product tree
+
+    Args:
+        numbers(list): leaves
+        modulus(int/None): if given, products are reduced modulo it (leaves are not)
+
+    Returns:
+        list: levels of the tree, tree[0] are leaves (as mpz), tree[-1] == [product(numbers)]
+    """
+    tree = [[gmpy2.mpz(x) for x in numbers]]
+    while len(tree[-1]) > 1:
+        level = tree[-1]
+        if modulus is None:
+            tree.append([level[i] * level[i + 1] for i in range(0, len(level) - 1, 2)])
+        else:
+            tree.append([level[i] * level[i + 1] % modulus for i in range(0, len(level) - 1, 2)])
+        if len(level) % 2:
+            tree[-1].append(level[-1])
+    return tree
+
+
+def remainder_tree(value, tree):
+    """Compute value % leaf for every leaf of product tree
+
+    Args:
+        value(int)
+        tree(list): from product_tree
+
+    Returns:
+        list: remainders (mpz), in order of leaves
+    """
+    remainders = [value % tree[-1][0]]
+    for level in reversed(tree[:-1]):
+        remainders = [remainders[i // 2] % level[i] for i in range(len(level))]
+    return remainders
+
+
+class CRT(object):
+    def __init__(self, n):
+        """Chinese remainder theorem solver for fixed set of modules
+        Product tree and coefficients (N/n_i)**(-1) % n_i are computed once, so many
+        solutions for the same modules are cheap
+
+        Args:
+            n(list): pairwise coprime modules
+        """
+        if len(n) == 0:
+            log.critical_error("Give at least one module")
+        self.modules = [gmpy2.mpz(x) for x in n]
+        self.tree = product_tree(self.modules)
+        self.product = self.tree[-1][0]
+
+        # (N mod n_i**2) // n_i == (N/n_i) mod n_i
+        squares_tree = product_tree([x * x for x in self.modules])
+        cofactors = [r // x for r, x in zip(remainder_tree(self.product, squares_tree), self.modules)]
+        self.coefficients = []
+        for cofactor, module in zip(cofactors, self.modules):
+            try:
+                self.coefficients.append(gmpy2.invert(cofactor, module))
+            except ZeroDivisionError:
+                raise ValueError("Modules are not coprime ({})".format(module))
+
+    def solve(self, a):
+        """Solve chinese remainder theorem
+
+        Args:
+            a(list): remainders
+
+        Returns:
+            int: x such that x % n_i == a_i, 0 <= x < product(n)
+        """
+        if len(a) != len(self.modules):
+            log.critical_error("Different number of remainders({}) and modules({})".format(len(a),
+                                                                                           len(self.modules)))
+        values = [(a_i * c_i) % n_i for a_i, c_i, n_i in zip(a, self.coefficients, self.modules)]
+        for level in self.tree[:-1]:
+            combined = [values[i] * level[i + 1] + values[i + 1] * level[i] for i in range(0, len(level) - 1, 2)]
+            if len(level) % 2:
+                combined.append(values[-1])
+            values = combined
+        return int(values[0] % self.product)
+
+
 def crt(a, n):
     """Solve chinese remainder theorem
-    from: http://rosettacode.org/wiki/Chinese_remainder_theorem#Python
+    For many solutions with the same modules use CRT class
 
     Args:
         a(list): remainders
@@ -59,14 +148,7 @@ def crt(a, n):
     """
     if len(a) != len(n):
         log.critical_error("Different number of remainders({}) and modules({})".format(len(a), len(n)))
-
-    prod = product(n)
-    sum_crt = 0
-
-    for n_i, a_i in zip(n, a):
-        p = prod / n_i
-        sum_crt += a_i * invmod(p, n_i) * p
-    return int(sum_crt % prod)
+    return CRT(n).solve(a)
 
 
 def euler_phi(factors):
@@ -85,6 +167,21 @@ def euler_phi(factors):
         return reduce(operator.mul, [p-1 for p in factors])
 
 
+def _gcd_python(a, b):
+    while b:
+        a, b = b, a % b
+    return a
+
+
+def _egcd_python(a, b):
+    s0, t0, s1, t1 = 1, 0, 0, 1
+    while b:
+        q, a, b = a//b, b, a%b
+        s0, s1 = s1, s0 - q*s1
+        t0, t1 = t1, t0 - q*t1
+    return a, s0, t0
+
+
 def gcd(*args):
     """Greatest common divisor"""
     if len(args) < 2:
@@ -92,9 +189,10 @@ def gcd(*args):
 
     if len(args) == 2:
         a, b = args
-        while b:
-            a, b = b, a % b
-        return a
+        try:
+            return long(gmpy2.gcd(a, b))
+        except TypeError:
+            return _gcd_python(a, b)
     else:
         d = 0
         for number in args:
@@ -111,7 +209,10 @@ def lcm(*args):
 
     if len(args) == 2:
         a, b = args
-        return (a*b) / gcd(a, b)
+        try:
+            return long(gmpy2.lcm(a, b))
+        except TypeError:
+            return (a // _gcd_python(a, b)) * b
     else:
         l = 1
         for number in args:
@@ -133,12 +234,10 @@ def egcd(*args):
 
     if len(args) == 2:
         a, b = args
-        s0, t0, s1, t1 = 1, 0, 0, 1
-        while b:
-            q, a, b = a//b, b, a%b
-            s0, s1 = s1, s0 - q*s1
-            t0, t1 = t1, t0 - q*t1
-        return a, s0, t0
+        try:
+            return tuple(long(x) for x in gmpy2.gcdext(a, b))
+        except TypeError:
+            return _egcd_python(a, b)
     else:
         d, s, t = egcd(args[0], args[1])
         coefficients = [s, t]
@@ -153,10 +252,47 @@ def egcd(*args):
 
 def invmod(a, n):
     """Modular inverse. a*invmod(a) == 1 (mod n)"""
-    d, s, t = egcd(a, n)
-    if d != 1:
+    try:
+        return long(gmpy2.invert(a, n))
+    except ZeroDivisionError:
         raise ValueError("Modular inverse doesn't exists ({}**(-1) % {})".format(a, n))
-    return s % n
+    except TypeError:
+        d, s, t = _egcd_python(a, n)
+        if d != 1:
+            raise ValueError("Modular inverse doesn't exists ({}**(-1) % {})".format(a, n))
+        return s % n
+
+
+def batch_invmod(values, n):
+    """Modular inverses of many values with one inversion and 3*(k-1) multiplications (Montgomery's trick)
+
+    Args:
+        values(list): numbers to invert
+        n(int): modulus
+
+    Returns:
+        list: invmod(value, n) for every value
+    """
+    if len(values) == 0:
+        return []
+    n = gmpy2.mpz(n)
+    prefix = [gmpy2.mpz(values[0]) % n]
+    for value in values[1:]:
+        prefix.append((prefix[-1] * value) % n)
+
+    try:
+        inverse = gmpy2.invert(prefix[-1], n)
+    except ZeroDivisionError:
+        for value in values:
+            invmod(value, n)
+        raise ValueError("Modular inverse doesn't exists")
+
+    inverses = [None] * len(values)
+    for i in range(len(values) - 1, 0, -1):
+        inverses[i] = long((inverse * prefix[i - 1]) % n)
+        inverse = (inverse * values[i]) % n
+    inverses[0] = long(inverse)
+    return inverses
 
 
 def legendre(a, p):
@@ -199,3 +335,593 @@ def tonelli_shanks(n, p):
         c = pow(b, 2, p)
         m = i
     return r
+
+
+def root_mod_power_of_two(value, e, bits):
+    """Find x such that x^e = value % 2**bits, for odd e and odd value (such x is unique modulo 2**bits)
+    Hensel lifting: Newton step x - (x^e - value) / (e*x^(e-1)) doubles number of correct bits
+
+    Returns:
+        int
+
+    Raises:
+        ValueError: e or value is even
+    """
+    if e % 2 == 0 or value % 2 == 0:
+        raise ValueError("Both e and value must be odd")
+    value = gmpy2.mpz(value)
+    x = gmpy2.mpz(1)
+    precision = 1
+    while precision < bits:
+        precision = min(2 * precision, bits)
+        modulus = gmpy2.mpz(1) << precision
+        power = gmpy2.powmod(x, e - 1, modulus)
+        x = (x - (power * x - value) * gmpy2.invert(e * power, modulus)) % modulus
+    return long(x % (1 << bits))
+
+
+def _sieve_segment(low, size, base_primes):
+    """Sieve odd numbers low, low+2, ..., low+2*(size-1) (low odd) with odd base primes
+
+    Returns:
+        bytearray: 1 at index i if low+2*i has no factor in base_primes (or is one of them)
+    """
+    segment = bytearray([1]) * size
+    high = low + 2 * size
+    for prime in base_primes:
+        square = prime * prime
+        if square >= high:
+            break
+        start = max(square, ((low + prime - 1) // prime) * prime)
+        if start % 2 == 0:
+            start += prime
+        index = (start - low) // 2
+        if index < size:
+            segment[index::prime] = bytearray((size - 1 - index) // prime + 1)
+    return segment
+
+
+def _sieve_odd(bound):
+    """Odd primes <= bound (plain sieve of Eratosthenes on odd numbers)"""
+    if bound < 3:
+        return []
+    size = (bound - 1) // 2
+    sieve = bytearray([1]) * size  # index i is 2*i+3
+    for i in range((int(math.sqrt(bound)) - 1) // 2):
+        if sieve[i]:
+            prime = 2 * i + 3
+            start = (prime * prime - 3) // 2
+            sieve[start::prime] = bytearray((size - 1 - start) // prime + 1)
+    return list(itertools.compress(itertools.count(3, 2), sieve))
+
+
+def _prime_segments(start, stop, segment_size):
+    """Yield lists of consecutive primes from [start, stop), stop may be None (infinite)"""
+    if start <= 2 and (stop is None or stop > 2):
+        yield [2]
+    low = max(start, 3) | 1
+    base_primes = []
+    while stop is None or low < stop:
+        size = segment_size if stop is None else min(segment_size, (stop - low + 1) // 2)
+        high = low + 2 * size
+        if not base_primes or base_primes[-1] ** 2 < high:
+            base_primes = _sieve_odd(int(math.sqrt(high)) + 1)
+        segment = _sieve_segment(low, size, base_primes)
+        if low == 1:
+            segment[0] = 0
+        yield list(itertools.compress(itertools.count(low, 2), segment))
+        low = high
+
+
+def iter_primes(start=2, stop=None, segment_size=2**18):
+    """Lazy prime iterator, segmented sieve of Eratosthenes
+
+    Args:
+        start(int): first prime is >= start
+        stop(int/None): primes are < stop, None for infinite iterator
+        segment_size(int): amount of odd numbers sieved at once
+
+    Returns:
+        generator: primes in increasing order
+    """
+    for segment in _prime_segments(start, stop, segment_size):
+        for prime in segment:
+            yield prime
+
+
+def primes_up_to(bound, segment_size=2**18):
+    """All primes <= bound
+
+    Args:
+        bound(int)
+        segment_size(int): amount of odd numbers sieved at once
+
+    Returns:
+        array.array: primes in increasing order
+    """
+    result = array.array('L')
+    for segment in _prime_segments(2, bound + 1, segment_size):
+        result.extend(segment)
+    return result
+
+
+def prime_candidates(start, size, sieve_bound=2**12):
+    """Odd numbers from [start, start+2*size) without prime factors < sieve_bound
+    Use it to reject most candidates before expensive primality test
+
+    Args:
+        start(int): odd number
+        size(int): amount of odd numbers to check
+        sieve_bound(int): sieve with primes smaller than that
+
+    Returns:
+        list: candidates in increasing order
+    """
+    candidates = bytearray([1]) * size
+    for prime in _sieve_odd(sieve_bound - 1):
+        index = ((prime - start % prime) * ((prime + 1) // 2)) % prime
+        if start + 2 * index == prime:
+            index += prime
+        if index < size:
+            candidates[index::prime] = bytearray((size - 1 - index) // prime + 1)
+    return list(itertools.compress(itertools.count(start, 2), candidates))
+
+
+def _ecm_add(p, q, diff, n):
+    """Differential addition on Montgomery curve (x-only, projective)"""
+    u = (p[0] - p[1]) * (q[0] + q[1])
+    v = (p[0] + p[1]) * (q[0] - q[1])
+    add, sub = u + v, u - v
+    return (diff[1] * add * add) % n, (diff[0] * sub * sub) % n
+
+
+def _ecm_double(p, a24, n):
+    """Point doubling on Montgomery curve, a24 == (A+2)/4"""
+    s = (p[0] + p[1]) ** 2
+    d = (p[0] - p[1]) ** 2
+    t = s - d
+    return (s * d) % n, (t * (d + a24 * t)) % n
+
+
+def _ecm_multiply(p, k, a24, n):
+    """Montgomery ladder, returns k*p"""
+    if k == 1:
+        return p
+    r0, r1 = p, _ecm_double(p, a24, n)
+    for bit in bin(k)[3:]:
+        if bit == '1':
+            r0, r1 = _ecm_add(r1, r0, p, n), _ecm_double(r1, a24, n)
+        else:
+            r0, r1 = _ecm_double(r0, a24, n), _ecm_add(r1, r0, p, n)
+    return r0
+
+
+_ecm_primes_cache = {}
+
+
+def _ecm_primes(bound):
+    if bound not in _ecm_primes_cache:
+        _ecm_primes_cache.clear()
+        _ecm_primes_cache[bound] = primes_up_to(bound)
+    return _ecm_primes_cache[bound]
+
+
+def _ecm_curve(args):
+    """Run stage 1 and stage 2 of ECM on one curve (Suyama's parametrization)
+
+    Args:
+        args(tuple): n, B1, B2, sigma
+
+    Returns:
+        int/None: factor of n
+    """
+    n, B1, B2, sigma = args
+    n = gmpy2.mpz(n)
+
+    u = (sigma * sigma - 5) % n
+    v = (4 * sigma) % n
+    denominator = (16 * pow(u, 3, n) * v) % n
+    g = gmpy2.gcd(denominator, n)
+    if g != 1:
+        return long(g) if g != n else None
+    a24 = (pow(v - u, 3, n) * (3 * u + v) * gmpy2.invert(denominator, n)) % n
+    point = (pow(u, 3, n), pow(v, 3, n))
+
+    # stage 1
+    primes = _ecm_primes(B2)
+    for prime in primes:
+        if prime > B1:
+            break
+        prime_power = prime
+        while prime_power * prime <= B1:
+            prime_power *= prime
+        point = _ecm_multiply(point, prime_power, a24, n)
+
+    g = gmpy2.gcd(point[1], n)
+    if g != 1:
+        return long(g) if g != n else None
+
+    # stage 2, standard continuation
+    D = max(int(gmpy2.isqrt(B2)) // 2, 2)
+    S = [None, _ecm_double(point, a24, n)]
+    S.append(_ecm_double(S[1], a24, n))
+    for d in range(3, D + 1):
+        S.append(_ecm_add(S[d - 1], S[1], S[d - 2], n))
+    beta = [None] + [(S[d][0] * S[d][1]) % n for d in range(1, D + 1)]
+
+    # blocks (r, r + 2D] start with the one containing first prime above B1, only the last one exceeds B2
+    # T == (r - 2D)*P, for first blocks it is -(2D - r)*P, the same x coordinate as (2D - r)*P
+    B = B1 - 1 if B1 % 2 == 0 else B1 - 2
+    R = _ecm_multiply(point, B, a24, n)
+    T = _ecm_multiply(point, abs(B - 2 * D), a24, n)
+
+    accumulator = gmpy2.mpz(1)
+    prime_no = 0
+    while prime_no < len(primes) and primes[prime_no] <= B1:
+        prime_no += 1
+    for r in range(B, B2, 2 * D):
+        alpha = (R[0] * R[1]) % n
+        while prime_no < len(primes) and primes[prime_no] <= r + 2 * D:
+            delta = (primes[prime_no] - r) // 2
+            accumulator = (accumulator * ((R[0] - S[delta][0]) * (R[1] + S[delta][1]) - alpha + beta[delta])) % n
+            prime_no += 1
+        R, T = _ecm_add(R, S[D], T, n), R
+
+    g = gmpy2.gcd(accumulator, n)
+    if g != 1 and g != n:
+        return long(g)
+    return None
+
+
+def ecm(n, B1=11000, B2=None, curves=100, processes=None):
+    """Lenstra's elliptic curve factorization method (Montgomery curves, stage 1 and stage 2)
+    Curves are independent, so they are run in process pool
+
+    Args:
+        n(int): number to factor
+        B1(int): stage 1 bound
+        B2(int/None): stage 2 bound, 100*B1 if None
+        curves(int): maximum amount of curves to try
+        processes(int/None): size of process pool, None for cpu count, 1 to run in current process
+
+    Returns:
+        int/None: non-trivial factor of n
+    """
+    if B2 is None:
+        B2 = 100 * B1
+    if B2 < B1:
+        log.critical_error("B2 must be >= B1")
+
+    for prime in iter_primes(stop=min(B1, 1000)):
+        if n % prime == 0 and n != prime:
+            return prime
+
+    tasks = [(n, B1, B2, random.randint(6, 2**32)) for _ in range(curves)]
+    if processes == 1:
+        results = (_ecm_curve(task) for task in tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes)
+        results = pool.imap_unordered(_ecm_curve, tasks)
+
+    try:
+        for curve_no, factor in enumerate(results):
+            if factor is not None:
+                log.debug("Factor {} found after {} curves".format(factor, curve_no + 1))
+                return factor
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    return None
+
+
+_siqs_params = [
+    # (max digits, factor base size, sieve half-width)
+    (34, 200, 32768),
+    (38, 350, 32768),
+    (42, 550, 65536),
+    (46, 800, 65536),
+    (50, 1100, 65536),
+    (56, 1800, 65536),
+    (60, 2800, 98304),
+    (66, 4500, 131072),
+    (74, 8000, 196608),
+    (80, 14000, 196608),
+    (88, 26000, 262144),
+    (100, 50000, 393216),
+]
+_siqs_state = {}
+
+
+def _siqs_init(n, primes, roots, logs, M, threshold, large_bound):
+    """Set up state shared by all polynomials (called once per worker process)"""
+    _siqs_state.clear()
+    _siqs_state.update({
+        'n': gmpy2.mpz(n), 'primes': primes, 'roots': roots, 'M': M,
+        'threshold': threshold, 'large_bound': large_bound,
+        'np_primes': numpy.array(primes, dtype=numpy.int64),
+        'np_roots': numpy.array(roots, dtype=numpy.int64),
+        'np_logs': numpy.array(logs, dtype=numpy.int16),
+    })
+
+
+def _siqs_choose_a(rng):
+    """Choose A == q1*...*qs ~ sqrt(2n)/M from factor base primes
+
+    Returns:
+        A(mpz), indices of q_i in factor base
+    """
+    n, primes, M = _siqs_state['n'], _siqs_state['primes'], _siqs_state['M']
+    log_target = gmpy2.log2(gmpy2.isqrt(2 * n) // M)
+    s = max(int(round(float(log_target) / 11)), 2)
+    while True:
+        q_log = log_target / s
+        window = [i for i in range(2, len(primes)) if abs(gmpy2.log2(primes[i]) - q_log) < 1.0]
+        if len(window) >= s + 2 or s > 20:
+            break
+        s += 1
+    if len(window) < s:
+        window = list(range(len(primes) // 2, len(primes)))
+
+    indices = rng.sample(window, s - 1)
+    A = gmpy2.mpz(product([primes[i] for i in indices]))
+    target = gmpy2.isqrt(2 * n) // M
+    rest = [i for i in window if i not in indices]
+    last = min(rest, key=lambda i: abs(gmpy2.log2(target) - gmpy2.log2(A * primes[i])))
+    indices.append(last)
+    return A * primes[last], sorted(indices)
+
+
+def _siqs_polynomials(seed):
+    """Sieve with all 2**(s-1) polynomials sharing one random A
+
+    Args:
+        seed(int): seed for choosing A
+
+    Returns:
+        int: amount of sieved polynomials
+        list: full relations (y, value, mask) and partial relations (y, value, mask, large_prime)
+              where y**2 == value (mod n)
+    """
+    n, primes, M = _siqs_state['n'], _siqs_state['primes'], _siqs_state['M']
+    np_primes, np_roots, np_logs = _siqs_state['np_primes'], _siqs_state['np_roots'], _siqs_state['np_logs']
+    threshold, large_bound = _siqs_state['threshold'], _siqs_state['large_bound']
+    rng = random.Random(seed)
+
+    A, a_indices = _siqs_choose_a(rng)
+    s = len(a_indices)
+    B_parts = []
+    for i in a_indices:
+        q = primes[i]
+        a_q = A // q
+        gamma = (_siqs_state['roots'][i] * gmpy2.invert(a_q, q)) % q
+        if gamma > q // 2:
+            gamma = q - gamma
+        B_parts.append(a_q * gamma)
+    B = sum(B_parts)
+
+    in_a = numpy.zeros(len(primes), dtype=bool)
+    in_a[a_indices] = True
+    sieve_primes = numpy.nonzero(~in_a)[0]
+    sieve_primes_list = np_primes[sieve_primes].tolist()
+    sieve_logs_list = np_logs[sieve_primes].tolist()
+    a_inv = numpy.array([gmpy2.invert(A, p) if not in_a[i] else 0 for i, p in enumerate(primes)],
+                        dtype=numpy.int64)
+    b_ainv2 = [(2 * numpy.array([b_part % p for p in primes], dtype=numpy.int64) * a_inv) % np_primes
+               for b_part in B_parts]
+    b_mod = numpy.array([B % p for p in primes], dtype=numpy.int64)
+    soln1 = (a_inv * ((np_roots - b_mod) % np_primes)) % np_primes
+    soln2 = (a_inv * ((-np_roots - b_mod) % np_primes)) % np_primes
+
+    relations = []
+    for poly_no in range(2 ** (s - 1)):
+        if poly_no > 0:
+            v = ((2 * poly_no) & -(2 * poly_no)).bit_length() - 1
+            sign = -1 if ((poly_no + (1 << v) - 1) >> v) % 2 else 1
+            B = B + 2 * sign * B_parts[v - 1]
+            soln1 = (soln1 - sign * b_ainv2[v - 1]) % np_primes
+            soln2 = (soln2 - sign * b_ainv2[v - 1]) % np_primes
+        C = (B * B - n) // A
+
+        sieve = numpy.zeros(2 * M, dtype=numpy.int16)
+        starts1 = ((soln1 + M) % np_primes)[sieve_primes].tolist()
+        starts2 = ((soln2 + M) % np_primes)[sieve_primes].tolist()
+        for p, logp, start1, start2 in zip(sieve_primes_list, sieve_logs_list, starts1, starts2):
+            sieve[start1::p] += logp
+            if start2 != start1:
+                sieve[start2::p] += logp
+
+        for j in numpy.nonzero(sieve >= threshold)[0]:
+            x = int(j) - M
+            Q = (A * x + 2 * B) * x + C
+            value = A * Q
+            mask = 1 if Q < 0 else 0
+            Q = abs(Q)
+            divides = ((x - soln1) % np_primes == 0) | ((x - soln2) % np_primes == 0) | in_a
+            for i in numpy.nonzero(divides)[0]:
+                p = primes[i]
+                exponent = 0
+                while Q % p == 0:
+                    Q //= p
+                    exponent += 1
+                if in_a[i]:
+                    exponent += 1
+                if exponent & 1:
+                    mask |= 1 << (int(i) + 1)
+            y = A * x + B
+            if Q == 1:
+                relations.append((y, value, mask))
+            elif Q < large_bound:
+                relations.append((y, value, mask, int(Q)))
+    return 2 ** (s - 1), relations
+
+
+def _gf2_dependencies(masks):
+    """Find linear dependencies over GF(2) of bit vectors
+    Structured Gaussian elimination: relations with singleton columns are pruned first
+
+    Args:
+        masks(list): bit vectors as ints
+
+    Returns:
+        list: dependencies, each is list of indices in masks
+    """
+    active = set(range(len(masks)))
+    while True:
+        weights = {}
+        for i in active:
+            m = masks[i]
+            while m:
+                low = m & -m
+                weights[low] = weights.get(low, 0) + 1
+                m ^= low
+        singletons = [i for i in active if any(weights[bit] == 1 for bit in _bits(masks[i]))]
+        if not singletons:
+            break
+        active.difference_update(singletons)
+
+    pivots = {}
+    dependencies = []
+    for i in sorted(active):
+        vector, history = masks[i], 1 << i
+        while vector:
+            low = vector & -vector
+            if low not in pivots:
+                pivots[low] = (vector, history)
+                break
+            vector ^= pivots[low][0]
+            history ^= pivots[low][1]
+        else:
+            dependencies.append(list(_bits_indices(history)))
+    return dependencies
+
+
+def _bits(number):
+    while number:
+        low = number & -number
+        yield low
+        number ^= low
+
+
+def _bits_indices(number):
+    for low in _bits(number):
+        yield low.bit_length() - 1
+
+
+def siqs(n, factor_base_size=None, sieve_size=None, processes=None, max_polynomials=None):
+    """Self-initializing quadratic sieve (with single large prime variation)
+    Polynomials with different A are sieved in process pool, requires numpy
+
+    Args:
+        n(int): odd composite number to factor (not a prime power), up to ~100 digits
+        factor_base_size(int/None): amount of primes in factor base, None for default by size of n
+        sieve_size(int/None): sieve interval is [-sieve_size, sieve_size), None for default by size of n
+        processes(int/None): size of process pool, None for cpu count, 1 to run in current process
+        max_polynomials(int/None): give up after sieving that many polynomials (bad parameters or n with
+                                   too few smooth values), None for 200 per needed relation
+
+    Returns:
+        int/None: non-trivial factor of n
+    """
+    if numpy is None:
+        log.critical_error("siqs requires numpy")
+    n = gmpy2.mpz(n)
+    if gmpy2.is_prime(n):
+        log.critical_error("n is prime")
+    for prime in iter_primes(stop=1000):
+        if n % prime == 0 and n != prime:
+            return prime
+    root, is_square = gmpy2.iroot(n, 2)
+    if is_square:
+        return long(root)
+
+    digits = len(str(n))
+    for max_digits, default_size, default_sieve in _siqs_params:
+        if digits <= max_digits:
+            break
+    factor_base_size = factor_base_size or default_size
+    M = sieve_size or default_sieve
+
+    primes, roots, logs = [2], [1], [1]
+    for prime in iter_primes(3):
+        if n % prime == 0:
+            return prime
+        if legendre(n, prime) == 1:
+            primes.append(prime)
+            roots.append(int(tonelli_shanks(int(n % prime), prime)))
+            logs.append(int(round(math.log(prime, 2))))
+            if len(primes) == factor_base_size:
+                break
+
+    large_bound = primes[-1] * 64
+    # few bits below expected size of Q(x), logs are rounded and prime powers are not sieved
+    threshold = int(math.log(M, 2) + gmpy2.log2(n) / 2 - math.log(large_bound, 2)) - 5
+    needed = len(primes) + 1 + 20
+    max_polynomials = max_polynomials or 200 * needed
+    log.info("siqs: {} digits, factor base size {}, sieve [-{}, {}), threshold {}".format(
+        digits, len(primes), M, M, threshold))
+
+    init_args = (int(n), primes, roots, logs, M, threshold, large_bound)
+    if processes == 1:
+        pool = None
+        _siqs_init(*init_args)
+    else:
+        processes = processes or multiprocessing.cpu_count()
+        pool = multiprocessing.Pool(processes, _siqs_init, init_args)
+
+    full, partials, seen = [], {}, set()
+    polynomials = 0
+    start = time.time()
+    try:
+        while True:
+            seeds = [random.getrandbits(64) for _ in range(processes or 1)]
+            if pool is None:
+                batches = [_siqs_polynomials(seed) for seed in seeds]
+            else:
+                batches = pool.imap_unordered(_siqs_polynomials, seeds)
+            for count, relations in batches:
+                polynomials += count
+                for relation in relations:
+                    if relation[0] in seen:
+                        continue
+                    seen.add(relation[0])
+                    if len(relation) == 3:
+                        full.append(relation)
+                    elif relation[3] in partials:
+                        y, value, mask, large_prime = relation
+                        y2, value2, mask2, _ = partials[large_prime]
+                        full.append((y * y2, value * value2, mask ^ mask2))
+                    else:
+                        partials[relation[3]] = relation
+            elapsed = time.time() - start
+            log.debug("siqs: {}/{} relations ({} partials), {:.1f} relations/s".format(
+                len(full), needed, len(partials), len(full) / max(elapsed, 1e-6)))
+            if len(full) >= needed:
+                break
+            if polynomials >= max_polynomials:
+                log.info("siqs: only {}/{} relations after {} polynomials, giving up".format(
+                    len(full), needed, polynomials))
+                return None
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    elapsed = time.time() - start
+    log.info("siqs: {} relations in {:.2f}s ({:.1f} relations/s)".format(
+        len(full), elapsed, len(full) / max(elapsed, 1e-6)))
+
+    for dependency in _gf2_dependencies([relation[2] for relation in full]):
+        x, square = gmpy2.mpz(1), gmpy2.mpz(1)
+        for i in dependency:
+            x = (x * full[i][0]) % n
+            square *= full[i][1]
+        y, is_square = gmpy2.iroot(square, 2)
+        if not is_square:
+            log.debug("siqs: bad dependency")
+            continue
+        factor = gmpy2.gcd(x - y, n)
+        if factor != 1 and factor != n:
+            return long(factor)
+    return None
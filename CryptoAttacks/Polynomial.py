@@ -0,0 +1,235 @@
+from builtins import range
+from past.builtins import long
+
+from CryptoAttacks.Math import invmod
+
+import gmpy2
+
+# Polynomials over Z/nZ are lists of coefficients (reduced modulo n), f[i] at x**i, without leading zeros
+# (zero polynomial is [])
+
+# below this length schoolbook algorithms are faster than packing into integers
+_KRONECKER_THRESHOLD = 16
+# below this degree plain euclid is faster than half-gcd
+_HALF_GCD_THRESHOLD = 64
+
+
+def _trim(f):
+    while f and f[-1] == 0:
+        f.pop()
+    return f
+
+
+def poly_degree(f):
+    """Degree, -1 for zero polynomial"""
+    return len(f) - 1
+
+
+def poly(coefficients, n):
+    """Polynomial from list of ints, f[i] at x**i"""
+    n = gmpy2.mpz(n)
+    return _trim([gmpy2.mpz(c) % n for c in coefficients])
+
+
+def poly_add(f, g, n):
+    if len(f) < len(g):
+        f, g = g, f
+    return _trim([(a + b) % n for a, b in zip(f, g)] + f[len(g):])
+
+
+def poly_sub(f, g, n):
+    return poly_add(f, [(-c) % n for c in g], n)
+
+
+def poly_scale(f, c, n):
+    return _trim([a * c % n for a in f])
+
+
+# gmpy2.to_binary format: type and sign bytes, then magnitude (little endian)
+_BINARY_HEADER = b'\x01\x01'
+
+
+def _pack(f, width):
+    """Kronecker substitution: f(256**width) as one integer, coefficients are nonnegative"""
+    return gmpy2.from_binary(_BINARY_HEADER + b''.join(gmpy2.to_binary(c)[2:].ljust(width, b'\0') for c in f))
+
+
+def _unpack(x, width, length, n):
+    data = gmpy2.to_binary(x)[2:].ljust(width * length, b'\0')
+    return [gmpy2.from_binary(_BINARY_HEADER + data[i * width:(i + 1) * width]) % n for i in range(length)]
+
+
+def poly_mul(f, g, n):
+    """Product modulo n
+    Polynomials are packed into big integers (Kronecker substitution) and multiplied by gmpy2,
+    GMP uses Karatsuba, Toom-Cook and FFT multiplication, which is much faster than doing it in Python
+
+    Returns:
+        list: f*g
+    """
+    if not f or not g:
+        return []
+    if min(len(f), len(g)) < _KRONECKER_THRESHOLD:
+        result = [0] * (len(f) + len(g) - 1)
+        for i, a in enumerate(f):
+            if a:
+                for j, b in enumerate(g):
+                    result[i + j] += a * b
+        return _trim([c % n for c in result])
+
+    # coefficients of product are smaller than min(len(f), len(g)) * n**2
+    width = (2 * gmpy2.bit_length(n) + gmpy2.bit_length(min(len(f), len(g)))) // 8 + 1
+    packed = _pack(f, width)
+    product = packed * packed if f is g else packed * _pack(g, width)
+    return _trim(_unpack(product, width, len(f) + len(g) - 1, n))
+
+
+def poly_pow(f, exponent, n):
+    result = [gmpy2.mpz(1)]
+    for bit in bin(exponent)[2:]:
+        result = poly_mul(result, result, n)
+        if bit == '1':
+            result = poly_mul(result, f, n)
+    return result
+
+
+def _inverse_series(f, precision, n):
+    """h with f*h == 1 modulo x**precision (Newton iteration), f[0] must be invertible"""
+    h = [gmpy2.mpz(invmod(f[0], n))]
+    k = 1
+    while k < precision:
+        k = min(2 * k, precision)
+        # h = h - h*(f*h - 1) mod x**k
+        error = poly_sub(_trim(poly_mul(f[:k], h, n)[:k]), [1], n)
+        h = _trim(poly_sub(h, poly_mul(h, error, n)[:k], n)[:k])
+    return h
+
+
+def poly_divmod(f, g, n):
+    """Division with remainder modulo n, leading coefficient of g must be invertible modulo n
+    Short quotients are computed by long division, long ones with Newton inversion of reversed g
+
+    Returns:
+        list: quotient
+        list: remainder
+
+    Raises:
+        ValueError: leading coefficient of g is not invertible modulo n
+    """
+    if not g:
+        raise ZeroDivisionError("Polynomial division by zero")
+    quotient_length = len(f) - len(g) + 1
+    if quotient_length <= 0:
+        return [], f[:]
+
+    if quotient_length < 2 * _KRONECKER_THRESHOLD or len(g) < _KRONECKER_THRESHOLD:
+        inverse = invmod(g[-1], n)
+        remainder = f[:]
+        quotient = [0] * quotient_length
+        low = g[:-1]
+        for i in range(quotient_length - 1, -1, -1):
+            c = remainder[i + len(g) - 1] * inverse % n
+            quotient[i] = c
+            if c:
+                remainder[i:i + len(low)] = [(a - c * b) % n for a, b in zip(remainder[i:i + len(low)], low)]
+        return _trim(quotient), _trim(remainder[:len(g) - 1])
+
+    # reversed(f) = reversed(q) * reversed(g) modulo x**quotient_length
+    inverse = _inverse_series(g[::-1], quotient_length, n)
+    quotient = poly_mul(f[::-1][:quotient_length], inverse, n)[:quotient_length]
+    quotient = _trim((quotient + [0] * (quotient_length - len(quotient)))[::-1])
+    remainder = poly_sub(f, poly_mul(quotient, g, n), n)
+    return quotient, remainder
+
+
+def poly_monic(f, n):
+    if not f:
+        return []
+    return poly_scale(f, invmod(f[-1], n), n)
+
+
+def _apply(matrix, vectors, n):
+    """matrix*(a, b) for every (a, b) in vectors, every polynomial is packed only once"""
+    polynomials = list(matrix) + [f for vector in vectors for f in vector]
+    lengths = [len(f) for f in polynomials if f]
+    if not lengths or min(lengths) < _KRONECKER_THRESHOLD:
+        m00, m01, m10, m11 = matrix
+        return [(poly_add(poly_mul(m00, a, n), poly_mul(m01, b, n), n),
+                 poly_add(poly_mul(m10, a, n), poly_mul(m11, b, n), n)) for a, b in vectors]
+
+    # coefficients of sums of two products are smaller than 2 * length * n**2
+    width = (2 * gmpy2.bit_length(n) + gmpy2.bit_length(max(lengths)) + 1) // 8 + 1
+    packed = [_pack(f, width) for f in polynomials]
+    result = []
+    for vector_no, (a, b) in enumerate(vectors):
+        packed_a, packed_b = packed[4 + 2 * vector_no:6 + 2 * vector_no]
+        pair = []
+        for row in [0, 2]:
+            left, right = matrix[row], matrix[row + 1]
+            length = max(len(left) + len(a), len(right) + len(b), 1) - 1
+            pair.append(_trim(_unpack(packed[row] * packed_a + packed[row + 1] * packed_b, width, length, n)))
+        result.append(tuple(pair))
+    return result
+
+
+def _matrix_mul(left, right, n):
+    (c00, c10), (c01, c11) = _apply(left, [(right[0], right[2]), (right[1], right[3])], n)
+    return c00, c01, c10, c11
+
+
+def _half_gcd(a, b, n):
+    """Matrix M (m00, m01, m10, m11) of euclid steps with (c, d) = M*(a, b), deg(c) >= m > deg(d), m = ceil(deg(a)/2)
+    Quotients depend only on top coefficients, so first half of steps is computed recursively from top halves
+    (Thull-Yap), deg(a) > deg(b)
+    """
+    m = (poly_degree(a) + 1) // 2
+    if poly_degree(b) < m:
+        return [1], [], [], [1]
+    if poly_degree(a) < _HALF_GCD_THRESHOLD:
+        matrix = [1], [], [], [1]
+        while poly_degree(b) >= m:
+            quotient, remainder = poly_divmod(a, b, n)
+            m00, m01, m10, m11 = matrix
+            matrix = m10, m11, poly_sub(m00, poly_mul(quotient, m10, n), n), poly_sub(m01, poly_mul(quotient, m11, n), n)
+            a, b = b, remainder
+        return matrix
+
+    matrix = _half_gcd(a[m:], b[m:], n)
+    c, d = _apply(matrix, [(a, b)], n)[0]
+    if poly_degree(d) < m:
+        return matrix
+    quotient, remainder = poly_divmod(c, d, n)
+    matrix = _matrix_mul(([], [1], [1], poly_sub([], quotient, n)), matrix, n)
+    c, d = d, remainder
+    if poly_degree(d) < m:
+        return matrix
+    k = 2 * m - poly_degree(c)
+    return _matrix_mul(_half_gcd(c[k:], d[k:], n), matrix, n)
+
+
+def poly_gcd(f, g, n):
+    """Monic greatest common divisor modulo n (with half-gcd for large degrees)
+
+    Returns:
+        list: gcd, [] if both polynomials are zero
+
+    Raises:
+        ValueError: leading coefficient of some remainder is not invertible modulo n (it shares factor with n)
+    """
+    f, g = f[:], g[:]
+    if len(f) < len(g):
+        f, g = g, f
+    while g:
+        if poly_degree(f) > poly_degree(g) > _HALF_GCD_THRESHOLD:
+            f, g = _apply(_half_gcd(f, g, n), [(f, g)], n)[0]
+            if not g:
+                break
+        f, g = g, poly_divmod(f, g, n)[1]
+    return poly_monic(f, n)
+
+
+def poly_eval(f, x, n):
+    result = 0
+    for c in reversed(f):
+        result = (result * x + c) % n
+    return long(result)
@@ -0,0 +1,220 @@
+from __future__ import print_function
+from builtins import range
+from past.builtins import long
+
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+
+from CryptoAttacks.Math import *
+from CryptoAttacks.PublicKey.rsa import RSAKey
+from CryptoAttacks.Utils import *
+
+default_cache = os.environ.get('CRYPTOATTACKS_KEY_CACHE',
+                               os.path.join(os.path.expanduser('~'), '.cache', 'CryptoAttacks', 'keys'))
+
+# change when generation changes, so old cache entries are not used
+_cache_version = 1
+
+
+def _random_prime(rng, bits, e=None):
+    """Prime with exactly given amount of bits (two top bits set), numbers are taken from rng
+    If e is given, gcd(e, prime - 1) == 1
+    """
+    while True:
+        start = rng.getrandbits(bits) | (3 << (bits - 2)) | 1
+        for prime in prime_candidates(start, 4 * bits):
+            if gmpy2.bit_length(prime) != bits:
+                break
+            if gmpy2.is_bpsw_prp(prime) and (e is None or gcd(e, prime - 1) == 1):
+                return long(prime)
+
+
+def _random_primes(rng, bits, amount, e=None):
+    """Primes which product has exactly given amount of bits"""
+    primes = [_random_prime(rng, bits // amount + (i < bits % amount), e) for i in range(amount)]
+    while gmpy2.bit_length(product(primes)) != bits or len(set(primes)) != amount:
+        primes[-1] = _random_prime(rng, gmpy2.bit_length(primes[-1]), e)
+    return primes
+
+
+def profile_standard(rng, group_rng, bits, e=65537):
+    """Two random primes of the same size"""
+    return e, None, _random_primes(rng, bits, 2, e)
+
+
+def profile_small_e(rng, group_rng, bits, e=3):
+    """Small public exponent (small_e_msg, hastad, bleichenbacher_signature_forgery)"""
+    return profile_standard(rng, group_rng, bits, e)
+
+
+def profile_small_d(rng, group_rng, bits, d_bits=None):
+    """Small private exponent, d < n**(1/4) / 3 by default (wiener)"""
+    if d_bits is None:
+        d_bits = bits // 4 - 8
+    primes = _random_primes(rng, bits, 2)
+    phi = (primes[0] - 1) * (primes[1] - 1)
+    while True:
+        d = rng.getrandbits(d_bits) | (1 << (d_bits - 1)) | 1
+        if gcd(d, phi) == 1:
+            return long(invmod(d, phi)), d, primes
+
+
+def profile_close_primes(rng, group_rng, bits, e=65537, gap_bits=None):
+    """|p - q| < 2**gap_bits, n**(1/4) / 256 by default (Fermat's factorization)"""
+    if gap_bits is None:
+        gap_bits = bits // 4 - 8
+    p = _random_prime(rng, bits // 2, e)
+    while True:
+        q = long(gmpy2.next_prime(p + rng.getrandbits(gap_bits)))
+        if q != p and gcd(e, q - 1) == 1 and gmpy2.bit_length(p * q) == bits:
+            return e, None, [p, q]
+        p = _random_prime(rng, bits // 2, e)
+
+
+def profile_shared_primes(rng, group_rng, bits, e=65537):
+    """All keys generated with the same seed share one prime (common_primes, batch gcd)"""
+    shared = _random_prime(group_rng, bits // 2, e)
+    while True:
+        q = _random_prime(rng, bits - bits // 2, e)
+        if q != shared and gmpy2.bit_length(shared * q) == bits:
+            return e, None, [shared, q]
+
+
+def profile_multi_prime(rng, group_rng, bits, e=65537, primes=3):
+    """Modulus with given amount of primes"""
+    return e, None, _random_primes(rng, bits, primes, e)
+
+
+profiles = {
+    'standard': profile_standard,
+    'small_e': profile_small_e,
+    'small_d': profile_small_d,
+    'close_primes': profile_close_primes,
+    'shared_primes': profile_shared_primes,
+    'multi_prime': profile_multi_prime,
+}
+
+
+def _parameters(profile, bits, seed, index, params):
+    """Canonical description of key (JSON), used as seed and cache address"""
+    description = {'version': _cache_version, 'profile': profile, 'bits': bits, 'seed': seed, 'params': params}
+    if index is not None:
+        description['index'] = index
+    return json.dumps(description, sort_keys=True)
+
+
+def _rng(description):
+    return random.Random(long(hashlib.sha256(description.encode()).hexdigest(), 16))
+
+
+def _generate_key(task):
+    """Generate numbers of one key
+
+    Args:
+        task(tuple): profile, bits, seed, index, params
+
+    Returns:
+        dict: n, e, d, primes (hex strings)
+    """
+    profile, bits, seed, index, params = task
+    rng = _rng(_parameters(profile, bits, seed, index, params))
+    group_rng = _rng(_parameters(profile, bits, seed, None, params))
+    e, d, primes = profiles[profile](rng, group_rng, bits, **params)
+    primes = sorted(primes)
+    if d is None:
+        d = invmod(e, product([prime - 1 for prime in primes]))
+    return {'n': '{:x}'.format(product(primes)), 'e': '{:x}'.format(e), 'd': '{:x}'.format(d),
+            'primes': ['{:x}'.format(prime) for prime in primes]}
+
+
+def _cache_path(cache, description):
+    address = hashlib.sha256(description.encode()).hexdigest()
+    return os.path.join(cache, address[:2], address + '.json')
+
+
+def _load_key(path):
+    try:
+        with open(path) as f:
+            numbers = json.load(f)
+        if int(numbers['n'], 16) == product([int(prime, 16) for prime in numbers['primes']]):
+            return numbers
+        log.debug("Corrupted cache entry {}".format(path))
+    except (IOError, ValueError, KeyError):
+        pass
+    return None
+
+
+def _store_key(path, numbers):
+    """Write atomically, so parallel runs never see partial files"""
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            pass
+    fd, tmp_path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(numbers, f)
+    os.rename(tmp_path, path)
+
+
+def generate_keys(profile='standard', bits=1024, amount=1, seed=0, cache=None, processes=None, **params):
+    """Generate RSA keys with chosen weakness, for tests and benchmarks
+    Every key is generated deterministically from parameters, seed and its index, so the same call returns
+    the same keys. Missing keys are generated in process pool and stored in cache directory under sha256 of
+    parameters (content-addressed), repeated calls only read files
+
+    Args:
+        profile(string): name of profile from profiles (standard, small_e, small_d, close_primes, shared_primes,
+                         multi_prime)
+        bits(int): size of modulus
+        amount(int): amount of keys
+        seed(int/string): different seeds give different keys
+        cache(string/None): cache directory (default_cache for shared one), None to not cache
+        processes(int/None): size of process pool, None for cpu count, 1 to run in current process
+        params: passed to profile function, like e, d_bits, gap_bits, primes
+
+    Returns:
+        list: private RSAKeys
+    """
+    if profile not in profiles:
+        log.critical_error("Unknown profile: {}".format(profile))
+
+    tasks = [(profile, bits, seed, index, params) for index in range(amount)]
+    numbers = [None] * amount
+    paths = [None] * amount
+    if cache is not None:
+        for index, task in enumerate(tasks):
+            paths[index] = _cache_path(cache, _parameters(*task))
+            numbers[index] = _load_key(paths[index])
+    missing = [index for index in range(amount) if numbers[index] is None]
+    log.debug("{} keys from cache, generating {}".format(amount - len(missing), len(missing)))
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if processes > 1 and len(missing) > 1:
+        pool = multiprocessing.Pool(min(processes, len(missing)))
+        try:
+            generated = pool.map(_generate_key, [tasks[index] for index in missing])
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        generated = [_generate_key(tasks[index]) for index in missing]
+
+    for index, key_numbers in zip(missing, generated):
+        numbers[index] = key_numbers
+        if cache is not None:
+            _store_key(paths[index], key_numbers)
+
+    keys = []
+    for index, key_numbers in enumerate(numbers):
+        n, e, d = [long(key_numbers[name], 16) for name in ['n', 'e', 'd']]
+        primes = [long(prime, 16) for prime in key_numbers['primes']]
+        identifier = '{}-{}-{}-{}'.format(profile, bits, seed, index)
+        keys.append(RSAKey.construct(n, e, d, identifier=identifier, primes=primes))
+    return keys
@@ -0,0 +1,305 @@
+from __future__ import print_function
+from builtins import range
+from past.builtins import long
+
+import base64
+import binascii
+import mmap
+import multiprocessing
+import os
+import re
+import struct
+import time
+
+from Crypto.PublicKey import RSA as PyRSA
+from CryptoAttacks.PublicKey.rsa import RSAKey
+from CryptoAttacks.Utils import *
+
+
+key_extensions = ('.pem', '.der', '.key', '.pub')
+
+
+def iter_key_files(paths, extensions=key_extensions):
+    """Yield key files from given files and directories (recursively)
+
+    Args:
+        paths(list): files and directories
+        extensions(tuple): extensions of files to take from directories
+
+    Returns:
+        generator: paths of files
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(extensions):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def _der_items(data):
+    """Split DER encoded data into (tag, content) items"""
+    items = []
+    i = 0
+    while i < len(data):
+        tag, length = ord(data[i]), ord(data[i + 1])
+        i += 2
+        if length & 0x80:
+            size = length & 0x7f
+            length = int(binascii.hexlify(data[i:i + size]), 16)
+            i += size
+        if i + length > len(data):
+            raise ValueError("Truncated DER")
+        items.append((tag, data[i:i + length]))
+        i += length
+    return items
+
+
+def _parse_der(der):
+    """Get modulus and exponent from PKCS#1 public/private, X.509 SubjectPublicKeyInfo or PKCS#8 structure
+
+    Returns:
+        tuple: n and e as big endian bytes
+    """
+    top = _der_items(der)
+    if len(top) != 1 or top[0][0] != 0x30:
+        raise ValueError("Not DER sequence")
+    items = _der_items(top[0][1])
+    tags = [tag for tag, _ in items]
+    if tags == [0x02, 0x02]:
+        return items[0][1].lstrip('\x00'), items[1][1].lstrip('\x00')
+    if len(tags) >= 9 and set(tags) == set([0x02]):
+        return items[1][1].lstrip('\x00'), items[2][1].lstrip('\x00')
+    if tags == [0x30, 0x03]:
+        return _parse_der(items[1][1][1:])
+    if tags[:3] == [0x02, 0x30, 0x04]:
+        return _parse_der(items[2][1])
+    raise ValueError("Not RSA key")
+
+
+def _parse_ssh(line):
+    data = base64.b64decode(line.split()[1])
+    fields = []
+    i = 0
+    while i < len(data):
+        length = struct.unpack('>I', data[i:i + 4])[0]
+        fields.append(data[i + 4:i + 4 + length])
+        i += 4 + length
+    if len(fields) != 3 or fields[0] != 'ssh-rsa':
+        raise ValueError("Not ssh-rsa key")
+    return fields[2].lstrip('\x00'), fields[1].lstrip('\x00')
+
+
+def parse_keys(data):
+    """Get modulus and exponent of RSA keys without constructing key objects
+    Supports PEM (PKCS#1, X.509, PKCS#8), DER and OpenSSH public keys (many in one file)
+    Other formats (like encrypted PEM) are passed to pycrypto
+
+    Args:
+        data(string): content of key file
+
+    Returns:
+        list: (n, e) as big endian bytes
+    """
+    stripped = data.lstrip()
+    if stripped.startswith('-----BEGIN') and 'ENCRYPTED' not in data:
+        keys = []
+        for block in re.findall(r'-----BEGIN [^-]*-----(.*?)-----END [^-]*-----', stripped, re.S):
+            body = [line for line in block.splitlines() if ':' not in line]
+            keys.append(_parse_der(base64.b64decode(''.join(body))))
+        if not keys:
+            raise ValueError("No PEM blocks")
+        return keys
+    if stripped.startswith('ssh-rsa '):
+        return [_parse_ssh(line) for line in stripped.splitlines() if line.startswith('ssh-rsa ')]
+    if stripped.startswith('0'):
+        try:
+            return [_parse_der(data)]
+        except (ValueError, IndexError):
+            pass
+    key = PyRSA.importKey(data)
+    return [(i2b(key.n), i2b(key.e))]
+
+
+def _parse_key_file(path):
+    """Returns:
+        tuple: path, list of (identifier, n, e), error
+    """
+    try:
+        with open(path, 'rb') as f:
+            keys = parse_keys(f.read())
+    except Exception as e:
+        return path, [], str(e) or e.__class__.__name__
+    if len(keys) == 1:
+        return path, [(path, keys[0][0], keys[0][1])], None
+    return path, [('{}:{}'.format(path, key_no), n, e) for key_no, (n, e) in enumerate(keys)], None
+
+
+class _BlobColumn(object):
+    def __init__(self, path, name):
+        """Append-only column of byte strings, data and index (end offsets, little endian uint64)
+        are in two files, both memory-mapped for reading
+
+        Args:
+            path(string): directory
+            name(string): name of column
+        """
+        self.data_path = os.path.join(path, name + '.bin')
+        self.index_path = os.path.join(path, name + '.idx')
+        for file_path in [self.data_path, self.index_path]:
+            if not os.path.exists(file_path):
+                open(file_path, 'wb').close()
+        self.data = self.index = None
+        self._map()
+
+    def _map(self):
+        self.close()
+        self.length = os.path.getsize(self.index_path) // 8
+        if self.length:
+            with open(self.data_path, 'rb') as f:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(self.data_path) \
+                    else ''
+            with open(self.index_path, 'rb') as f:
+                self.index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        for mapped in [self.data, self.index]:
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        self.data = self.index = None
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.length
+        if not 0 <= i < self.length:
+            raise IndexError("Column index out of range")
+        end = struct.unpack_from('<Q', self.index, 8 * i)[0]
+        start = struct.unpack_from('<Q', self.index, 8 * (i - 1))[0] if i else 0
+        return self.data[start:end]
+
+    def extend(self, blobs):
+        offset = os.path.getsize(self.data_path)
+        offsets = []
+        with open(self.data_path, 'ab') as f:
+            for blob in blobs:
+                f.write(blob)
+                offset += len(blob)
+                offsets.append(offset)
+        with open(self.index_path, 'ab') as f:
+            f.write(struct.pack('<{}Q'.format(len(offsets)), *offsets))
+        self._map()
+
+
+class KeyStore(object):
+    def __init__(self, path):
+        """Compact store of public keys in a directory
+        Moduli, exponents and identifiers are kept as packed big endian blobs with offset index,
+        memory-mapped, RSAKey objects are created only on demand
+
+        Args:
+            path(string): directory, created if not exists
+        """
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.path = path
+        self._moduli = _BlobColumn(path, 'moduli')
+        self._exponents = _BlobColumn(path, 'exponents')
+        self._identifiers = _BlobColumn(path, 'identifiers')
+
+    def __len__(self):
+        return len(self._moduli)
+
+    def n(self, i):
+        return long(binascii.hexlify(self._moduli[i]), 16)
+
+    def e(self, i):
+        return long(binascii.hexlify(self._exponents[i]), 16)
+
+    def identifier(self, i):
+        return self._identifiers[i]
+
+    def key(self, i):
+        """Construct RSAKey for i-th key"""
+        return RSAKey(self.n(i), self.e(i), identifier=self.identifier(i))
+
+    def __getitem__(self, i):
+        return self.key(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.key(i)
+
+    def moduli(self):
+        """Yield moduli (ints) without creating keys"""
+        for i in range(len(self)):
+            yield self.n(i)
+
+    def extend(self, keys):
+        """Add keys
+
+        Args:
+            keys(list): (identifier, n, e), n and e as ints or big endian bytes
+        """
+        keys = list(keys)
+        self._moduli.extend(n if isinstance(n, str) else i2b(n) for _, n, _ in keys)
+        self._exponents.extend(e if isinstance(e, str) else i2b(e) for _, _, e in keys)
+        self._identifiers.extend(identifier for identifier, _, _ in keys)
+
+    def close(self):
+        for column in [self._moduli, self._exponents, self._identifiers]:
+            column.close()
+
+    @staticmethod
+    def ingest(paths, store_path, processes=None, chunk_size=4096):
+        """Parse key files in process pool and append them to store
+
+        Args:
+            paths(list): files and directories with keys (PEM/DER/OpenSSH)
+            store_path(string): directory of KeyStore
+            processes(int/None): size of process pool, None for cpu count, 1 to run in current process
+            chunk_size(int): amount of keys written at once
+
+        Returns:
+            KeyStore
+        """
+        store = KeyStore(store_path)
+        if processes == 1:
+            results = (_parse_key_file(path) for path in iter_key_files(paths))
+            pool = None
+        else:
+            pool = multiprocessing.Pool(processes)
+            results = pool.imap(_parse_key_file, iter_key_files(paths), chunksize=64)
+
+        start = time.time()
+        amount, errors = 0, 0
+        chunk = []
+        try:
+            for path, keys, error in results:
+                if error is not None:
+                    log.debug("Can't load {}: {}".format(path, error))
+                    errors += 1
+                    continue
+                chunk.extend(keys)
+                if len(chunk) >= chunk_size:
+                    store.extend(chunk)
+                    amount += len(chunk)
+                    chunk = []
+            store.extend(chunk)
+            amount += len(chunk)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        elapsed = time.time() - start
+        log.info("Ingested {} keys ({} files failed) in {:.2f}s, {:.1f} keys/s".format(
+            amount, errors, elapsed, amount / elapsed if elapsed else 0))
+        return store
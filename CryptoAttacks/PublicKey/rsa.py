@@ -1,58 +1,405 @@
 from __future__ import print_function
 from builtins import range, int, pow
+from past.builtins import long
 
+import binascii
 import itertools
-from copy import deepcopy
+import multiprocessing
+import operator
+import os
+import time
+from multiprocessing.pool import ThreadPool
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
 from numbers import Number
 from math import sqrt
 import sys
 
 from Crypto.PublicKey import RSA as PyRSA
+from CryptoAttacks.Lattice import small_roots
 from CryptoAttacks.Math import *
+from CryptoAttacks.Polynomial import poly, poly_degree, poly_gcd
 from CryptoAttacks.Utils import *
 
 
-class RSAKey:
-    def __init__(self, n, e=0x10001, d=None, p=None, q=None, texts=None, identifier=None):
+class TextPair(MutableMapping):
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store, index):
+        """Dict view ({'cipher': c, 'plain': p}) of one entry of TextStore, changes go to the store"""
+        self._store = store
+        self._index = index
+
+    def __getitem__(self, name):
+        value = self._store._get(name, self._index)
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def __setitem__(self, name, value):
+        self._store._set(name, self._index, value)
+
+    def __delitem__(self, name):
+        if self._store._get(name, self._index) is None:
+            raise KeyError(name)
+        self._store._set(name, self._index, None)
+
+    def __iter__(self):
+        for name in TextStore.names:
+            if self._store._get(name, self._index) is not None:
+                yield name
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+def _bitmap_to_int(bitmap):
+    """Bit i of integer is bit (i % 8) of byte i // 8"""
+    if not bitmap:
+        return 0
+    return long(binascii.hexlify(bitmap[::-1]), 16)
+
+
+class TextStore(object):
+    __slots__ = ('_columns', '_bitmaps', '_length')
+
+    names = ('cipher', 'plain')
+
+    def __init__(self, texts=None):
+        """Ciphertexts and plaintexts of a key, kept as parallel columns (lists, None where missing)
+        with presence bitmaps, so entries can be selected without looking at every pair
+        Entries are also available as dicts (TextPair views), like in list of dicts:
+            texts[0]['plain'] = 123; 'cipher' in texts[1]; for pair in texts
+
+        Args:
+            texts(list/TextStore/None): list of dicts [{'cipher': 12332, 'plain': 65432423}, {'cipher': 0xffaa}]
+        """
+        if isinstance(texts, TextStore):
+            self._columns = dict((name, column[:]) for name, column in texts._columns.items())
+            self._bitmaps = dict((name, bitmap[:]) for name, bitmap in texts._bitmaps.items())
+            self._length = texts._length
+            return
+
+        self._columns = dict((name, []) for name in TextStore.names)
+        self._bitmaps = dict((name, bytearray()) for name in TextStore.names)
+        self._length = 0
+        if texts:
+            self.extend(texts)
+
+    def copy(self):
+        return TextStore(self)
+
+    def __getstate__(self):
+        return self._columns, self._bitmaps, self._length
+
+    def __setstate__(self, state):
+        self._columns, self._bitmaps, self._length = state
+
+    def __len__(self):
+        return self._length
+
+    def _get(self, name, index):
+        if name not in self._columns:
+            raise KeyError(name)
+        return self._columns[name][index]
+
+    def _set(self, name, index, value):
+        if name not in self._columns:
+            raise KeyError(name)
+        if index < 0:
+            index += self._length
+        self._columns[name][index] = value
+        if value is None:
+            self._bitmaps[name][index >> 3] &= ~(1 << (index & 7)) & 0xff
+        else:
+            self._bitmaps[name][index >> 3] |= 1 << (index & 7)
+
+    def cipher(self, index):
+        """Ciphertext at index or None"""
+        return self._columns['cipher'][index]
+
+    def plain(self, index):
+        """Plaintext at index or None"""
+        return self._columns['plain'][index]
+
+    def set_cipher(self, index, ciphertext):
+        self._set('cipher', index, ciphertext)
+
+    def set_plain(self, index, plaintext):
+        self._set('plain', index, plaintext)
+
+    def add(self, ciphertext=None, plaintext=None):
+        """Add one entry
+
+        Returns:
+            int: index of the entry
+        """
+        index = self._length
+        self._length += 1
+        for name, value in zip(TextStore.names, [ciphertext, plaintext]):
+            bitmap = self._bitmaps[name]
+            if not index & 7:
+                bitmap.append(0)
+            self._columns[name].append(value)
+            if value is not None:
+                bitmap[index >> 3] |= 1 << (index & 7)
+        return index
+
+    def append(self, pair):
+        """Add entry given as dict, like list.append"""
+        self.add(pair.get('cipher'), pair.get('plain'))
+
+    def extend(self, pairs):
+        """Add entries given as dicts, like list.extend"""
+        pairs = list(pairs)
+        self.add_many(*[[pair.get(name) for pair in pairs] for name in TextStore.names])
+
+    def add_many(self, ciphertexts=None, plaintexts=None):
+        """Add many entries at once
+
+        Args:
+            ciphertexts(list/None): ints, None for missing
+            plaintexts(list/None): ints, None for missing, the same length as ciphertexts if both given
+        """
+        values = dict((name, None if column is None else list(column))
+                      for name, column in zip(TextStore.names, [ciphertexts, plaintexts]))
+        given = [column for column in values.values() if column is not None]
+        amount = len(given[0]) if given else 0
+        if any(len(column) != amount for column in given):
+            log.critical_error("Ciphertexts and plaintexts lists must have the same length")
+
+        start = self._length
+        self._length += amount
+        for name in TextStore.names:
+            column, bitmap = self._columns[name], self._bitmaps[name]
+            bitmap.extend(bytearray((self._length + 7) // 8 - len(bitmap)))
+            if values[name] is None:
+                column.extend([None] * amount)
+                continue
+            column.extend(values[name])
+            for index in range(start, self._length):
+                if column[index] is not None:
+                    bitmap[index >> 3] |= 1 << (index & 7)
+
+    def clear(self):
+        self.__init__()
+
+    def indexes(self, cipher=None, plain=None):
+        """Indexes of entries with (True) or without (False) ciphertext/plaintext, None for any
+        indexes(cipher=True, plain=False) gives ciphertexts without plaintexts
+
+        Returns:
+            list: ascending indexes
+        """
+        selected = (1 << self._length) - 1
+        for name, present in zip(TextStore.names, [cipher, plain]):
+            if present is not None:
+                bits = _bitmap_to_int(self._bitmaps[name])
+                selected &= bits if present else ~bits
+        selected = gmpy2.mpz(selected)
+        result = []
+        index = gmpy2.bit_scan1(selected)
+        while index is not None:
+            result.append(index)
+            index = gmpy2.bit_scan1(selected, index + 1)
+        return result
+
+    def export(self, indexes=None):
+        """Columns as lists (None where missing)
+
+        Args:
+            indexes(list/None): export only this entries, None for all
+
+        Returns:
+            list: ciphertexts
+            list: plaintexts
+        """
+        if indexes is None:
+            return self._columns['cipher'][:], self._columns['plain'][:]
+        if len(indexes) < 2:
+            return [self._columns['cipher'][i] for i in indexes], [self._columns['plain'][i] for i in indexes]
+        take = operator.itemgetter(*indexes)
+        return list(take(self._columns['cipher'])), list(take(self._columns['plain']))
+
+    def to_dicts(self):
+        """Old format: list of dicts"""
+        return [dict(pair) for pair in self]
+
+    def _check_index(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("Text index out of range")
+        return index
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            texts = TextStore()
+            texts.add_many(*self.export(list(range(*index.indices(self._length)))))
+            return texts
+        return TextPair(self, self._check_index(index))
+
+    def __setitem__(self, index, pair):
+        """Replace entry with dict, like in list of dicts"""
+        index = self._check_index(index)
+        for name in TextStore.names:
+            self._set(name, index, pair.get(name))
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield TextPair(self, index)
+
+    def __eq__(self, other):
+        if isinstance(other, TextStore):
+            return self.export() == other.export()
+        if isinstance(other, list):
+            return self.to_dicts() == [dict(pair) for pair in other]
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __repr__(self):
+        return repr(self.to_dicts())
+
+
+class RSAKey(object):
+    __slots__ = ('n', 'e', 'd', 'p', 'q', 'primes', 'identifier', 'size', '_texts', '_texts_shared', '_pyrsa_key',
+                 '_engine')
+
+    _small_base_bound = 2**16
+    _small_bases_cache_size = 256
+
+    def __init__(self, n, e=0x10001, d=None, p=None, q=None, texts=None, identifier=None, primes=None):
         """Construct key
 
         Args:
             n(long): RSA modulus
             e(long): Public exponent
-            d(long): Private exponent (d). If key is private, one of d,p or q must be given
+            d(long): Private exponent (d). If key is private, one of d,p,q or primes must be given
             p(long): First factor of n
             q(long): Second factor of n
-            texts(list): list of dicts [{'cipher': 12332, 'plain': 65432423}, {'cipher': 0xffaa, 'plain': 0xbb11}]
+            texts(list/TextStore): list of dicts [{'cipher': 12332, 'plain': 65432423}, {'cipher': 0xffaa, 'plain': 0xbb11}]
             identifier(string/None): unique identifier of key
+            primes(list/None): all (distinct) prime factors of n, for multi-prime keys
 
-            self.size(int): bit size
+            self.texts(TextStore): ciphertexts and plaintexts, list of dicts is converted
+            self.size(int): bit size (of n in full bytes)
+            self.pyrsa_key: pycrypto key, constructed on first use
+            self.primes(list/None): sorted prime factors of n, p is the smallest one and q == n//p for multi-prime keys
         """
-        if texts is None:
-            texts = []
-        self.texts = texts
+        self._texts = TextStore(texts)
+        self._texts_shared = False
         self.identifier = identifier or str(id(self))
 
-        if d or p or q:
+        if primes:
+            primes = sorted(primes)
+            if product(primes) != n:
+                log.critical_error("Product of primes is not n")
+        elif p or q:
+            if p:
+                q = n//p
+            p = n//q
+            primes = sorted([p, q])
+        elif d:
+            primes = factors_from_d(n, e, d)
+        if primes:
+            if not (p or q):
+                p = primes[0]
+                q = n//p
             if not d:
-                if p:
-                    q = n//p
-                p = n//q
-                d = int(invmod(e, (p - 1) * (q - 1)))
-            else:
-                if p or q:
-                    if p:
-                        q = n//p
-                    p = n//q
-                else:
-                    p, q = factors_from_d(n, e, d)
-            tup = (n, e, d, p, q)
+                d = int(invmod(e, product([prime - 1 for prime in primes])))
+
+        self.n, self.e, self.d, self.p, self.q, self.primes = n, e, d, p, q, primes
+        self.size = (gmpy2.bit_length(n) + 7) // 8 * 8
+        self._pyrsa_key = None
+        self._engine = None
+
+    def _derive(self, identifier, private=True):
+        """New key with the same numbers, texts shared until one of keys changes them"""
+        key = RSAKey.__new__(RSAKey)
+        key.n, key.e, key.identifier, key.size = self.n, self.e, identifier or str(id(key)), self.size
+        if private:
+            key.d, key.p, key.q, key.primes = self.d, self.p, self.q, self.primes
+            key._pyrsa_key, key._engine = self._pyrsa_key, self._engine
         else:
-            tup = (n, e)
-        tup = map(long, tup)
+            key.d = key.p = key.q = key.primes = None
+            key._pyrsa_key = key._engine = None
+        key._share_texts(self)
+        return key
+
+    def _share_texts(self, other):
+        """Use other key's texts (copy-on-write)"""
+        self._texts = other._texts
+        self._texts_shared = other._texts_shared = True
+
+    def _own_texts(self):
+        if self._texts_shared:
+            self._texts = self._texts.copy()
+            self._texts_shared = False
+        return self._texts
+
+    @property
+    def texts(self):
+        return self._own_texts()
+
+    @texts.setter
+    def texts(self, texts):
+        self._texts = texts if isinstance(texts, TextStore) else TextStore(texts)
+        self._texts_shared = False
+
+    @property
+    def pyrsa_key(self):
+        if self._pyrsa_key is None:
+            if self.has_private() and len(self.primes) > 2:
+                # pycrypto knows only two-prime keys
+                tup = (self.n, self.e, self.d)
+            elif self.has_private():
+                tup = (self.n, self.e, self.d, self.p, self.q)
+            else:
+                tup = (self.n, self.e)
+            self._pyrsa_key = PyRSA.construct(tuple(map(long, tup)))
+        return self._pyrsa_key
+
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name in RSAKey.__slots__ if name != '_pyrsa_key')
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._pyrsa_key = None
+
+    def _get_engine(self):
+        """Cached gmpy2 values used by encrypt/decrypt:
+        n, e, d, CRT parameters for every prime r_i (r_i, d % (r_i-1), (r_1*...*r_(i-1))**(-1) % r_i, r_1*...*r_(i-1))
+        and results for small bases
+        """
+        if self._engine is None:
+            engine = {'n': gmpy2.mpz(self.n), 'e': gmpy2.mpz(self.e), 'small_bases': {}}
+            if self.has_private():
+                d = gmpy2.mpz(self.d)
+                crt, modulus = [], gmpy2.mpz(1)
+                for prime in map(gmpy2.mpz, self.primes):
+                    crt.append((prime, d % (prime - 1), gmpy2.invert(modulus, prime), modulus))
+                    modulus *= prime
+                engine['crt'] = crt
+            self._engine = engine
+        return self._engine
 
-        self.n, self.e, self.d, self.p, self.q = n, e, d, p, q
-        self.size = int(math.ceil(math.log(n, 2) / 8.0) * 8)
-        self.pyrsa_key = PyRSA.construct(tup)
+    @staticmethod
+    def _crt_decrypt(crt, ciphertext):
+        """Garner's algorithm: plaintext modulo r_1*...*r_i is extended by one prime at a time"""
+        plaintext = 0
+        for prime, exponent, coefficient, modulus in crt:
+            residue = gmpy2.powmod(ciphertext, exponent, prime)
+            plaintext += modulus * ((residue - plaintext % prime) * coefficient % prime)
+        return long(plaintext)
 
     def encrypt(self, plaintext):
         """Raw encryption
@@ -66,10 +413,19 @@ class RSAKey:
             except:
                 log.critical_error(
                     "Plaintext to decrypt must be number or be convertible to number ({})".format(plaintext))
-        return self.pyrsa_key.encrypt(int(plaintext), 0)[0]
+        engine = self._get_engine()
+        if plaintext < RSAKey._small_base_bound:
+            # constant bases (like 2 in parity attack) are encrypted over and over again
+            small_bases = engine['small_bases']
+            if plaintext not in small_bases:
+                if len(small_bases) >= RSAKey._small_bases_cache_size:
+                    small_bases.clear()
+                small_bases[plaintext] = long(gmpy2.powmod(plaintext, engine['e'], engine['n']))
+            return small_bases[plaintext]
+        return long(gmpy2.powmod(plaintext, engine['e'], engine['n']))
 
     def decrypt(self, ciphertext):
-        """Raw decryption
+        """Raw decryption (with multi-prime CRT, Garner's algorithm)
 
         Args: ciphertext(int/string)
         Returns: pow(ciphertext, d, n)
@@ -80,21 +436,40 @@ class RSAKey:
             except:
                 log.critical_error(
                     "Ciphertext to decrypt must be number or be convertible to number ({})".format(ciphertext))
-        return self.pyrsa_key.decrypt(int(ciphertext))
+        engine = self._get_engine()
+        if 'crt' not in engine:
+            log.critical_error("Private key not available in key {}".format(self.identifier))
+        return RSAKey._crt_decrypt(engine['crt'], ciphertext)
+
+    def encrypt_many(self, plaintexts):
+        """Raw encryption of many plaintexts
+
+        Args: plaintexts(list of ints/strings)
+        Returns: list of pow(plaintext,e,n)
+        """
+        engine = self._get_engine()
+        e, n = engine['e'], engine['n']
+        plaintexts = [x if isinstance(x, Number) else b2i(x) for x in plaintexts]
+        return [long(gmpy2.powmod(plaintext, e, n)) for plaintext in plaintexts]
+
+    def decrypt_many(self, ciphertexts):
+        """Raw decryption (with CRT) of many ciphertexts
+
+        Args: ciphertexts(list of ints/strings)
+        Returns: list of pow(ciphertext, d, n)
+        """
+        engine = self._get_engine()
+        if 'crt' not in engine:
+            log.critical_error("Private key not available in key {}".format(self.identifier))
+        crt = engine['crt']
+        return [RSAKey._crt_decrypt(crt, x if isinstance(x, Number) else b2i(x)) for x in ciphertexts]
 
     def copy(self, identifier=''):
-        if self.has_private():
-            tmp_key = RSAKey(self.n, self.e, self.d, self.p, self.q, identifier=identifier)
-        else:
-            tmp_key = RSAKey(self.n, self.e, identifier=identifier)
-        tmp_key.texts = deepcopy(self.texts)
-        return tmp_key
+        return self._derive(identifier)
 
     def publickey(self, identifier=''):
         """Extract public key"""
-        derived_public_key = RSAKey(self.n, self.e, identifier=identifier+' - publickey')
-        derived_public_key.texts = deepcopy(self.texts)
-        return derived_public_key
+        return self._derive(identifier+' - publickey', private=False)
 
     def has_private(self):
         return any([self.d, self.p, self.q])
@@ -110,9 +485,9 @@ class RSAKey:
             except:
                 log.critical_error("Ciphertext to add must be number or be convertible to number ({})".format(ciphertext))
         if position is None:
-            self.texts.append({'cipher': ciphertext})
+            self._own_texts().add(ciphertext=ciphertext)
         else:
-            self.texts[position]['cipher'] = ciphertext
+            self._own_texts().set_cipher(position, ciphertext)
 
     def add_plaintext(self, plaintext, position=None):
         """Args:
@@ -125,9 +500,9 @@ class RSAKey:
             except:
                 log.critical_error("Plaintext to add must be number or be convertible to number ({})".format(plaintext))
         if position is None:
-            self.texts.append({'plain': plaintext})
+            self._own_texts().add(plaintext=plaintext)
         else:
-            self.texts[position]['plain'] = plaintext
+            self._own_texts().set_plain(position, plaintext)
 
     def add_text_pair(self, ciphertext=None, plaintext=None):
         """Args: ciphertext(int), plaintext(int)"""
@@ -135,31 +510,26 @@ class RSAKey:
             log.error("Can't add None ciphertext and None plaintext")
             return
 
-        text_pair = {}
-        if ciphertext:
-            if not isinstance(ciphertext, Number):
-                log.error("Ciphertext to add have to be number")
-            else:
-                text_pair['cipher'] = ciphertext
-        if plaintext:
-            if not isinstance(plaintext, Number):
-                log.error("Plaintext to add have to be number")
-            else:
-                text_pair['plain'] = plaintext
-        self.texts.append(text_pair)
+        if ciphertext and not isinstance(ciphertext, Number):
+            log.error("Ciphertext to add have to be number")
+            ciphertext = None
+        if plaintext and not isinstance(plaintext, Number):
+            log.error("Plaintext to add have to be number")
+            plaintext = None
+        self._own_texts().add(ciphertext or None, plaintext or None)
 
     def clear_texts(self):
         self.texts = []
 
     def print_texts(self):
         print("key {} texts:".format(self.identifier))
-        for pair in self.texts:
-            if 'cipher' in pair:
-                print("Ciphertext: {}".format(hex(pair['cipher'])), end=", ")
+        for ciphertext, plaintext in zip(*self._texts.export()):
+            if ciphertext is not None:
+                print("Ciphertext: {}".format(hex(ciphertext)), end=", ")
             else:
                 print("Ciphertext: null", end=", ")
-            if 'plain' in pair:
-                print("Plaintext: {} (\"{}\")".format(hex(pair['plain']), i2b(pair['plain'], size=self.size)))
+            if plaintext is not None:
+                print("Plaintext: {} (\"{}\")".format(hex(plaintext), i2b(plaintext, size=self.size)))
             else:
                 print("Plaintext: null")
 
@@ -185,20 +555,21 @@ class RSAKey:
         return RSAKey(tmp_key.n, tmp_key.e, tmp_key.d, tmp_key.p, tmp_key.q, identifier=identifier)
 
     @staticmethod
-    def construct(n, e=0x10001, d=None, p=None, q=None, identifier=None):
+    def construct(n, e=0x10001, d=None, p=None, q=None, identifier=None, primes=None):
         """Construct key
 
         Args:
             n(long): RSA modulus
             e(long): Public exponent
-            d(long): Private exponent (d). If key is private, one of d,p or q must be given
+            d(long): Private exponent (d). If key is private, one of d,p,q or primes must be given
             p(long): First factor of n
             q(long): Second factor of n
             identifier(string/None): unique identifier of key
+            primes(list/None): all (distinct) prime factors of n, for multi-prime keys
         Returns:
             RSAKey
         """
-        return RSAKey(n, e, d, p, q, identifier=identifier)
+        return RSAKey(n, e, d, p, q, identifier=identifier, primes=primes)
 
     @staticmethod
     def import_key(filename, identifier=None, *args, **kwargs):
@@ -223,57 +594,182 @@ class RSAKey:
         return self.pyrsa_key.exportKey(format, passphrase, pkcs)
 
 
+def _refine_factors(factors, divisor):
+    """Split every factor by its gcd with divisor"""
+    refined = []
+    for factor in factors:
+        common = gmpy2.gcd(factor, divisor)
+        if 1 < common < factor:
+            refined += [common, factor // common]
+        else:
+            refined.append(factor)
+    return refined
+
+
 def factors_from_d(n, e, d):
+    """Split n into primes with private exponent
+    e*d - 1 = b*2**s is a multiple of every r_i - 1, so for random g sequence g**b, g**(2*b), ... reaches 1
+    modulo different primes r_i at different steps and gcd(g**(b*2**j) - 1, n) splits them
+
+    Returns:
+        list: sorted prime factors of n
+    """
+    n = gmpy2.mpz(n)
     k = e * d - 1
-    while True:
+    s = power_of_two(k)
+    b = k >> s
+    factors, primes = [n], []
+    while factors:
         g = random.randint(2, n - 2)
-        b = k // (2**power_of_two(k))
-        while b < k:
-            gb = pow(g, b, n)
-            if gb != 1 and gb != n-1 and pow(gb, 2, n) == 1:
-                if gcd(gb-1, n) != 1:
-                    p = gcd(gb-1, n)
-                else:
-                    p = gcd(gb+1, n)
-                return p, n//p
-            b *= 2
+        factors = _refine_factors(factors, g)
+        x = gmpy2.powmod(g, b, n)
+        for _ in range(s):
+            if x == 1:
+                break
+            factors = _refine_factors(factors, x - 1)
+            x = x * x % n
+        if x != 1:
+            log.critical_error("d is not a private exponent for given n and e")
+        primes += [factor for factor in factors if gmpy2.is_prime(factor)]
+        factors = [factor for factor in factors if not gmpy2.is_prime(factor)]
+    return sorted(int(prime) for prime in primes)
 
 
 def get_mutable_texts(key, texts):
     if texts is None:
-        return [key_texts['cipher'] for key_texts in key.texts if 'cipher' in key_texts and 'plain' not in key_texts]
+        return key._texts.export(key._texts.indexes(cipher=True, plain=False))[0]
     return texts
 
 
-def small_e_msg(key, ciphertexts=None, max_times=100):
+_small_e_chunk_size = 2**16
+_small_e_filters_cache = {}
+
+
+def _small_e_filters(e, bound=2**12, amount=12):
+    """Small primes q for which only part of residues are e-th powers, computed once per e
+
+    Returns:
+        list: (q, set of e-th power residues mod q), most selective first
+    """
+    if (e, bound, amount) not in _small_e_filters_cache:
+        filters = []
+        for q in iter_primes(3, bound):
+            if gcd(e, q - 1) > 1:
+                filters.append((q, set(long(gmpy2.powmod(x, e, q)) for x in range(q))))
+        filters.sort(key=lambda f: len(f[1]) / float(f[0]))
+        _small_e_filters_cache[(e, bound, amount)] = filters[:amount]
+    return _small_e_filters_cache[(e, bound, amount)]
+
+
+def _small_e_msg_range(task):
+    """Find plaintexts for ciphertexts with k in [k_start, k_stop)
+    For every prime q, mask of k for which (c + k*n) mod q is e-th power residue is tiled over the range,
+    iroot is computed only for k allowed by all masks
+
+    Args:
+        task(tuple): ciphertexts as (text_no, ciphertext, masks mod q), n, e, primes q, k_start, k_stop
+
+    Returns:
+        list: (text_no, k, plaintext)
+    """
+    ciphertexts, n, e, primes, k_start, k_stop = task
+    length = k_stop - k_start
+    found = []
+    for text_no, ciphertext, allowed_masks in ciphertexts:
+        mask = (gmpy2.mpz(1) << length) - 1
+        for q, allowed in zip(primes, allowed_masks):
+            shift = k_start % q
+            rotated = (allowed >> shift) | ((allowed & ((1 << shift) - 1)) << (q - shift))
+            repeats = length // q + 1
+            mask &= rotated * (((gmpy2.mpz(1) << (q * repeats)) - 1) // ((1 << q) - 1))
+            if not mask:
+                break
+
+        k = gmpy2.bit_scan1(mask)
+        while k is not None:
+            msg, is_correct = gmpy2.iroot(ciphertext + (k_start + k) * n, e)
+            if is_correct:
+                found.append((text_no, k_start + k, long(msg)))
+                break
+            k = gmpy2.bit_scan1(mask, k + 1)
+    return found
+
+
+def small_e_msg(key, ciphertexts=None, max_times=100, processes=None):
     """If both e and plaintext are small, ciphertext may exceed modulus only a little
+    Range of k (ciphertext + k*n) is split into chunks, searched in process pool for all ciphertexts at once
+    k for which ciphertext + k*n is not e-th power modulo small primes are skipped without computing iroot,
+    for small max_times (less than one chunk) iroot is computed for every k
 
     Args:
         key(RSAKey): with small e, at least one ciphertext
         ciphertexts(list)
         max_times(int): how many times plaintext**e exceeded modulus maximally
+        processes(int/None): size of process pool, None for cpu count, 1 to run in current process
 
     Returns:
         list: recovered plaintexts
     """
     ciphertexts = get_mutable_texts(key, ciphertexts)
-    recovered = []
-    for ciphertext in ciphertexts:
+    n, e = gmpy2.mpz(key.n), gmpy2.mpz(key.e)
+
+    filters = _small_e_filters(long(key.e)) if max_times >= _small_e_chunk_size else []
+    primes = [q for q, _ in filters]
+    unsolved = {}
+    for text_no, ciphertext in enumerate(ciphertexts):
         log.debug("Find msg for ciphertext {}".format(ciphertext))
-        times = 0
-        for k in range(max_times):
-            msg, is_correct = gmpy2.iroot(ciphertext + times, key.e)
-            if is_correct and pow(msg, key.e, key.n) == ciphertext:
-                msg = int(msg)
-                log.success("Found msg: {}, times=={}".format(i2b(msg), times//key.n))
-                recovered.append(msg)
-                break
-            times += key.n
+        allowed_masks = []
+        for q, residues in filters:
+            c_q, n_q = ciphertext % q, n % q
+            allowed_masks.append(sum(1 << k for k in range(q) if (c_q + k * n_q) % q in residues))
+        unsolved[text_no] = (text_no, gmpy2.mpz(ciphertext), allowed_masks)
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    pool = None
+    if processes > 1 and max_times > _small_e_chunk_size:
+        pool = multiprocessing.Pool(processes)
+
+    found = {}
+    start = time.time()
+    k_start = 0
+    try:
+        while unsolved and k_start < max_times:
+            tasks = []
+            for _ in range(processes if pool is not None else 1):
+                if k_start >= max_times:
+                    break
+                k_stop = min(k_start + _small_e_chunk_size, max_times)
+                tasks.append((list(unsolved.values()), n, e, primes, k_start, k_stop))
+                k_start = k_stop
+            results = pool.imap_unordered(_small_e_msg_range, tasks) if pool is not None \
+                else (_small_e_msg_range(task) for task in tasks)
+
+            for result in results:
+                for text_no, k, msg in result:
+                    if text_no not in found or found[text_no][0] > k:
+                        found[text_no] = (k, msg)
+                    unsolved.pop(text_no, None)
+                if not unsolved:
+                    break
+            log.debug("k < {} checked, {:.0f} k/s".format(k_start, k_start * len(ciphertexts) /
+                                                           max(time.time() - start, 1e-6)))
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    recovered = []
+    for text_no in sorted(found):
+        k, msg = found[text_no]
+        log.success("Found msg: {}, times=={}".format(i2b(msg), k))
+        recovered.append(msg)
     return recovered
 
 
 def common_primes(keys):
     """Find common prime in keys modules
+    Modules are split by gcds with all other modules, so multi-prime keys sharing several primes are factored too
 
     Args:
         keys(list): RSAKeys
@@ -281,23 +777,110 @@ def common_primes(keys):
     Returns:
         list: RSAKeys for which factorization of n was found
     """
+    factors = [[gmpy2.mpz(key.n)] for key in keys]
+    found = []
+    for i, j in itertools.combinations(range(len(keys)), 2):
+        common = gmpy2.gcd(keys[i].n, keys[j].n)
+        if common != 1:
+            log.success("Found common prime in: {}, {}".format(keys[i].identifier, keys[j].identifier))
+            for key_no in [i, j]:
+                factors[key_no] = _refine_factors(factors[key_no], common)
+                if key_no not in found:
+                    found.append(key_no)
+
     priv_keys = []
-    for pair in itertools.combinations(keys, 2):
-        prime = gmpy2.gcd(pair[0].n, pair[1].n)
-        if prime != 1:
-            log.success("Found common prime in: {}, {}".format(pair[0].identifier, pair[1].identifier))
-            for key_no in range(2):
-                if pair[key_no] not in priv_keys:
-                    d = int(invmod(pair[key_no].e, (prime - 1) * (pair[key_no].n / prime - 1)))
-                    new_key = RSAKey.construct(int(pair[key_no].n), int(pair[key_no].e), int(d),
-                                               identifier=pair[key_no].identifier + '-private')
-                    new_key.texts = pair[key_no].texts[:]
-                    priv_keys.append(new_key)
-                else:
-                    log.debug("Key {} already in priv_keys".format(pair[key_no].identifier))
+    for key_no in found:
+        key = keys[key_no]
+        if not all(gmpy2.is_prime(factor) for factor in factors[key_no]):
+            log.info("Found factors {} of {}, but n is not fully factored".format(factors[key_no], key.identifier))
+            continue
+        new_key = RSAKey.construct(int(key.n), int(key.e), identifier=key.identifier + '-private',
+                                   primes=[int(factor) for factor in factors[key_no]])
+        new_key._share_texts(key)
+        priv_keys.append(new_key)
     return priv_keys
 
 
+def ecm_factor(keys, B1=11000, B2=None, curves=100, processes=None):
+    """Factor keys modules with elliptic curve method, works when one of the primes is small
+    (unbalanced or multi-prime RSA). Found factors are checked against all keys
+
+    Args:
+        keys(list): RSAKeys
+        B1(int): stage 1 bound
+        B2(int/None): stage 2 bound, 100*B1 if None
+        curves(int): maximum amount of curves per key
+        processes(int/None): size of process pool, None for cpu count
+
+    Returns:
+        list: RSAKeys for which factorization of n was found
+    """
+    priv_keys = []
+    found_primes = []
+    for key in keys:
+        factors = [gmpy2.mpz(key.n)]
+        for found_prime in found_primes:
+            if key.n % found_prime == 0:
+                log.debug("Reusing prime {} for {}".format(found_prime, key.identifier))
+                factors = _refine_factors(factors, found_prime)
+
+        # ecm is repeated on composite factors, multi-prime modules are split completely
+        composite = [factor for factor in factors if not gmpy2.is_prime(factor)]
+        while composite:
+            log.info("Running ecm on {} ({} bits factor)".format(key.identifier, gmpy2.bit_length(composite[0])))
+            prime = ecm(composite[0], B1=B1, B2=B2, curves=curves, processes=processes)
+            if prime is None:
+                break
+            found_primes.append(prime)
+            found_primes.append(composite[0] // prime)
+            factors = _refine_factors(factors, prime)
+            composite = [factor for factor in factors if not gmpy2.is_prime(factor)]
+
+        if composite or len(factors) < 2:
+            log.info("Found factors {} of {}, but n is not fully factored".format(factors, key.identifier))
+            continue
+        log.success("Found primes {} in {}".format(factors, key.identifier))
+        new_key = RSAKey.construct(int(key.n), int(key.e), identifier=key.identifier + '-private',
+                                   primes=[int(factor) for factor in factors])
+        new_key._share_texts(key)
+        priv_keys.append(new_key)
+    return priv_keys
+
+
+def siqs_factor(key, factor_base_size=None, sieve_size=None, processes=None, max_polynomials=None):
+    """Factor small modulus (up to ~330 bits) with self-initializing quadratic sieve, requires numpy
+
+    Args:
+        key(RSAKey): public key
+        factor_base_size(int/None): amount of primes in factor base, None for default by size of n
+        sieve_size(int/None): half of sieve interval, None for default by size of n
+        processes(int/None): size of process pool, None for cpu count
+        max_polynomials(int/None): give up after sieving that many polynomials, None for default
+
+    Returns:
+        NoneType/RSAKey: None if didn't factor n, private key otherwise
+    """
+    log.info("Running siqs on {}".format(key.identifier))
+    prime = siqs(key.n, factor_base_size=factor_base_size, sieve_size=sieve_size, processes=processes,
+                 max_polynomials=max_polynomials)
+    if prime is None:
+        return None
+    log.success("Found prime {} in {}".format(prime, key.identifier))
+    new_key = RSAKey.construct(int(key.n), int(key.e), p=int(prime), identifier=key.identifier + '-private')
+    new_key._share_texts(key)
+    return new_key
+
+
+def _wiener_check(n, e, k, d):
+    """Check if k/d gives factorization of n: phi = (e*d - 1)/k, p**2 - p*(n - phi + 1) + n == 0"""
+    if k == 0 or (e * d - 1) % k != 0:
+        return False
+    phi = (e * d - 1) // k
+    b = n - phi + 1
+    delta = b * b - 4 * n
+    return delta > 0 and b % 2 == 0 and gmpy2.is_square(delta)
+
+
 def wiener(key):
     """Wiener small private exponent attack
      If d < (1/3)*(N**(1/4)), d can be effectively recovered using continuous fractions
@@ -308,23 +891,98 @@ def wiener(key):
     Returns:
         NoneType/RSAKey: None if didn't break key, private key otherwise
     """
-    en_fractions = continued_fractions(key.e, key.n)
-    for k, d in convergents(en_fractions):
-        if k != 0 and (key.e * d - 1) % k == 0:
-            phi = (key.e * d - 1) // k
-            """ p**2 - p*(n - phi + 1) + n == 0 """
-            b = key.n - phi + 1
-            delta = b * b - 4 * key.n
-            if delta > 0:
-                sqrt_delta = gmpy2.isqrt(delta)
-                if sqrt_delta * sqrt_delta == delta and sqrt_delta % 2 == 0:
-                    log.debug("Found private key (d={}) for {}".format(d, key.identifier))
-                    new_key = RSAKey.construct(key.n, key.e, d, identifier=key.identifier + '-private')
-                    new_key.texts = key.texts[:]
-                    return new_key
+    n, e = gmpy2.mpz(key.n), gmpy2.mpz(key.e)
+    for k, d in convergents(iter_continued_fractions(e, n)):
+        if _wiener_check(n, e, k, d):
+            log.debug("Found private key (d={}) for {}".format(d, key.identifier))
+            new_key = RSAKey.construct(key.n, key.e, int(d), identifier=key.identifier + '-private')
+            new_key._share_texts(key)
+            return new_key
     return None
 
 
+def _wiener_extended_task(task):
+    """Check k/d = (r*k1 +- s*k0)/(r*d1 +- s*d0) for r > 0, s >= 0, r*s < bound, gcd(r, s) == 1
+
+    Args:
+        task(tuple): n, e, (k0, d0), (k1, d1) consecutive convergents of e/n, bound
+
+    Returns:
+        NoneType/int: d if found
+    """
+    n, e, (k0, d0), (k1, d1), bound = task
+    for r in range(1, bound):
+        k_r, d_r = r * k1, r * d1
+        for s in range(0, (bound - 1) // r + 1):
+            if gmpy2.gcd(r, s) != 1:
+                continue
+            for k, d in [(k_r + s * k0, d_r + s * d0), (k_r - s * k0, d_r - s * d0)]:
+                if k > 0 and d > 0 and _wiener_check(n, e, k, d):
+                    return long(d)
+    return None
+
+
+def wiener_extended(key, bits=2, processes=None):
+    """Extended Wiener attack (Verheul-van Tilborg, Dujella)
+    If d = 2**bits * N**(1/4), |e/N - k/d| < c/d**2 with c about 3 * 4**bits, k/d is not a convergent of e/N, but
+    k/d = (r*k_(m+1) +- s*k_m)/(r*d_(m+1) +- s*d_m) with r*s < 2*c
+    Every convergent of e/N with denominator near N**(1/4) costs about 12 * 4**bits * log(6 * 4**bits) checks
+    (4 times more per bit), convergents are checked in process pool
+    Bound for r*s assumes balanced primes (q < p < 2q)
+
+    Args:
+        key(RSAKey): public rsa key to break
+        bits(int): d may be up to 2**bits times larger than in Wiener attack
+        processes(int/None): size of process pool, None for cpu count, 1 to run in current process
+
+    Returns:
+        NoneType/RSAKey: None if didn't break key, private key otherwise
+    """
+    private_key = wiener(key)
+    if private_key is not None:
+        return private_key
+
+    n, e = gmpy2.mpz(key.n), gmpy2.mpz(key.e)
+    bound = 6 * 4**bits
+    root = gmpy2.iroot(n, 4)[0]
+    lower, upper = root // (6 * bound), root << (bits + 2)
+
+    def tasks():
+        previous = [(0, 1), (1, 0)]
+        for convergent in convergents(iter_continued_fractions(e, n)):
+            # denominators only grow, further convergents give too large d
+            if previous[0][1] > upper:
+                return
+            if convergent[1] >= lower:
+                yield n, e, previous[1], convergent, bound
+            previous = [previous[1], convergent]
+
+    if processes == 1:
+        results = (_wiener_extended_task(task) for task in tasks())
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes)
+        results = pool.imap_unordered(_wiener_extended_task, tasks())
+
+    d = None
+    try:
+        for result in results:
+            if result is not None:
+                d = result
+                break
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    if d is None:
+        return None
+    log.debug("Found private key (d={}) for {}".format(d, key.identifier))
+    new_key = RSAKey.construct(key.n, key.e, int(d), identifier=key.identifier + '-private')
+    new_key._share_texts(key)
+    return new_key
+
+
 def hastad(keys, ciphertexts=None):
     """Hastad's broadcast attack (small public exponent)
     Given at least e keys with public exponent equals to e and ciphertexts of the same plaintext,
@@ -345,20 +1003,20 @@ def hastad(keys, ciphertexts=None):
 
     if ciphertexts is None:
         for key in keys:
-            if len(key.texts) != 1:
+            if len(key._texts) != 1:
                 log.info("Key have more than one ciphertext, using the first one(key=={})".format(key.identifier))
-            if 'cipher' not in key.texts[0]:
+            if key._texts.cipher(0) is None:
                 log.critical_error("key {} doesn't have ciphertext".format(key.identifier))
 
         # prepare ciphertexts and correct_keys lists
         ciphertexts, modules, correct_keys = [], [], []
         for key in keys:
             # get only first ciphertext (if exists)
-            if key.n not in modules and key.texts[0]['cipher'] not in ciphertexts:
+            if key.n not in modules and key._texts.cipher(0) not in ciphertexts:
                 if key.e == e:
                     modules.append(key.n)
                     correct_keys.append(key)
-                    ciphertexts.append(key.texts[0]['cipher'])
+                    ciphertexts.append(key._texts.cipher(0))
                 else:
                     log.info("Key {} have different e(={})".format(key.identifier, key.e))
     else:
@@ -389,7 +1047,7 @@ def hastad(keys, ciphertexts=None):
         plaintext = int(plaintext)
         log.success("Found plaintext: {}".format(plaintext))
         for one_key in correct_keys:
-            one_key.texts[0]['plain'] = plaintext
+            one_key.texts.set_plain(0, plaintext)
         return plaintext
     else:
         log.debug("Plaintext wasn't {}-th root")
@@ -398,6 +1056,335 @@ def hastad(keys, ciphertexts=None):
         return None
 
 
+def hastad_linear(keys, paddings, ciphertexts=None, message_bits=None, epsilon=None):
+    """Hastad's broadcast attack with linear padding: c_i = (a_i*m + b_i)**e_i % n_i
+    Polynomials (a_i*x + b_i)**e_i - c_i are made monic, multiplied by x**(max(e_i) - e_i) and combined with crt,
+    small root m of the combined polynomial modulo product of modules is found with Coppersmith method
+    Works if m < (n_1*n_2*...)**(1/max(e_i)), so usually more than e keys are needed for full size messages
+
+    Args:
+        keys(list): RSAKeys, every key with only one ciphertext
+        paddings(list): (a_i, b_i) for every key
+        ciphertexts(list/None): if not None, use this ciphertexts (and don't update texts)
+        message_bits(int/None): upper bound for message size, min of modules if None
+        epsilon(float/None): Coppersmith parameter, see Lattice.small_roots
+
+    Returns:
+        NoneType/int: None on failure, recovered plaintext otherwise
+        update keys texts (with padded plaintexts)
+    """
+    if len(paddings) != len(keys):
+        log.critical_error("len(paddings) != len(keys)")
+    update = ciphertexts is None
+    if update:
+        for key in keys:
+            if key._texts.cipher(0) is None:
+                log.critical_error("key {} doesn't have ciphertext".format(key.identifier))
+        ciphertexts = [key._texts.cipher(0) for key in keys]
+    elif len(ciphertexts) != len(keys):
+        log.critical_error("len(ciphertexts) != len(keys)")
+
+    def update_texts(plaintext):
+        log.success("Found plaintext: {}".format(plaintext))
+        if update:
+            for key, (a, b) in zip(keys, paddings):
+                key.texts.set_plain(0, int((a * plaintext + b) % key.n))
+        return plaintext
+
+    degree = max(key.e for key in keys)
+    modulus = reduce(operator.mul, [gmpy2.mpz(key.n) for key in keys])
+    polynomial = [0] * (degree + 1)
+    for key, (a, b), ciphertext in zip(keys, paddings, ciphertexts):
+        n, e = gmpy2.mpz(key.n), long(key.e)
+        if a % n == 0:
+            log.critical_error("Padding of {} doesn't depend on message".format(key.identifier))
+        if gmpy2.gcd(a, n) != 1:
+            p = gmpy2.gcd(a, n)
+            log.info("Padding shares factor with modulus of {}".format(key.identifier))
+            d = invmod(e, (p - 1) * (n // p - 1))
+            padded = gmpy2.powmod(ciphertext, d, n)
+            if (padded - b) % a != 0:
+                return None
+            return update_texts(long((padded - b) // a))
+
+        # (x + b/a)**e - c/a**e
+        shift = b * invmod(a, n) % n
+        f = [gmpy2.bincoef(e, i) * gmpy2.powmod(shift, e - i, n) % n for i in range(e + 1)]
+        f[0] = (f[0] - ciphertext * invmod(gmpy2.powmod(a, e, n), n)) % n
+        cofactor = modulus // n
+        coefficient = cofactor * invmod(cofactor, n)
+        for i, c in enumerate(f):
+            polynomial[i + degree - e] = (polynomial[i + degree - e] + coefficient * c) % modulus
+
+    bound = 2**message_bits if message_bits is not None else min(key.n for key in keys)
+    roots = small_roots(polynomial, modulus, bound=bound, epsilon=epsilon)
+    roots = [x for x in roots if x >= 0]
+    if not roots:
+        log.debug("No small root found")
+        return None
+    return update_texts(roots[0])
+
+
+def stereotyped_message(key, known, unknown_bits, unknown_offset=0, ciphertexts=None, epsilon=None):
+    """Stereotyped messages: plaintext is known except for unknown_bits bits starting at unknown_offset
+    Small root x of (known + 2**unknown_offset * x)**e - c modulo n is found with Coppersmith method,
+    it works if unknown_bits < log2(n)/e
+
+    Args:
+        key(RSAKey): with small e
+        known(int): plaintext with unknown bits set to zero
+        unknown_bits(int)
+        unknown_offset(int): position of the lowest unknown bit
+        ciphertexts(list/None): if not None, use this ciphertexts instead of key's ones (and don't update texts)
+        epsilon(float/None): Coppersmith parameter, see Lattice.small_roots
+
+    Returns:
+        list: recovered plaintexts
+        update key texts
+    """
+    if ciphertexts is None:
+        indexes = key._texts.indexes(cipher=True, plain=False)
+        ciphertexts = key._texts.export(indexes)[0]
+    else:
+        indexes = [None] * len(ciphertexts)
+
+    n, e = gmpy2.mpz(key.n), long(key.e)
+    step = gmpy2.mpz(2)**unknown_offset
+    # (known + step*x)**e
+    expansion = [gmpy2.bincoef(e, i) * gmpy2.powmod(known, e - i, n) * gmpy2.powmod(step, i, n) % n
+                 for i in range(e + 1)]
+    recovered = []
+    for text_no, ciphertext in zip(indexes, ciphertexts):
+        f = [(expansion[0] - ciphertext) % n] + expansion[1:]
+        roots = [x for x in small_roots(f, n, bound=2**unknown_bits, epsilon=epsilon) if x >= 0]
+        if not roots:
+            log.info("Plaintext not found for ciphertext {}".format(ciphertext))
+            continue
+        plaintext = int(known + step * roots[0])
+        log.success("Found plaintext: {}".format(plaintext))
+        if text_no is not None:
+            key.texts.set_plain(text_no, plaintext)
+        recovered.append(plaintext)
+    return recovered
+
+
+def _factor_roots_mod_power_of_two(n, s, bits):
+    """Roots of p**2 - s*p + n modulo 2**bits (candidates for p % 2**bits), lifted bit by bit"""
+    roots = [1]
+    for i in range(2, bits + 1):
+        modulus = 2**i
+        roots = [x for x in roots + [x + modulus // 2 for x in roots] if (x * x - s * x + n) % modulus == 0]
+    return roots
+
+
+def partial_key_exposure(key, d_low, bits, epsilon=None):
+    """Boneh-Durfee-Frankel partial key exposure attack (small e)
+    Given bits >= log2(n)/4 lowest bits of d, p mod 2**bits is found from e*d - k*(n - p - q + 1) = 1
+    (for every k < e), the rest of p with Coppersmith method (factoring with known low bits of p)
+    Cost grows linearly with e
+
+    Args:
+        key(RSAKey): public rsa key to break
+        d_low(int): d % 2**bits
+        bits(int): amount of known bits of d
+        epsilon(float/None): Coppersmith parameter, see Lattice.small_roots
+
+    Returns:
+        NoneType/RSAKey: None if didn't break key, private key otherwise
+    """
+    n, e = gmpy2.mpz(key.n), gmpy2.mpz(key.e)
+    half_bits = (n.bit_length() + 1) // 2
+    tried = set()
+    for k in range(1, int(e)):
+        # k*s = 1 + k*(n + 1) - e*d_low mod 2**bits, s = p + q
+        zeros = power_of_two(k)
+        right = (1 + k * (n + 1) - e * d_low) % 2**bits
+        if right % 2**zeros != 0:
+            continue
+        t = bits - zeros
+        s = (right >> zeros) * invmod(k >> zeros, 2**t) % 2**t
+        for p_low in _factor_roots_mod_power_of_two(n, s, t):
+            if (p_low, t) in tried:
+                continue
+            tried.add((p_low, t))
+            if t >= half_bits:
+                roots = [0]
+            else:
+                # p = p_low + 2**t * x, monic: x + p_low / 2**t
+                roots = small_roots([p_low * invmod(2**t, n) % n, 1], n, bound=2**(half_bits - t), beta=0.49,
+                                    epsilon=epsilon)
+            for x in roots:
+                p = p_low + 2**t * x
+                if 1 < p < n and n % p == 0:
+                    d = invmod(e, (p - 1) * (n // p - 1))
+                    log.debug("Found private key (d={}) for {}".format(d, key.identifier))
+                    new_key = RSAKey.construct(key.n, key.e, int(d), identifier=key.identifier + '-private')
+                    new_key._share_texts(key)
+                    return new_key
+    return None
+
+
+def franklin_reiter(key, padding, ciphertexts=None):
+    """Franklin-Reiter related message attack
+    If m2 = a*m1 + b, m1 is a common root of x**e - c1 and (a*x + b)**e - c2, so (usually) their gcd modulo n
+    is x - m1. Gcd is computed with half-gcd in O(M(e)*log(e)), M(e) is cost of multiplication of degree e polynomials
+
+    Args:
+        key(RSAKey): public rsa key
+        padding(tuple): (a, b), m2 = a*m1 + b
+        ciphertexts(list/None): [c1, c2], if None two first key's ciphertexts without plaintexts are used
+                                (and texts are updated)
+
+    Returns:
+        NoneType/int: None on failure, m1 otherwise
+    """
+    if ciphertexts is None:
+        indexes = key._texts.indexes(cipher=True, plain=False)[:2]
+        if len(indexes) < 2:
+            log.critical_error("Key {} doesn't have two ciphertexts without plaintexts".format(key.identifier))
+        ciphertexts = key._texts.export(indexes)[0]
+    else:
+        indexes = None
+    n, e = gmpy2.mpz(key.n), long(key.e)
+    a, b = gmpy2.mpz(padding[0]) % n, gmpy2.mpz(padding[1]) % n
+    c1, c2 = [gmpy2.mpz(ciphertext) for ciphertext in ciphertexts]
+
+    # (a*x + b)**e, binomial coefficients computed modulo n
+    inverses = batch_invmod(list(range(1, e + 1)), n)
+    b_powers = [gmpy2.mpz(1)]
+    for _ in range(e):
+        b_powers.append(b_powers[-1] * b % n)
+    related, binomial, a_power = [], gmpy2.mpz(1), gmpy2.mpz(1)
+    for i in range(e + 1):
+        related.append(binomial * a_power % n * b_powers[e - i] % n)
+        if i < e:
+            binomial = binomial * (e - i) % n * inverses[i] % n
+            a_power = a_power * a % n
+    related[0] = (related[0] - c2) % n
+
+    start = time.time()
+    divisor = poly_gcd(poly([-c1] + [0] * (e - 1) + [1], n), poly(related, n), n)
+    log.debug("Polynomial gcd (degree {}) in {:.2f}s".format(e, time.time() - start))
+    if poly_degree(divisor) != 1:
+        log.info("Gcd of polynomials has degree {}".format(poly_degree(divisor)))
+        return None
+
+    plaintext = int(-divisor[0] % n)
+    log.success("Found plaintext: {}".format(plaintext))
+    if indexes is not None:
+        key.texts.set_plain(indexes[0], plaintext)
+        key.texts.set_plain(indexes[1], int((a * plaintext + b) % n))
+    return plaintext
+
+
+def _fault_factor(values, n):
+    """Find value sharing a factor with n, with one gcd for the whole list
+    Products of values are computed in product tree modulo n, the tree is descended only if gcd of the root is not 1
+
+    Args:
+        values(list): nonzero modulo n
+        n(int)
+
+    Returns:
+        NoneType/tuple: None if all values are coprime to n, (index of value, factor) otherwise
+    """
+    if not values:
+        return None
+    tree = product_tree(values, modulus=n)
+    if gmpy2.gcd(tree[-1][0], n) == 1:
+        return None
+    # product of children is not coprime with n, so one of them isn't either
+    index = 0
+    for level in reversed(tree[:-1]):
+        index *= 2
+        if index + 1 < len(level) and gmpy2.gcd(level[index], n) == 1:
+            index += 1
+    return index, gmpy2.gcd(tree[0][index], n)
+
+
+def _fault_search(values, n, batch_size, stats):
+    """Check (tag, value % n) pairs in batches with _fault_factor, zero values are counted and skipped
+
+    Returns:
+        NoneType/tuple: None if no value shares factor with n, (tag, factor) otherwise
+    """
+    values = iter(values)
+    while True:
+        batch = list(itertools.islice(values, batch_size))
+        if not batch:
+            return None
+        nonzero = [(tag, value) for tag, value in batch if value]
+        stats['values'] += len(batch)
+        stats['zero'] += len(batch) - len(nonzero)
+        found = _fault_factor([value for _, value in nonzero], n)
+        if found is not None:
+            return nonzero[found[0]][0], found[1]
+
+
+def iter_signatures(path):
+    """Yield (signature, message) pairs from file, one pair per line as hex numbers separated by whitespace
+    Empty lines and lines starting with # are skipped
+
+    Args:
+        path(string)
+
+    Returns:
+        generator: (int, int)
+    """
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                signature, message = line.split()[:2]
+                yield int(signature, 16), int(message, 16)
+
+
+def faulty_scan(key, signatures, padding=None, batch_size=4096):
+    """Scan many signatures of known messages for RSA-CRT faults (see faulty)
+    Pairs are streamed in batches, for every pair s**e - padding(m) mod n is computed
+    and whole batch is checked with one gcd (product tree modulo n), scanning stops at first faulty signature
+
+    Args:
+        key(RSAKey): public key
+        signatures(iterable/string): (signature, message) pairs or file with them (see iter_signatures)
+        padding(None/function): function used before signing message
+        batch_size(int): amount of signatures checked with one gcd
+
+    Returns:
+        NoneType/RSAKey: None if no faulty signature found, recovered private key otherwise
+        dict: stats, amount of signatures and valid signatures, index of faulty one (or None),
+              time and signatures per second
+    """
+    if isinstance(signatures, str):
+        signatures = iter_signatures(signatures)
+    n, e = gmpy2.mpz(key.n), gmpy2.mpz(key.e)
+
+    def values():
+        for index, (signature, message) in enumerate(signatures):
+            if padding:
+                message = padding(message)
+            yield index, (gmpy2.powmod(signature, e, n) - message) % n
+
+    counters = {'values': 0, 'zero': 0}
+    start = time.time()
+    found = _fault_search(values(), n, batch_size, counters)
+    elapsed = time.time() - start
+
+    stats = {'signatures': counters['values'], 'valid': counters['zero'], 'faulty': None, 'seconds': elapsed,
+             'signatures_per_second': counters['values'] / elapsed if elapsed else None}
+    log.info("Scanned {} signatures ({} valid) in {:.2f}s, {} signatures/s".format(
+        stats['signatures'], stats['valid'], elapsed,
+        '{:.1f}'.format(stats['signatures_per_second']) if stats['signatures_per_second'] else '-'))
+    if found is None:
+        return None, stats
+
+    stats['faulty'], p = found
+    log.info("Found p={} (signature no {})".format(p, stats['faulty']))
+    new_key = RSAKey.construct(key.n, key.e, p=int(p), identifier=key.identifier + '-private')
+    new_key._share_texts(key)
+    return new_key, stats
+
+
 def faulty(key, padding=None):
     """Faulty attack against crt-rsa, Boneh-DeMillo-Lipton
     sp = padding(m)**(d % p-1) % p
@@ -416,28 +1403,22 @@ def faulty(key, padding=None):
         NoneType/RSAKey: False on failure, recovered private key otherwise
     """
     log.debug("Check signature-message pairs")
-    for pair in key.texts:
-        if 'plain' in pair and 'cipher' in pair:
-            signature = gmpy2.mpz(pair['cipher'])
-            message = pair['plain']
-            if padding:
-                message = padding(message)
-            p = gmpy2.gcd(pow(signature, key.e) - message, key.n)
-            if p != 1 and p != key.n:
-                log.info("Found p={}".format(p))
-                new_key = RSAKey.construct(key.n, key.e, p=p, identifier=key.identifier + '-private')
-                new_key.texts = key.texts[:]
-                return new_key
+    signatures, messages = key._texts.export(key._texts.indexes(cipher=True, plain=True))
+    new_key, _ = faulty_scan(key, zip(signatures, messages), padding=padding)
+    if new_key is not None:
+        return new_key
 
     log.debug("Check for valid-invalid signatures")
-    signatures = [tmp['cipher'] for tmp in key.texts if 'cipher' in tmp]
-    for pair in itertools.combinations(signatures, 2):
-        p = gmpy2.gcd(pair[0] - pair[1], key.n)
-        if p != 1 and p != key.n:
-            log.info("Found p={}".format(p))
-            new_key = RSAKey.construct(key.n, key.e, p=p, identifier=key.identifier + '-private')
-            new_key.texts = key.texts[:]
-            return new_key
+    n = gmpy2.mpz(key.n)
+    signatures = [gmpy2.mpz(signature) for signature in key._texts.export(key._texts.indexes(cipher=True))[0]]
+    differences = ((None, (pair[0] - pair[1]) % n) for pair in itertools.combinations(signatures, 2))
+    found = _fault_search(differences, n, 4096, {'values': 0, 'zero': 0})
+    if found is not None:
+        p = found[1]
+        log.info("Found p={}".format(p))
+        new_key = RSAKey.construct(key.n, key.e, p=int(p), identifier=key.identifier + '-private')
+        new_key._share_texts(key)
+        return new_key
     return None
 
 
@@ -453,13 +1434,107 @@ def parity_oracle(ciphertext):
     raise NotImplementedError
 
 
-def parity(parity_oracle, key):
+def lsb_oracle(ciphertext):
+    """Function implementing least significant bits oracle
+
+    Args:
+        ciphertext(int)
+
+    Returns:
+        int: k least significant bits of decrypted ciphertext
+    """
+    raise NotImplementedError
+
+
+def half_oracle(ciphertext):
+    """Function implementing half oracle
+
+    Args:
+        ciphertext(int)
+
+    Returns:
+        int: 0 (if decrypted ciphertext < n/2) or 1 (otherwise)
+    """
+    raise NotImplementedError
+
+
+def _interval_decrypt(oracle, key, cipher, bits=1, half=False):
+    """Decrypt one ciphertext with lsb/half oracle
+    Every query multiplies plaintext by 2**bits and reveals base-2**bits digit of plaintext/n
+    Interval is kept as [(upper - n) / 2**k, upper / 2**k), so every step costs only shift and subtraction
+
+    Returns:
+        plaintext(int), oracle_calls(int)
+    """
+    n = gmpy2.mpz(key.n)
+    base = 1 << bits
+    n_inverted = gmpy2.invert(n, base) if base > 2 else 1
+    multiplier = key.encrypt(base)
+    cipher = gmpy2.mpz(cipher)
+
+    counter = calls = 0
+    upper = n
+    while True:
+        lower_bound, upper_bound = (upper - n) >> counter, upper >> counter
+        log.debug("{} [{}, {}]".format(counter, lower_bound, upper_bound))
+        if lower_bound + 1 >= upper_bound:
+            break
+        if half:
+            digit = 1 if oracle(long(cipher)) else 0
+            cipher = (multiplier * cipher) % n
+        else:
+            cipher = (multiplier * cipher) % n
+            # low bits of (2**counter * plaintext - t*n) are -t*n, digit is t % base
+            digit = (-oracle(long(cipher)) * n_inverted) % base
+        calls += 1
+        counter += bits
+        upper = (upper << bits) - n * (base - 1 - digit)
+    return long(upper_bound), calls
+
+
+def _interval_attack(oracle, key, bits=1, half=False, concurrency=1):
+    """Decrypt all ciphertexts without plaintexts in key.texts with _interval_decrypt"""
+    to_decrypt = key._texts.indexes(cipher=True, plain=False)
+
+    def decrypt_one(text_no):
+        log.info("Decrypting {}".format(key._texts.cipher(text_no)))
+        return _interval_decrypt(oracle, key, key._texts.cipher(text_no), bits=bits, half=half)
+
+    cpu_start = sum(os.times()[:2])
+    if concurrency > 1 and len(to_decrypt) > 1:
+        pool = ThreadPool(min(concurrency, len(to_decrypt)))
+        try:
+            results = pool.map(decrypt_one, to_decrypt)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [decrypt_one(text_no) for text_no in to_decrypt]
+    cpu_time = sum(os.times()[:2]) - cpu_start
+
+    recovered = {}
+    oracle_calls = 0
+    for text_no, (plaintext, calls) in zip(to_decrypt, results):
+        log.success("Decrypted: {}".format(i2h(plaintext)))
+        key.texts.set_plain(text_no, plaintext)
+        recovered[text_no] = plaintext
+        oracle_calls += calls
+
+    if oracle_calls:
+        decrypted_bits = float(len(to_decrypt) * key.n.bit_length())
+        log.info("{} oracle calls, {:.2f} calls and {:.6f}s CPU per decrypted bit".format(
+            oracle_calls, oracle_calls / decrypted_bits, cpu_time / decrypted_bits))
+    return recovered
+
+
+def parity(parity_oracle, key, concurrency=1):
     """Given oracle that returns LSB of decrypted ciphertext we can decrypt whole ciphertext
     parity_oracle function must be implemented
 
     Args:
         parity_oracle(callable)
         key(RSAKey): contains ciphertexts to decrypt
+        concurrency(int): amount of ciphertexts decrypted at once (in threads, against the same oracle)
 
     Returns:
         dict: decrypted ciphertexts
@@ -469,34 +1544,384 @@ def parity(parity_oracle, key):
         parity_oracle(1)
     except NotImplementedError:
         log.critical_error("Parity oracle not implemented")
+    return _interval_attack(parity_oracle, key, bits=1, concurrency=concurrency)
+
+
+def lsb(lsb_oracle, key, bits=8, concurrency=1):
+    """Given oracle that returns k least significant bits of decrypted ciphertext we can decrypt
+    whole ciphertext with ~log2(n)/k queries
+    lsb_oracle function must be implemented
+
+    Args:
+        lsb_oracle(callable)
+        key(RSAKey): contains ciphertexts to decrypt
+        bits(int): amount of bits returned by oracle
+        concurrency(int): amount of ciphertexts decrypted at once (in threads, against the same oracle)
+
+    Returns:
+        dict: decrypted ciphertexts
+        update key texts
+    """
+    try:
+        lsb_oracle(1)
+    except NotImplementedError:
+        log.critical_error("Lsb oracle not implemented")
+    return _interval_attack(lsb_oracle, key, bits=bits, concurrency=concurrency)
+
+
+def half(half_oracle, key, concurrency=1):
+    """Given oracle that tells if decrypted ciphertext is smaller than n/2 we can decrypt whole ciphertext
+    half_oracle function must be implemented
+
+    Args:
+        half_oracle(callable)
+        key(RSAKey): contains ciphertexts to decrypt
+        concurrency(int): amount of ciphertexts decrypted at once (in threads, against the same oracle)
+
+    Returns:
+        dict: decrypted ciphertexts
+        update key texts
+    """
+    try:
+        half_oracle(1)
+    except NotImplementedError:
+        log.critical_error("Half oracle not implemented")
+    return _interval_attack(half_oracle, key, bits=1, half=True, concurrency=concurrency)
+
+
+def pkcs15_padding_oracle(ciphertext):
+    """Function implementing PKCS#1 v1.5 padding oracle
 
+    Args:
+        ciphertext(int)
+
+    Returns:
+        bool: True if decrypted ciphertext starts with 00 02, False otherwise
+    """
+    raise NotImplementedError
+
+
+def _ceil_div(a, b):
+    return -(-a // b)
+
+
+def _query_candidates(oracle, key, cipher, candidates, pool, concurrency, stats, expected=True):
+    """Check multipliers (in order) until oracle returns expected value for cipher*s^e
+    If pool is given, concurrency queries (one per pool thread) are sent at once
+
+    Returns:
+        int: first s from candidates for which oracle(cipher*s^e) == expected
+    """
+    n = gmpy2.mpz(key.n)
+    e = gmpy2.mpz(key.e)
+
+    def query(s):
+        return bool(oracle(long((cipher * gmpy2.powmod(s, e, n)) % n)))
+
+    batch_size = concurrency if pool is not None else 1
+    candidates = iter(candidates)
+    while True:
+        batch = list(itertools.islice(candidates, batch_size))
+        if not batch:
+            return None
+        results = pool.map(query, batch) if pool is not None else [query(batch[0])]
+        stats['queries'] += len(batch)
+        for s, result in zip(batch, results):
+            if result == expected:
+                return s
+
+
+def _s_candidates(n, B, a, b, s_min):
+    """Multipliers s >= s_min for which m*s % n may be PKCS conforming, given m in [a, b]
+    s is in [(2B + r*n)/b, (3B - 1 + r*n)/a] for some r, values between such ranges (holes) are skipped
+    """
+    r = max(_ceil_div(s_min * a - 3 * B + 1, n), 0)
+    while True:
+        low = max(_ceil_div(2 * B + r * n, b), s_min)
+        high = (3 * B - 1 + r * n) // a
+        s = low
+        while s <= high:
+            yield s
+            s += 1
+        r += 1
+
+
+def _s_candidates_one_interval(n, B, a, b, s_previous):
+    """Step 2c: multipliers for single interval, r grows from 2*(b*s - 2B)/n"""
+    r = _ceil_div(2 * (b * s_previous - 2 * B), n)
+    while True:
+        low = _ceil_div(2 * B + r * n, b)
+        high = (3 * B - 1 + r * n) // a
+        s = low
+        while s <= high:
+            yield s
+            s += 1
+        r += 1
+
+
+def _roundrobin(generators):
+    while True:
+        for generator in generators:
+            yield next(generator)
+
+
+def _pkcs15_trim(query, n, B, max_denominator=50, max_trimmers=1500):
+    """Trimming (Bardou et al.): if m*t/u is PKCS conforming for small t,u then u|m
+    and m is in [2B*u/t_min, (3B-1)*u/t_max]
+
+    Returns:
+        a, b: bounds of plaintext
+    """
+    denominators = []
+    tried = 0
+    for u in range(3, max_denominator + 1):
+        for t in (u - 1, u + 1):
+            if tried >= max_trimmers:
+                break
+            if gcd(t, u) != 1:
+                continue
+            tried += 1
+            if query(t, u):
+                denominators.append(u)
+                break
+    if not denominators:
+        return 2 * B, 3 * B - 1
+
+    u = lcm(*denominators) if len(denominators) > 1 else denominators[0]
+    if u > 2**12:
+        u = max(denominators)
+    t_min = u - 1
+    while 3 * (t_min - 1) > 2 * u and query(t_min - 1, u):
+        t_min -= 1
+    t_max = u + 1
+    while 2 * (t_max + 1) < 3 * u and query(t_max + 1, u):
+        t_max += 1
+    if not query(t_min, u):
+        t_min = u
+    if not query(t_max, u):
+        t_max = u
+    return max(_ceil_div(2 * B * u, t_min), 2 * B), min((3 * B - 1) * u // t_max, 3 * B - 1)
+
+
+def _bleichenbacher_pkcs15_decrypt(pkcs15_padding_oracle, key, cipher, pool, concurrency, trimmers):
+    """Bleichenbacher'98 attack for one ciphertext
+
+    Returns:
+        plaintext(int), oracle_calls(int)
+    """
+    n = gmpy2.mpz(key.n)
+    e = gmpy2.mpz(key.e)
+    k = (n.bit_length() + 7) // 8
+    B = gmpy2.mpz(1) << (8 * (k - 2))
+    stats = {'queries': 0}
+    cipher = gmpy2.mpz(cipher)
+
+    # step 1: blinding
+    stats['queries'] += 1
+    if pkcs15_padding_oracle(long(cipher)):
+        s0 = gmpy2.mpz(1)
+    else:
+        log.debug("Ciphertext not PKCS conforming, blinding")
+        s0 = _query_candidates(pkcs15_padding_oracle, key, cipher,
+                               (random.randint(2, n - 1) for _ in itertools.count()), pool, concurrency, stats)
+    c0 = (cipher * gmpy2.powmod(s0, e, n)) % n
+
+    # trimming
+    a, b = 2 * B, 3 * B - 1
+    if trimmers:
+        def query(t, u):
+            stats['queries'] += 1
+            multiplier = (t * gmpy2.invert(u, n)) % n
+            return pkcs15_padding_oracle(long((c0 * gmpy2.powmod(multiplier, e, n)) % n))
+        a, b = _pkcs15_trim(query, n, B)
+        log.debug("After trimming: {} bits left".format((b - a).bit_length()))
+    intervals = [(a, b)]
+
+    # step 2a: first s, skipping holes
+    s = _query_candidates(pkcs15_padding_oracle, key, c0, _s_candidates(n, B, a, b, _ceil_div(n + 2 * B, b)),
+                          pool, concurrency, stats)
+    while True:
+        # step 3: narrow intervals
+        new_intervals = []
+        for a, b in intervals:
+            r = _ceil_div(a * s - 3 * B + 1, n)
+            while r <= (b * s - 2 * B) // n:
+                low = max(a, _ceil_div(2 * B + r * n, s))
+                high = min(b, (3 * B - 1 + r * n) // s)
+                if low <= high:
+                    new_intervals.append((low, high))
+                r += 1
+        intervals = []
+        for low, high in sorted(set(new_intervals)):
+            if intervals and low <= intervals[-1][1] + 1:
+                intervals[-1] = (intervals[-1][0], max(high, intervals[-1][1]))
+            else:
+                intervals.append((low, high))
+        log.debug("{} queries, {} intervals, {} bits left".format(
+            stats['queries'], len(intervals), max((high - low).bit_length() for low, high in intervals)))
+
+        # step 4: done
+        if len(intervals) == 1 and intervals[0][0] == intervals[0][1]:
+            plaintext = (intervals[0][0] * gmpy2.invert(s0, n)) % n
+            return long(plaintext), stats['queries']
+
+        # step 2b/2c: search for next s, for many intervals all are searched in parallel
+        generators = [_s_candidates_one_interval(n, B, a, b, s) for a, b in intervals]
+        s = _query_candidates(pkcs15_padding_oracle, key, c0, _roundrobin(generators), pool, concurrency,
+                              stats)
+
+
+def bleichenbacher_pkcs15(pkcs15_padding_oracle, key, concurrency=1, trimmers=True):
+    """Bleichenbacher'98 PKCS#1 v1.5 padding oracle attack
+    With optimizations: trimmers, skipping holes, parallel search for s across intervals
+    pkcs15_padding_oracle function must be implemented
+
+    Args:
+        pkcs15_padding_oracle(function)
+        key(RSAKey): contains ciphertexts to decrypt
+        concurrency(int): amount of oracle calls made at once (in threads)
+        trimmers(bool): use trimmers to narrow initial interval
+
+    Returns:
+        dict: decrypted ciphertexts (with padding)
+        update key texts
+    """
+    try:
+        pkcs15_padding_oracle(1)
+    except NotImplementedError:
+        log.critical_error("PKCS#1 v1.5 padding oracle not implemented")
+
+    pool = ThreadPool(concurrency) if concurrency > 1 else None
     recovered = {}
-    for text_no in range(len(key.texts)):
-        if 'cipher' in key.texts[text_no] and 'plain' not in key.texts[text_no]:
-            cipher = key.texts[text_no]['cipher']
-            log.info("Decrypting {}".format(cipher))
-            two_encrypted = key.encrypt(2)
-
-            counter = lower_bound = numerator = 0
-            upper_bound = key.n
-            denominator = 1
-            while lower_bound + 1 < upper_bound:
-                cipher = (two_encrypted * cipher) % key.n
-                denominator *= 2
-                numerator *= 2
-                counter += 1
-
-                is_odd = parity_oracle(cipher)
-                if is_odd:  # plaintext > n/(2**counter)
-                    numerator += 1
-                lower_bound = (key.n * numerator) / denominator
-                upper_bound = (key.n * (numerator + 1)) / denominator
-
-                log.debug("{} {} [{}, {}]".format(counter, is_odd, int(lower_bound), int(upper_bound)))
-                log.debug("{}/{}  -  {}/{}\n".format(numerator, denominator, numerator + 1, denominator))
-            log.success("Decrypted: {}".format(i2h(upper_bound)))
-            key.texts[text_no]['plain'] = upper_bound
-            recovered[text_no] = upper_bound
+    try:
+        for text_no in key._texts.indexes(cipher=True, plain=False):
+            ciphertext = key._texts.cipher(text_no)
+            log.info("Decrypting {}".format(ciphertext))
+            start = time.time()
+            plaintext, queries = _bleichenbacher_pkcs15_decrypt(pkcs15_padding_oracle, key, ciphertext, pool,
+                                                                concurrency, trimmers)
+            log.success("Decrypted: {}".format(i2h(plaintext)))
+            log.info("{} oracle queries, {:.2f}s".format(queries, time.time() - start))
+            key.texts.set_plain(text_no, plaintext)
+            recovered[text_no] = plaintext
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return recovered
+
+
+def manger_oracle(ciphertext):
+    """Function implementing Manger's oracle (RSA-OAEP)
+
+    Args:
+        ciphertext(int)
+
+    Returns:
+        bool: True if first byte of decrypted ciphertext is zero, False otherwise
+    """
+    raise NotImplementedError
+
+
+def _manger_decrypt(manger_oracle, key, cipher, pool, concurrency):
+    """Manger's attack for one ciphertext
+
+    Returns:
+        plaintext(int), oracle_calls(int)
+    """
+    n = gmpy2.mpz(key.n)
+    e = gmpy2.mpz(key.e)
+    k = (n.bit_length() + 7) // 8
+    B = gmpy2.mpz(1) << (8 * (k - 1))
+    stats = {'queries': 0}
+    cipher = gmpy2.mpz(cipher)
+
+    # blinding, plaintext must be smaller than B
+    stats['queries'] += 1
+    if manger_oracle(long(cipher)):
+        s0 = gmpy2.mpz(1)
+    else:
+        log.debug("First byte of plaintext is not zero, blinding")
+        s0 = _query_candidates(manger_oracle, key, cipher,
+                               (random.randint(2, n - 1) for _ in itertools.count()), pool, concurrency, stats)
+    c0 = (cipher * gmpy2.powmod(s0, e, n)) % n
+
+    # step 1: f1*m in [B, 2B)
+    f1 = _query_candidates(manger_oracle, key, c0, (gmpy2.mpz(1) << i for i in itertools.count(1)),
+                           pool, concurrency, stats, expected=False)
+    f1_half = f1 // 2
+
+    # step 2: f2*m in [n, n + B)
+    f2_start = ((n + B) // B) * f1_half
+    f2 = _query_candidates(manger_oracle, key, c0, (f2_start + i * f1_half for i in itertools.count()),
+                           pool, concurrency, stats, expected=True)
+
+    # step 3: binary search, every query halves the interval
+    # f3*m_min is rounded up to i*n + x, x < m_min, what makes the split uneven for big plaintexts
+    # so few consecutive i are checked and one with smallest x is used
+    m_min = _ceil_div(n, f2)
+    m_max = (n + B) // f2
+    while m_min < m_max:
+        f_tmp = (2 * B) // (m_max - m_min)
+        i_start = (f_tmp * m_min) // n
+        i, f3 = i_start, _ceil_div(i_start * n, m_min)
+        x_min = None
+        for j in range(16):
+            i_candidate = i_start + j
+            f3_candidate = _ceil_div(i_candidate * n, m_min)
+            x = f3_candidate * m_min - i_candidate * n
+            if f3_candidate * m_max < (i_candidate + 1) * n and (x_min is None or x < x_min):
+                i, f3, x_min = i_candidate, f3_candidate, x
+
+        stats['queries'] += 1
+        if manger_oracle(long((c0 * gmpy2.powmod(f3, e, n)) % n)):
+            m_max = (i * n + B - 1) // f3
+        else:
+            m_min = _ceil_div(i * n + B, f3)
+
+    plaintext = (m_min * gmpy2.invert(s0, n)) % n
+    return long(plaintext), stats['queries']
+
+
+def manger(manger_oracle, key, concurrency=1):
+    """Manger's chosen ciphertext attack on RSA-OAEP
+    Given oracle that tells if first byte of decrypted ciphertext is zero we can decrypt whole ciphertext
+    in about log2(n) queries
+    manger_oracle function must be implemented
+
+    Args:
+        manger_oracle(function)
+        key(RSAKey): contains ciphertexts to decrypt
+        concurrency(int): amount of oracle calls made at once (in threads)
+
+    Returns:
+        dict: decrypted ciphertexts (with padding)
+        update key texts
+    """
+    try:
+        manger_oracle(1)
+    except NotImplementedError:
+        log.critical_error("Manger's oracle not implemented")
+
+    if 2 * (1 << (8 * (((key.n).bit_length() + 7) // 8 - 1))) >= key.n:
+        log.critical_error("Manger's attack requires 2*B < n")
+
+    pool = ThreadPool(concurrency) if concurrency > 1 else None
+    recovered = {}
+    try:
+        for text_no in key._texts.indexes(cipher=True, plain=False):
+            ciphertext = key._texts.cipher(text_no)
+            log.info("Decrypting {}".format(ciphertext))
+            start = time.time()
+            plaintext, queries = _manger_decrypt(manger_oracle, key, ciphertext, pool, concurrency)
+            log.success("Decrypted: {}".format(i2h(plaintext)))
+            log.info("{} oracle queries, {:.2f}s".format(queries, time.time() - start))
+            key.texts.set_plain(text_no, plaintext)
+            recovered[text_no] = plaintext
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
     return recovered
 
 
@@ -524,13 +1949,52 @@ def decryption_oracle(ciphertext):
     raise NotImplementedError
 
 
-def blinding(key, signing_oracle=None, decryption_oracle=None):
+def _blind_queries(key, values, oracle, concurrency=1, batch_oracle=False):
+    """Blind every value with random r (value * r**e), query oracle with all of them and unblind results (* r**(-1))
+    Blinds are inverted together with batch_invmod
+
+    Returns:
+        list: unblinded oracle results, in order of values
+    """
+    while True:
+        blinds = [random.randint(2, key.n - 1) for _ in values]
+        try:
+            blinds_inverted = batch_invmod(blinds, key.n)
+            break
+        except ValueError:
+            log.debug("Blind not invertible, drawing new blinds")
+    n = gmpy2.mpz(key.n)
+    blinded = [long(value * blind_enc % n) for value, blind_enc in zip(values, key.encrypt_many(blinds))]
+
+    if batch_oracle:
+        results = oracle(blinded)
+        results = list(results) if results is not None else []
+    elif concurrency > 1 and len(blinded) > 1:
+        pool = ThreadPool(min(concurrency, len(blinded)))
+        try:
+            results = pool.map(oracle, blinded)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [oracle(value) for value in blinded]
+
+    if len(results) != len(blinded) or any(result is None for result in results):
+        log.critical_error("Error during call to oracle")
+    return [long(blind_inverted * result % n) for blind_inverted, result in zip(blinds_inverted, results)]
+
+
+def blinding(key, signing_oracle=None, decryption_oracle=None, concurrency=1, batch_oracle=False):
     """Perform signature/ciphertext blinding attack
+    All texts are blinded with random blinds from [2, n-1] and sent to oracle at once
 
     Args:
         key(RSAKey): with at least one plaintext(to sign) or ciphertext(to decrypt)
         signing_oracle(callable)
         decryption_oracle(callable)
+        concurrency(int): amount of oracle calls running at once (in threads)
+        batch_oracle(bool): oracle takes list of values and returns results (any iterable) in the same order
+                            (one call for all texts)
 
     Returns:
         dict: {index: signature/plaintext, index2: signature/plaintext}
@@ -544,34 +2008,25 @@ def blinding(key, signing_oracle=None, decryption_oracle=None):
     recovered = {}
     if signing_oracle:
         log.debug("Have signing_oracle")
-        for text_no in range(len(key.texts)):
-            if 'plain' in key.texts[text_no] and 'cipher' not in key.texts[text_no]:
-                log.info("Blinding signature of plaintext no {} ({})".format(text_no, i2b(key.texts[text_no]['plain'])))
-
-                blind = random.randint(2, 100)
-                blind_enc = key.encrypt(blind)
-                blinded_plaintext = (key.texts[text_no]['plain'] * blind_enc) % key.n
-                blinded_signature = signing_oracle(blinded_plaintext)
-                if not blinded_signature:
-                    log.critical_error("Error during call to signing_oracle({})".format(blinded_plaintext))
-                signature = (invmod(blind, key.n) * blinded_signature) % key.n
-                key.texts[text_no]['cipher'] = signature
+        to_sign = key._texts.indexes(cipher=False, plain=True)
+        if to_sign:
+            log.info("Blinding signatures of {} plaintexts".format(len(to_sign)))
+            plaintexts = key._texts.export(to_sign)[1]
+            signatures = _blind_queries(key, plaintexts, signing_oracle, concurrency, batch_oracle)
+            for text_no, signature in zip(to_sign, signatures):
+                key.texts.set_cipher(text_no, signature)
                 recovered[text_no] = signature
                 log.success("Signature: {}".format(signature))
 
     if decryption_oracle:
         log.debug("Have decryption_oracle")
-        for text_no in range(len(key.texts)):
-            if 'cipher' in key.texts[text_no] and 'plain' not in key.texts[text_no]:
-                log.info("Blinding ciphertext no {} ({})".format(text_no, key.texts[text_no]['cipher']))
-                blind = random.randint(2, 100)
-                blind_enc = key.encrypt(blind)
-                blinded_ciphertext = (key.texts[text_no]['cipher'] * blind_enc) % key.n
-                blinded_plaintext = decryption_oracle(blinded_ciphertext)
-                if not blinded_plaintext:
-                    log.critical_error("Error during call to decryption_oracle({})".format(blinded_plaintext))
-                plaintext = (invmod(blind, key.n) * blinded_plaintext) % key.n
-                key.texts[text_no]['plain'] = plaintext
+        to_decrypt = key._texts.indexes(cipher=True, plain=False)
+        if to_decrypt:
+            log.info("Blinding {} ciphertexts".format(len(to_decrypt)))
+            ciphertexts = key._texts.export(to_decrypt)[0]
+            plaintexts = _blind_queries(key, ciphertexts, decryption_oracle, concurrency, batch_oracle)
+            for text_no, plaintext in zip(to_decrypt, plaintexts):
+                key.texts.set_plain(text_no, plaintext)
                 recovered[text_no] = plaintext
                 log.success("Plaintext: {}".format(plaintext))
 
@@ -582,7 +2037,7 @@ def bleichenbacher_signature_forgery(key, garbage='suffix', hash_function='sha1'
     """Bleichenbacher's signature forgery based on bug in verify implementation
 
     Args:
-        key(RSAKey): with small e and at least one plaintext
+        key(RSAKey): with small e (odd for garbage in the middle) and at least one plaintext
         garbage(string): middle: 00 01 ff garbage 00 ASN.1 HASH
                          suffix: 00 01 ff 00 ASN.1 HASH garbage
         hash_function(string)
@@ -608,65 +2063,66 @@ def bleichenbacher_signature_forgery(key, garbage='suffix', hash_function='sha1'
 
     signatures = {}
     if garbage == 'suffix':
-        for text_no in range(len(key.texts)):
-            if 'plain' in key.texts[text_no] and 'cipher' not in key.texts[text_no]:
-                log.info("Forge for plaintext no {} ({})".format(text_no, key.texts[text_no]['plain']))
-
-                hash_callable = getattr(hashlib, hash_function)(
-                    i2b(key.texts[text_no]['plain'])).digest()  # hack to call hashlib.hash_function
-                plaintext_prefix = "\x00\x01\xff\x00" + hash_asn1[hash_function] + hash_callable
-
-                plaintext = plaintext_prefix + '\x00' * (key.size // 8 - len(plaintext_prefix))
-                plaintext = b2i(plaintext)
-                for round_error in range(-5, 5):
-                    signature, _ = gmpy2.iroot(plaintext, key.e)
-                    signature = int(signature + round_error)
-                    test_prefix = i2b(pow(signature, key.e, key.n), size=key.size)[:len(plaintext_prefix)]
-                    if test_prefix == plaintext_prefix:
-                        log.info("Got signature: {}".format(signature))
-                        log.debug("signature**e % n == {}".format(i2h(pow(signature, key.e, key.n), size=key.size)))
-                        key.texts[text_no]['cipher'] = signature
-                        signatures[text_no] = signature
-                        break
-                else:
-                    log.error("Something wrong, can't compute correct signature")
+        for text_no in key._texts.indexes(cipher=False, plain=True):
+            log.info("Forge for plaintext no {} ({})".format(text_no, key._texts.plain(text_no)))
+
+            hash_callable = getattr(hashlib, hash_function)(
+                i2b(key._texts.plain(text_no))).digest()  # hack to call hashlib.hash_function
+            plaintext_prefix = "\x00\x01\xff\x00" + hash_asn1[hash_function] + hash_callable
+
+            plaintext = plaintext_prefix + '\x00' * (key.size // 8 - len(plaintext_prefix))
+            plaintext = b2i(plaintext)
+            for round_error in range(-5, 5):
+                signature, _ = gmpy2.iroot(plaintext, key.e)
+                signature = int(signature + round_error)
+                test_prefix = i2b(pow(signature, key.e, key.n), size=key.size)[:len(plaintext_prefix)]
+                if test_prefix == plaintext_prefix:
+                    log.info("Got signature: {}".format(signature))
+                    log.debug("signature**e % n == {}".format(i2h(pow(signature, key.e, key.n), size=key.size)))
+                    key.texts.set_cipher(text_no, signature)
+                    signatures[text_no] = signature
+                    break
+            else:
+                log.error("Something wrong, can't compute correct signature")
         return signatures
 
     elif garbage == 'middle':
-        for text_no in range(len(key.texts)):
-            if 'plain' in key.texts[text_no] and 'cipher' not in key.texts[text_no]:
-                log.info("Forge for plaintext no {} ({})".format(text_no, key.texts[text_no]['plain']))
-                hash_callable = getattr(hashlib, hash_function)(
-                    i2b(key.texts[text_no]['plain'])).digest()  # hack to call hashlib.hash_function
-                plaintext_suffix = "\x00" + hash_asn1[hash_function] + hash_callable
-                if b2i(plaintext_suffix) & 1 != 1:
-                    log.error("Plaintext suffix is even, can't compute signature")
-                    continue
-
-                # compute suffix
-                signature_suffix = 0b1
-                for b in range(len(plaintext_suffix) * 8):
-                    if (signature_suffix ** 3) & (1 << b) != b2i(plaintext_suffix) & (1 << b):
-                        signature_suffix |= 1 << b
-                signature_suffix = i2b(signature_suffix)[-len(plaintext_suffix):]
-
-                # compute prefix
-                while True:
-                    plaintext_prefix = "\x00\x01\xff" + random_str(key.size // 8 - 3)
-                    signature_prefix, _ = gmpy2.iroot(b2i(plaintext_prefix), key.e)
-                    signature_prefix = i2b(int(signature_prefix), size=key.size)[:-len(signature_suffix)]
-
-                    signature = b2i(signature_prefix + signature_suffix)
-                    test_plaintext = i2b(pow(signature, key.e, key.n), size=key.size)
-                    if '\x00' not in test_plaintext[2:-len(plaintext_suffix)]:
-                        if test_plaintext[:3] == plaintext_prefix[:3] and test_plaintext[
-                                                                          -len(plaintext_suffix):] == plaintext_suffix:
-                            log.info("Got signature: {}".format(signature))
-                            key.texts[text_no]['cipher'] = signature
-                            signatures[text_no] = signature
-                            break
-                        else:
-                            log.error("Something wrong, signature={},"
-                                      " signature**{}%{} is {}".format(signature, key.e, key.n, [(test_plaintext)]))
-                            break
+        if key.e % 2 == 0:
+            log.critical_error("Garbage in the middle requires odd e (e-th roots modulo power of two)")
+        # signature**e must not exceed 00 01 ff ff .. ff, so high bits of signature are from its integer e-th root
+        plaintext_max = b2i("\x00\x01" + "\xff" * (key.size // 8 - 2))
+        signature_max = gmpy2.iroot(gmpy2.mpz(plaintext_max), key.e)[0]
+        for text_no in key._texts.indexes(cipher=False, plain=True):
+            log.info("Forge for plaintext no {} ({})".format(text_no, key._texts.plain(text_no)))
+            hash_callable = getattr(hashlib, hash_function)(
+                i2b(key._texts.plain(text_no))).digest()  # hack to call hashlib.hash_function
+            plaintext_suffix = "\x00" + hash_asn1[hash_function] + hash_callable
+            suffix = b2i(plaintext_suffix)
+            suffix_bits = len(plaintext_suffix) * 8
+
+            # low bits of signature**e depend only on low bits of signature: signature = 2**(zeros/e) * odd root
+            zeros = power_of_two(suffix)
+            if zeros % key.e != 0:
+                log.error("Plaintext suffix ends with {} zero bits, not a multiple of e, "
+                          "can't compute signature".format(zeros))
+                continue
+            signature_suffix = root_mod_power_of_two(suffix >> zeros, key.e, suffix_bits - zeros) << (zeros // key.e)
+            signature_suffix %= 1 << suffix_bits
+
+            # garbage must not contain zero bytes, decrease high bits of signature until it does not
+            # (each attempt fails with probability about 1 - (255/256)**len(garbage))
+            signature_prefix = (signature_max >> suffix_bits) - 1
+            for attempt in range(1000):
+                signature = int(((signature_prefix - attempt) << suffix_bits) + signature_suffix)
+                test_plaintext = i2b(gmpy2.mpz(signature) ** key.e, size=key.size)
+                if test_plaintext[:3] != "\x00\x01\xff" or test_plaintext[-len(plaintext_suffix):] != plaintext_suffix:
+                    log.error("Key is too small for e={}, can't compute signature".format(key.e))
+                    break
+                if '\x00' not in test_plaintext[2:-len(plaintext_suffix)]:
+                    log.info("Got signature: {} (attempt {})".format(signature, attempt + 1))
+                    key.texts.set_cipher(text_no, signature)
+                    signatures[text_no] = signature
+                    break
+            else:
+                log.error("Something wrong, can't compute correct signature")
         return signatures
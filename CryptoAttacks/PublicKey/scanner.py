@@ -0,0 +1,324 @@
+from __future__ import print_function
+from builtins import range
+from past.builtins import long
+
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+
+from CryptoAttacks.Math import *
+from CryptoAttacks.PublicKey.keystore import iter_key_files, _parse_key_file
+from CryptoAttacks.PublicKey.rsa import RSAKey, wiener
+from CryptoAttacks.Utils import *
+
+
+def check_small_e(key, bound=65537):
+    """Public exponent smaller than bound, small_e_msg and hastad may apply"""
+    if key.e < bound:
+        return {'e': long(key.e)}
+    return None
+
+
+def check_wiener(key):
+    """Small private exponent"""
+    private_key = wiener(key)
+    if private_key is not None:
+        return {'d': long(private_key.d)}
+    return None
+
+
+_small_primes_product = None
+
+
+def check_small_factor(key, bound=2**16):
+    """Prime factor smaller than bound, one gcd with product of small primes"""
+    global _small_primes_product
+    if _small_primes_product is None:
+        _small_primes_product = product_tree(list(iter_primes(stop=bound)))[-1][0]
+    factor = gcd(key.n, _small_primes_product)
+    if factor != 1:
+        return {'factor': long(factor)}
+    return None
+
+
+def check_fermat(key, rounds=100):
+    """Primes close to each other (|p - q| small), Fermat's factorization"""
+    n = gmpy2.mpz(key.n)
+    a = gmpy2.isqrt(n)
+    if a * a < n:
+        a += 1
+    for _ in range(rounds):
+        b, is_square = gmpy2.iroot(a * a - n, 2)
+        if is_square:
+            return {'p': long(a - b), 'q': long(a + b)}
+        a += 1
+    return None
+
+
+def check_common_primes(moduli, new=None, state=None):
+    """Batch gcd (product and remainder trees) of moduli
+    Only new moduli are put in trees, they are checked against each other and against product of moduli
+    checked before (state), old moduli are checked again only if they share prime with new one
+
+    Args:
+        moduli(list): ints
+        new(list/None): indexes of moduli not checked before, None for all
+        state(string/None): hex of product of moduli checked before
+
+    Returns:
+        dict: index of modulus: finding (None if not found), for new moduli and old ones with changed finding
+        string: hex of product of moduli checked before and new ones
+    """
+    if new is None:
+        new = list(range(len(moduli)))
+    previous = gmpy2.mpz(state, 16) if state else gmpy2.mpz(1)
+    findings = {}
+    if new:
+        tree = product_tree([moduli[i] for i in new])
+        total = previous * tree[-1][0]
+        remainders = remainder_tree(total, [[x * x for x in level] for level in tree])
+        for i, n, remainder in zip(new, tree[0], remainders):
+            factor = gcd(n, remainder // n)
+            findings[i] = {'factor': long(factor)} if factor != 1 else None
+
+        # primes shared by new and old moduli
+        shared = [gcd(n, remainder) for n, remainder in zip(tree[0], remainder_tree(previous, tree))]
+        shared = product_tree([factor for factor in shared if factor != 1] or [1])[-1][0]
+        if shared != 1:
+            new_indexes = set(new)
+            for i, n in enumerate(moduli):
+                if i not in new_indexes and gcd(n, shared) != 1:
+                    n = gmpy2.mpz(n)
+                    findings[i] = {'factor': long(gcd(n, total % (n * n) // n))}
+        state = '{:x}'.format(total)
+
+    # the same modulus in many keys has no other factor than itself
+    for i, finding in check_duplicate_modulus(moduli)[0].items():
+        if finding is not None:
+            findings[i] = {'factor': long(moduli[i])}
+    return findings, state
+
+
+def check_duplicate_modulus(moduli, new=None, state=None):
+    """The same modulus in many keys
+    Cheap, always done for all moduli
+
+    Args:
+        moduli(list): ints
+        new, state: not used
+
+    Returns:
+        dict: index of modulus: finding (None if not found), for all moduli
+        None: no state
+    """
+    indexes = {}
+    for i, n in enumerate(moduli):
+        indexes.setdefault(n, []).append(i)
+    findings = {}
+    for same in indexes.values():
+        for i in same:
+            findings[i] = {'count': len(same)} if len(same) > 1 else None
+    return findings, None
+
+
+key_checks = {
+    'small_e': check_small_e,
+    'wiener': check_wiener,
+    'small_factor': check_small_factor,
+    'fermat': check_fermat,
+}
+
+corpus_checks = {
+    'common_primes': check_common_primes,
+    'duplicate_modulus': check_duplicate_modulus,
+}
+"""Checks run for all moduli at once, function(moduli, new, state) -> findings, state
+new are indexes of moduli without cached findings, state is returned by previous scan (None at first),
+findings are for new moduli and old ones with changed finding (cached findings are used for the rest)"""
+
+
+def modulus_hash(n):
+    """Identifier of modulus used in cache and findings"""
+    return hashlib.sha1('{:x}'.format(n).encode()).hexdigest()
+
+
+_scanner_state = {}
+
+
+def _scanner_init(checks, cached):
+    _scanner_state['checks'] = checks
+    _scanner_state['cached'] = cached
+
+
+def _scan_file(path):
+    """Load keys (all of them, as in KeyStore) and run uncached key checks on them
+
+    Returns:
+        tuple: path, list of (identifier, n, e, {check: finding}, {check: seconds}), error
+    """
+    path, parsed, error = _parse_key_file(path)
+    if error is not None:
+        return path, [], error
+
+    keys = []
+    for identifier, n, e in parsed:
+        key = RSAKey(b2i(n), b2i(e), identifier=identifier)
+        n_hash = modulus_hash(key.n)
+        results, times = {}, {}
+        for check in _scanner_state['checks']:
+            if (n_hash, check) in _scanner_state['cached']:
+                continue
+            start = time.time()
+            results[check] = key_checks[check](key)
+            times[check] = time.time() - start
+        keys.append((identifier, long(key.n), long(key.e), results, times))
+    return path, keys, None
+
+
+def _load_cache(cache):
+    entries = {}
+    if cache is not None and os.path.isfile(cache):
+        with open(cache) as f:
+            for line in f:
+                entry = json.loads(line)
+                entries[(entry['modulus'], entry['check'])] = entry['result']
+    return entries
+
+
+def _state_path(cache, check):
+    return '{}.{}'.format(cache, check)
+
+
+def _load_state(cache, check):
+    if cache is not None and os.path.isfile(_state_path(cache, check)):
+        with open(_state_path(cache, check)) as f:
+            return json.load(f)
+    return None
+
+
+def _save_state(cache, check, state):
+    if cache is not None:
+        with open(_state_path(cache, check), 'w') as f:
+            json.dump(state, f)
+
+
+def scan(paths, checks=None, output=None, cache=None, processes=None):
+    """Scan key files for weak keys
+    Files are parsed and key checks are run in process pool, corpus checks are run on all moduli at once
+    Every key of a file is scanned, files with many keys give identifiers path:index (like in KeyStore)
+    Results are cached per modulus, so rescans are incremental: corpus checks get only new moduli
+    (common_primes compares them with product of moduli from earlier scans, kept next to cache),
+    so with cache moduli from earlier scans stay in the corpus
+
+    Args:
+        paths(list): files and directories with keys (PEM/DER/OpenSSH)
+        checks(list/None): names of checks from key_checks and corpus_checks, None for all
+        output(string/None): file to write findings to (JSON lines), last line contains stats
+        cache(string/None): file with cached results (JSON lines), created if not exists
+                            state of corpus checks is in cache.<check> files
+        processes(int/None): size of process pool, None for cpu count, 1 to run in current process
+
+    Returns:
+        list: findings (dicts with path (key identifier), modulus, check, result)
+        dict: stats, per check amount of keys, time and keys per second
+    """
+    if checks is None:
+        checks = list(key_checks.keys()) + list(corpus_checks.keys())
+    for check in checks:
+        if check not in key_checks and check not in corpus_checks:
+            log.critical_error("Unknown check: {}".format(check))
+    per_key = [check for check in checks if check in key_checks]
+    per_corpus = [check for check in checks if check in corpus_checks]
+
+    cached = _load_cache(cache)
+    new_cache_entries = []
+    stats = dict((check, {'keys': 0, 'cached': 0, 'seconds': 0.0}) for check in checks)
+    stats['files'] = {'keys': 0, 'errors': 0, 'seconds': 0.0}
+    start = time.time()
+
+    if processes == 1:
+        _scanner_init(per_key, set(cached))
+        results = (_scan_file(path) for path in iter_key_files(paths))
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes, _scanner_init, (per_key, set(cached)))
+        results = pool.imap_unordered(_scan_file, iter_key_files(paths), chunksize=16)
+
+    findings = []
+    keys = []
+    try:
+        for path, file_keys, error in results:
+            if error is not None:
+                log.debug("Can't load {}: {}".format(path, error))
+                stats['files']['errors'] += 1
+                continue
+            for identifier, n, e, key_results, times in file_keys:
+                stats['files']['keys'] += 1
+                n_hash = modulus_hash(n)
+                keys.append((identifier, n, n_hash))
+                for check in per_key:
+                    if check in key_results:
+                        result = key_results[check]
+                        stats[check]['keys'] += 1
+                        stats[check]['seconds'] += times[check]
+                        new_cache_entries.append({'modulus': n_hash, 'check': check, 'result': result})
+                    else:
+                        result = cached[(n_hash, check)]
+                        stats[check]['cached'] += 1
+                    if result is not None:
+                        findings.append({'path': identifier, 'modulus': n_hash, 'check': check, 'result': result})
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    stats['files']['seconds'] = time.time() - start
+
+    moduli = [n for _, n, _ in keys]
+    for check in per_corpus:
+        # without state from previous scan cached findings are not complete (new moduli were not compared
+        # with old ones), so all moduli are checked
+        state = _load_state(cache, check)
+        if state is None:
+            new = list(range(len(keys)))
+        else:
+            new = [i for i, (_, _, n_hash) in enumerate(keys) if (n_hash, check) not in cached]
+        check_start = time.time()
+        computed, state = corpus_checks[check](moduli, new, state)
+        stats[check]['keys'] += len(new)
+        stats[check]['cached'] += len(keys) - len(new)
+        stats[check]['seconds'] += time.time() - check_start
+        if new and state is not None:
+            _save_state(cache, check, state)
+
+        for i, (path, _, n_hash) in enumerate(keys):
+            if i in computed:
+                result = computed[i]
+                if (n_hash, check) not in cached or cached[(n_hash, check)] != result:
+                    cached[(n_hash, check)] = result
+                    new_cache_entries.append({'modulus': n_hash, 'check': check, 'result': result})
+            else:
+                result = cached[(n_hash, check)]
+            if result is not None:
+                findings.append({'path': path, 'modulus': n_hash, 'check': check, 'result': result})
+
+    for check in checks + ['files']:
+        stats[check]['keys_per_second'] = stats[check]['keys'] / stats[check]['seconds'] \
+            if stats[check]['seconds'] > 0 else None
+        log.info("{}: {} keys ({} cached), {:.2f}s, {} keys/s".format(
+            check, stats[check]['keys'], stats[check].get('cached', 0), stats[check]['seconds'],
+            '{:.1f}'.format(stats[check]['keys_per_second']) if stats[check]['keys_per_second'] else '-'))
+    log.success("Found {} weak keys in {} files".format(len(set(f['path'] for f in findings)),
+                                                         stats['files']['keys']))
+
+    if cache is not None and new_cache_entries:
+        with open(cache, 'a') as f:
+            for entry in new_cache_entries:
+                f.write(json.dumps(entry) + '\n')
+    if output is not None:
+        with open(output, 'w') as f:
+            for finding in findings:
+                f.write(json.dumps(finding) + '\n')
+            f.write(json.dumps({'stats': stats}) + '\n')
+    return findings, stats
@@ -221,6 +221,15 @@ def add_rsa_signature_padding(data, size=1024, hash_function='sha1'):
     return padded + data
 
 
+def add_rsa_encryption_padding(data, size=1024):
+    """add PKCS#1 v1.5 encryption padding"""
+    padding_size = size//8 - len(data) - 3
+    if padding_size < 8:
+        log.critical_error("Data too long ({} bytes) for {} bits modulus".format(len(data), size))
+    padding = ''.join([chr(random.randint(1, 255)) for _ in range(padding_size)])
+    return "\x00\x02" + padding + "\x00" + data
+
+
 def add_md_padding(data, endian='big'):
     """Merkle-Damgard padding
 
@@ -263,10 +272,26 @@ def random_bytes(amount=1):
 
 
 def random_prime(bytes=512):
-    p = random.getrandbits(bytes)|1
-    while not gmpy2.is_bpsw_prp(p):
+    """Random prime of at most given amount of bits
+    Odd numbers following random start are sieved by small primes, so only few candidates
+    are tested with (expensive) primality test
+    """
+    from CryptoAttacks.Math import prime_candidates
+
+    if bytes < 24:
         p = random.getrandbits(bytes)|1
-    return p
+        while not gmpy2.is_bpsw_prp(p):
+            p = random.getrandbits(bytes)|1
+        return p
+
+    window = 4 * bytes
+    while True:
+        start = random.getrandbits(bytes)|1
+        if start + 2*window >= 1 << bytes:
+            continue
+        for p in prime_candidates(start, window):
+            if gmpy2.is_bpsw_prp(p):
+                return p
 
 
 def power_of_two(number):
@@ -0,0 +1,395 @@
+#!/usr/bin/env python
+
+from __future__ import print_function
+from builtins import range, int, pow
+
+import os
+import shutil
+import tempfile
+import time
+
+from Crypto.Cipher import PKCS1_OAEP
+
+from CryptoAttacks.PublicKey.keyfactory import *
+from CryptoAttacks.PublicKey.keystore import KeyStore
+from CryptoAttacks.PublicKey.rsa import *
+from CryptoAttacks.Utils import *
+from CryptoAttacks.Math import *
+from CryptoAttacks.Polynomial import *
+
+
+def bench(name, function, *args, **kwargs):
+    start = time.time()
+    result = function(*args, **kwargs)
+    print("{:<60} {:>10.4f}s".format(name, time.time() - start))
+    return result
+
+
+def bench_key(size, e=0x10001):
+    """Key from keyfactory cache, so runs don't wait for key generation"""
+    return generate_keys('standard', size, e=e, seed='bench', cache=default_cache, processes=1)[0]
+
+
+def bench_keyfactory(amount=8):
+    print("\nBench: key generation, keyfactory ({} keys)".format(amount))
+    path = tempfile.mkdtemp()
+    try:
+        for size in [1024, 2048, 4096]:
+            if size <= 2048:
+                bench("{}x pycrypto generate ({} bits)".format(amount, size),
+                      lambda: [RSAKey.generate(size) for _ in range(amount)])
+            for profile in ['standard', 'small_d', 'multi_prime']:
+                bench("generate_keys {}, {} bits".format(profile, size), generate_keys, profile, size, amount,
+                      cache=path)
+                bench("generate_keys {}, {} bits, cached".format(profile, size), generate_keys, profile, size,
+                      amount, cache=path)
+    finally:
+        shutil.rmtree(path)
+
+
+def bench_encrypt_decrypt(amount=1000):
+    print("\nBench: encrypt, decrypt, encrypt_many, decrypt_many")
+    for size in [1024, 2048, 4096]:
+        key = bench_key(size)
+        texts = [random.randint(2, key.n - 1) for _ in range(amount)]
+        bench("{}x pycrypto encrypt ({} bits)".format(amount, size),
+              lambda: [key.pyrsa_key.encrypt(text, 0) for text in texts])
+        bench("{}x encrypt ({} bits)".format(amount, size), lambda: [key.encrypt(text) for text in texts])
+        bench("encrypt_many of {} ({} bits)".format(amount, size), key.encrypt_many, texts)
+        bench("{}x encrypt(2) ({} bits)".format(amount, size), lambda: [key.encrypt(2) for _ in texts])
+        bench("{}x pycrypto decrypt ({} bits)".format(amount // 10, size),
+              lambda: [key.pyrsa_key.decrypt(text) for text in texts[:amount // 10]])
+        bench("{}x gmpy2.powmod(c, d, n) ({} bits)".format(amount // 10, size),
+              lambda: [gmpy2.powmod(text, key.d, key.n) for text in texts[:amount // 10]])
+        bench("decrypt_many of {} ({} bits)".format(amount // 10, size), key.decrypt_many, texts[:amount // 10])
+
+    size = 4096
+    for amount_of_primes in [3, 4]:
+        primes = [random_prime(size // amount_of_primes) for _ in range(amount_of_primes)]
+        key = RSAKey.construct(int(product(primes)), primes=primes)
+        texts = [random.randint(2, key.n - 1) for _ in range(amount // 10)]
+        bench("decrypt_many of {} ({} bits, {} primes)".format(amount // 10, size, amount_of_primes),
+              key.decrypt_many, texts)
+
+
+def bench_key_creation(amount=10000, texts=1000):
+    print("\nBench: RSAKey creation and copy")
+    key = bench_key(2048)
+    for _ in range(texts):
+        key.add_ciphertext(random.randint(2, key.n - 1))
+    bench("{}x RSAKey(n, e)".format(amount), lambda: [RSAKey(key.n, key.e) for _ in range(amount)])
+    bench("{}x RSAKey(n, e, d, p, q)".format(amount),
+          lambda: [RSAKey(key.n, key.e, key.d, key.p, key.q) for _ in range(amount)])
+    bench("{}x publickey, {} texts".format(amount, texts), lambda: [key.publickey() for _ in range(amount)])
+    bench("{}x copy, {} texts".format(amount, texts), lambda: [key.copy() for _ in range(amount)])
+    bench("{}x copy and add_plaintext, {} texts".format(amount // 10, texts),
+          lambda: [key.copy().add_plaintext(1, position=0) for _ in range(amount // 10)])
+
+
+def bench_texts(amount=100000):
+    print("\nBench: key texts")
+    key = bench_key(1024)
+    ciphertexts = [random.randint(2, key.n - 1) for _ in range(amount)]
+
+    def add_ciphertexts():
+        key.clear_texts()
+        for ciphertext in ciphertexts:
+            key.add_ciphertext(ciphertext)
+
+    bench("{}x add_ciphertext".format(amount), add_ciphertexts)
+    key.clear_texts()
+    bench("add_many with {} ciphertexts".format(amount), key.texts.add_many, ciphertexts)
+    bench("export of {} texts".format(amount), key.texts.export)
+    bench("copy and set_plain, {} texts".format(amount), lambda: key.copy().texts.set_plain(0, 1))
+
+    for every in [2, 1000]:
+        dicts = [{'cipher': ciphertext} for ciphertext in ciphertexts]
+        for i in range(amount):
+            if i % every:
+                dicts[i]['plain'] = i
+        key.texts = bench("TextStore of {} dicts".format(amount), TextStore, dicts)
+        bench("scan of dicts, {} of {} without plaintext".format(amount // every, amount),
+              lambda: [pair['cipher'] for pair in dicts if 'cipher' in pair and 'plain' not in pair])
+        bench("get_mutable_texts, {} of {} without plaintext".format(amount // every, amount),
+              get_mutable_texts, key, None)
+
+
+def bench_faulty_scan(amount=20000):
+    print("\nBench: faulty_scan")
+    key = bench_key(2048)
+    messages = [random.randint(2, key.n - 1) for _ in range(amount)]
+    signatures = key.decrypt_many(messages)
+    path = tempfile.mktemp()
+    try:
+        with open(path, 'w') as f:
+            for signature, message in zip(signatures, messages):
+                f.write("{:x} {:x}\n".format(signature, message))
+
+        def unreduced(amount):
+            for signature, message in zip(signatures[:amount], messages[:amount]):
+                gmpy2.gcd(pow(gmpy2.mpz(signature), key.e) - message, key.n)
+
+        def reduced(amount):
+            for signature, message in zip(signatures[:amount], messages[:amount]):
+                gmpy2.gcd(gmpy2.powmod(signature, key.e, key.n) - message, key.n)
+
+        bench("gcd(s**e - m, n) for 5 signatures", unreduced, 5)
+        bench("gcd(s**e % n - m, n) for {} signatures".format(amount), reduced, amount)
+        wrong_messages = [message + 1 for message in messages]
+        for batch_size in [64, 4096]:
+            for name, pairs in [('valid', zip(signatures, messages)), ('not matching', zip(signatures, wrong_messages))]:
+                _, stats = bench("faulty_scan, {} {} signatures, batch_size={}".format(amount, name, batch_size),
+                                 faulty_scan, key.publickey(), pairs, batch_size=batch_size)
+                print("    {:.1f} signatures/s".format(stats['signatures_per_second']))
+        _, stats = bench("faulty_scan from file, {} signatures".format(amount), faulty_scan, key.publickey(), path)
+        print("    {:.1f} signatures/s".format(stats['signatures_per_second']))
+
+        key.texts = [{'cipher': signature} for signature in signatures[:amount // 100]]
+        bench("faulty, {} signatures without messages".format(amount // 100), faulty, key.publickey())
+    finally:
+        os.remove(path)
+
+
+def bench_wiener(keys=10, size=1024):
+    print("\nBench: wiener, wiener_extended")
+
+    def small_d_keys(bits):
+        """Keys with balanced primes and d about 2**bits * N**(1/4)"""
+        generated = []
+        for _ in range(keys):
+            p, q = [gmpy2.next_prime(random.getrandbits(size // 2) | (1 << (size // 2 - 1))) for _ in range(2)]
+            phi = (p - 1) * (q - 1)
+            root = gmpy2.iroot(p * q, 4)[0]
+            while True:
+                d = random.randint(root << bits >> 1, root << bits)
+                if gcd(d, phi) == 1:
+                    break
+            generated.append(RSAKey(int(p * q), int(invmod(d, phi))))
+        return generated
+
+    def broken(attack, keys, *args, **kwargs):
+        return sum(1 for key in keys if attack(key, *args, **kwargs) is not None)
+
+    for bits in [0, 1, 2, 3, 4, 5]:
+        generated = small_d_keys(bits)
+        amount = bench("wiener, {} keys, d ~ 2**{} * N**(1/4)".format(keys, bits), broken, wiener, generated)
+        print("    broken: {}/{}".format(amount, keys))
+        for processes in [1, None]:
+            amount = bench("wiener_extended(bits={}), {} keys, processes={}".format(max(bits, 1), keys, processes),
+                           broken, wiener_extended, generated, bits=max(bits, 1), processes=processes)
+            print("    broken: {}/{}".format(amount, keys))
+
+
+def bench_small_e_msg(texts=4, times=10**5):
+    print("\nBench: small_e_msg")
+    key = RSAKey.import_key("private_key_1024_small_e.pem")
+    plaintexts = [gmpy2.iroot(random.randint(times // 2, times) * key.n, key.e)[0] for _ in range(texts)]
+    ciphertexts = [key.encrypt(plaintext) for plaintext in plaintexts]
+
+    def naive():
+        for ciphertext in ciphertexts:
+            for k in range(times):
+                if gmpy2.iroot(ciphertext + k * key.n, key.e)[1]:
+                    break
+
+    bench("iroot for every k, {} texts, k < {}".format(texts, times), naive)
+    for processes in [1, None]:
+        bench("small_e_msg, {} texts, k < {}, processes={}".format(texts, times, processes),
+              small_e_msg, key, ciphertexts, max_times=times, processes=processes)
+
+
+def bench_parity(texts=4, oracle_delay=0.0005):
+    print("\nBench: parity")
+    log.level = 'info'
+    for size in [1024, 2048]:
+        key = bench_key(size)
+        plaintexts = [random.randint(1, key.n - 1) for _ in range(texts)]
+
+        def oracle(ciphertext):
+            time.sleep(oracle_delay)
+            return key.decrypt(ciphertext) & 1
+
+        for concurrency in [1, texts]:
+            key_public = key.publickey()
+            for plaintext in plaintexts:
+                key_public.add_ciphertext(key.encrypt(plaintext))
+            bench("parity, {} texts, concurrency={}, {}s oracle ({} bits)".format(
+                texts, concurrency, oracle_delay, size), parity, oracle, key_public, concurrency=concurrency)
+
+
+def bench_lsb(texts=4):
+    print("\nBench: lsb, half")
+    for size in [1024, 2048]:
+        key = bench_key(size)
+        plaintexts = [random.randint(1, key.n - 1) for _ in range(texts)]
+        for bits in [1, 4, 8, 16]:
+            calls = [0]
+
+            def oracle(ciphertext):
+                calls[0] += 1
+                return key.decrypt(ciphertext) & ((1 << bits) - 1)
+
+            key_public = key.publickey()
+            for plaintext in plaintexts:
+                key_public.add_ciphertext(key.encrypt(plaintext))
+            bench("lsb, bits={}, {} texts ({} bits)".format(bits, texts, size),
+                  lsb, oracle, key_public, bits=bits)
+            print("    oracle calls: {}".format(calls[0]))
+
+        key_public = key.publickey()
+        for plaintext in plaintexts:
+            key_public.add_ciphertext(key.encrypt(plaintext))
+        bench("half, {} texts ({} bits)".format(texts, size),
+              half, lambda ciphertext: int(key.decrypt(ciphertext) > key.n // 2), key_public)
+
+
+def bench_bleichenbacher_pkcs15(texts=5, oracle_delay=0.0001):
+    print("\nBench: bleichenbacher_pkcs15")
+    key = bench_key(1024)
+    k = (key.n.bit_length() + 7) // 8
+    plaintexts = [b2i(add_rsa_encryption_padding(random_str(16), size=key.size)) for _ in range(texts)]
+    for concurrency, trimmers in [(1, False), (1, True), (4, True)]:
+        calls = [0]
+
+        def oracle(ciphertext):
+            calls[0] += 1
+            time.sleep(oracle_delay)
+            return key.decrypt(ciphertext) >> (8 * (k - 2)) == 2
+
+        key_public = key.publickey()
+        for plaintext in plaintexts:
+            key_public.add_ciphertext(key.encrypt(plaintext))
+        bench("bleichenbacher_pkcs15, {} texts, concurrency={}, trimmers={}".format(texts, concurrency, trimmers),
+              bleichenbacher_pkcs15, oracle, key_public, concurrency=concurrency, trimmers=trimmers)
+        print("    oracle calls: {} (mean {})".format(calls[0], calls[0] // texts))
+
+
+def bench_manger(texts=5, oracle_delay=0.0001):
+    print("\nBench: manger")
+    for size in [1024, 2048]:
+        key = bench_key(size)
+        k = (key.n.bit_length() + 7) // 8
+        ciphertexts = [b2i(PKCS1_OAEP.new(key.pyrsa_key).encrypt(random_str(16))) for _ in range(texts)]
+        for concurrency in [1, 4]:
+            calls = [0]
+
+            def oracle(ciphertext):
+                calls[0] += 1
+                time.sleep(oracle_delay)
+                return key.decrypt(ciphertext) >> (8 * (k - 1)) == 0
+
+            key_public = key.publickey()
+            for ciphertext in ciphertexts:
+                key_public.add_ciphertext(ciphertext)
+            bench("manger, {} texts, concurrency={}, {}s oracle ({} bits)".format(
+                texts, concurrency, oracle_delay, size), manger, oracle, key_public, concurrency=concurrency)
+            print("    oracle calls: {} (mean {}, log2(n) = {})".format(calls[0], calls[0] // texts,
+                                                                      key.n.bit_length()))
+
+
+def bench_keystore(amount=2000):
+    print("\nBench: KeyStore.ingest")
+    path = tempfile.mkdtemp()
+    try:
+        os.mkdir(os.path.join(path, 'keys'))
+        for i in range(amount):
+            key = RSAKey(random.getrandbits(2048) | 1 | (1 << 2047), 65537)
+            with open(os.path.join(path, 'keys', '{}.pem'.format(i)), 'w') as f:
+                f.write(key.export_key('PEM' if i % 2 else 'DER'))
+
+        bench("RSAKey.import_key of {} files".format(amount),
+              lambda: [RSAKey.import_key(os.path.join(path, 'keys', name))
+                       for name in os.listdir(os.path.join(path, 'keys'))])
+        for processes in [1, None]:
+            store = bench("KeyStore.ingest of {} files, processes={}".format(amount, processes), KeyStore.ingest,
+                          [os.path.join(path, 'keys')], os.path.join(path, 'store{}'.format(processes)),
+                          processes=processes)
+        bench("KeyStore.moduli of {} keys".format(amount), lambda: list(store.moduli()))
+        bench("KeyStore.key for {} keys".format(amount), lambda: list(store))
+        print("    store size: {} bytes".format(sum(os.path.getsize(os.path.join(store.path, name))
+                                                  for name in os.listdir(store.path))))
+        store.close()
+    finally:
+        shutil.rmtree(path)
+
+
+def bench_franklin_reiter(size=2048, max_e=65537):
+    print("\nBench: franklin_reiter ({} bits)".format(size))
+    for e in [3, 17, 257, 4097, 65537]:
+        if e > max_e:
+            break
+        key = bench_key(size, e=e).publickey()
+        msg = random.randint(1, key.n - 1)
+        a, b = random.randint(1, key.n - 1), random.randint(0, key.n - 1)
+        ciphertexts = [key.encrypt(msg), key.encrypt((a * msg + b) % key.n)]
+        f = poly([-ciphertexts[0]] + [0] * (e - 1) + [1], key.n)
+        g = poly_pow([b, a], e, key.n)
+        g = poly_sub(g, [ciphertexts[1]], key.n)
+
+        def euclid():
+            x, y = f, g
+            while y:
+                x, y = y, poly_divmod(x, y, key.n)[1]
+
+        if e <= 257:
+            bench("euclid gcd, e={}".format(e), euclid)
+        bench("franklin_reiter (half-gcd), e={}".format(e), franklin_reiter, key, (a, b), ciphertexts)
+
+
+def bench_blinding(texts=64, oracle_delay=0.01):
+    print("\nBench: blinding ({} texts, {}s oracle)".format(texts, oracle_delay))
+    log.level = 'success'
+    key = bench_key(2048)
+    ciphertexts = [key.encrypt(random.randint(1, key.n - 1)) for _ in range(texts)]
+
+    def oracle(ciphertext):
+        time.sleep(oracle_delay)
+        return key.decrypt(ciphertext)
+
+    def batch_oracle(ciphertexts):
+        time.sleep(oracle_delay)
+        return key.decrypt_many(ciphertexts)
+
+    for concurrency in [1, 8, texts]:
+        key_public = key.publickey()
+        key_public.texts.add_many(ciphertexts=ciphertexts)
+        bench("blinding, concurrency={}".format(concurrency), blinding, key_public, decryption_oracle=oracle,
+              concurrency=concurrency)
+    key_public = key.publickey()
+    key_public.texts.add_many(ciphertexts=ciphertexts)
+    bench("blinding, batch oracle", blinding, key_public, decryption_oracle=batch_oracle, batch_oracle=True)
+    log.level = 'info'
+
+
+def bench_bleichenbacher_signature_forgery(texts=100):
+    print("\nBench: bleichenbacher_signature_forgery, garbage in the middle ({} texts)".format(texts))
+    for size, e in [(1024, 3), (4096, 3), (4096, 5)]:
+        key = bench_key(size, e=e).publickey()
+        for _ in range(texts):
+            key.add_plaintext(random.getrandbits(256))
+        signatures = bench("bleichenbacher_signature_forgery, {} bits, e={}".format(size, e),
+                           bleichenbacher_signature_forgery, key, garbage='middle')
+        print("{:<50} {:>10}".format("  forged", len(signatures)))
+
+
+def run():
+    log.level = 'info'
+    bench_keyfactory()
+    bench_encrypt_decrypt()
+    bench_key_creation()
+    bench_texts()
+    bench_faulty_scan()
+    bench_wiener()
+    bench_small_e_msg()
+    bench_franklin_reiter()
+    bench_blinding()
+    bench_bleichenbacher_signature_forgery()
+    bench_parity()
+    bench_lsb()
+    bench_bleichenbacher_pkcs15()
+    bench_manger()
+    bench_keystore()
+
+
+if __name__ == "__main__":
+    run()
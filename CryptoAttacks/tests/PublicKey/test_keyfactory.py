@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+
+from CryptoAttacks.PublicKey.keyfactory import *
+from CryptoAttacks.PublicKey.rsa import common_primes, wiener
+from CryptoAttacks.PublicKey.scanner import check_fermat
+from CryptoAttacks.Math import *
+from CryptoAttacks.Utils import *
+
+
+def cached_files(path):
+    return sorted(name for _, _, names in os.walk(path) for name in names)
+
+
+def test_generate_keys():
+    print("Test: generate_keys")
+    path = tempfile.mkdtemp()
+    try:
+        keys = generate_keys('standard', 1024, amount=3, seed=1, cache=path, processes=1)
+        assert len(cached_files(path)) == 3
+        for key in keys:
+            assert key.n.bit_length() == 1024 and key.e == 65537 and key.primes == [key.p, key.q]
+            assert key.decrypt(key.encrypt(12345)) == 12345
+
+        # deterministic, the same keys with and without cache and process pool
+        assert [key.n for key in generate_keys('standard', 1024, amount=3, seed=1, processes=1)] == \
+            [key.n for key in keys]
+        assert [key.n for key in generate_keys('standard', 1024, amount=4, seed=1, cache=path, processes=2)][:3] == \
+            [key.n for key in keys]
+        assert len(cached_files(path)) == 4
+        assert generate_keys('standard', 1024, seed=2, cache=path)[0].n != keys[0].n
+
+        # corrupted entries are generated again
+        for name in cached_files(path):
+            with open(os.path.join(path, name[:2], name), 'w') as f:
+                f.write('{"n": "1", "primes": ["2"]}')
+        assert [key.n for key in generate_keys('standard', 1024, amount=3, seed=1, cache=path)] == \
+            [key.n for key in keys]
+    finally:
+        shutil.rmtree(path)
+
+    try:
+        generate_keys('no such profile')
+        assert False
+    except Exception:
+        pass
+
+
+def test_profiles():
+    print("Test: keyfactory profiles")
+    assert generate_keys('small_e', 1024)[0].e == 3
+    assert generate_keys('small_e', 1024, e=17)[0].e == 17
+
+    key = generate_keys('small_d', 1024)[0]
+    assert key.d.bit_length() <= 1024 // 4 - 8
+    assert wiener(key.publickey()).d == key.d
+
+    key = generate_keys('close_primes', 1024)[0]
+    assert check_fermat(key.publickey()) == {'p': key.primes[0], 'q': key.primes[1]}
+
+    keys = generate_keys('shared_primes', 1024, amount=3)
+    assert len(set(key.n for key in keys)) == 3
+    assert len(common_primes([key.publickey() for key in keys])) == 3
+
+    for amount in [3, 4]:
+        key = generate_keys('multi_prime', 2048, primes=amount)[0]
+        assert len(key.primes) == amount and key.n.bit_length() == 2048
+        assert key.decrypt(key.encrypt(12345)) == 12345
+
+
+def run():
+    log.level = 'info'
+
+    test_generate_keys()
+    test_profiles()
+
+
+if __name__ == "__main__":
+    run()
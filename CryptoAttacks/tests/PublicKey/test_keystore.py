@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+
+from past.builtins import long
+
+from Crypto.PublicKey import RSA as PyRSA
+
+from CryptoAttacks.PublicKey.keystore import *
+from CryptoAttacks.Utils import *
+
+
+def make_keys(path):
+    """Write keys in all supported formats to path
+
+    Returns:
+        dict: identifier: (n, e)
+    """
+    expected = {}
+    keys = [PyRSA.generate(1024) for _ in range(3)] + [PyRSA.construct((PyRSA.generate(1024).n, long(3)))]
+    files = [
+        ('public.pem', keys[0].publickey().exportKey('PEM')),
+        ('private_pkcs1.pem', keys[1].exportKey('PEM', pkcs=1)),
+        ('private_pkcs8.key', keys[2].exportKey('PEM', pkcs=8)),
+        ('public.der', keys[3].exportKey('DER')),
+        ('private.der', keys[1].exportKey('DER')),
+        ('nested/public.pem', "\n\n" + keys[3].exportKey('PEM') + "\n"),
+    ]
+    for name, data in files:
+        key = PyRSA.importKey(data.strip())
+        expected[os.path.join(path, name)] = (key.n, key.e)
+
+    ssh_lines = [keys[0].publickey().exportKey('OpenSSH'), keys[3].exportKey('OpenSSH') + ' user@host']
+    files.append(('authorized_keys.pub', '\n'.join(ssh_lines) + '\n'))
+    for key_no, line in enumerate(ssh_lines):
+        key = PyRSA.importKey(line)
+        expected['{}:{}'.format(os.path.join(path, 'authorized_keys.pub'), key_no)] = (key.n, key.e)
+
+    files.append(('encrypted.pem', keys[0].exportKey('PEM', passphrase='secret')))
+    files.append(('broken.der', '0\x82\x01\x22\x30'))
+    files.append(('notes.txt', 'not a key'))
+
+    os.mkdir(os.path.join(path, 'nested'))
+    for name, data in files:
+        with open(os.path.join(path, name), 'wb') as f:
+            f.write(data)
+    return expected
+
+
+def test_parse_keys():
+    print("\nTest: parse_keys")
+    key = PyRSA.generate(1024)
+    for data in [key.exportKey('PEM', pkcs=1), key.exportKey('PEM', pkcs=8), key.exportKey('DER'),
+                 key.publickey().exportKey('PEM'), key.publickey().exportKey('DER'),
+                 key.publickey().exportKey('OpenSSH')]:
+        assert parse_keys(data) == [(i2b(key.n), i2b(key.e))]
+
+    key2 = PyRSA.generate(1024)
+    bundle = key.publickey().exportKey('PEM') + '\n' + key2.exportKey('PEM', pkcs=8) + '\n'
+    assert parse_keys(bundle) == [(i2b(key.n), i2b(key.e)), (i2b(key2.n), i2b(key2.e))]
+
+
+def test_keystore():
+    path = tempfile.mkdtemp()
+    try:
+        os.mkdir(os.path.join(path, 'keys'))
+        expected = make_keys(os.path.join(path, 'keys'))
+
+        for processes in [1, 2]:
+            print("\nTest: KeyStore.ingest(processes={})".format(processes))
+            store_path = os.path.join(path, 'store{}'.format(processes))
+            store = KeyStore.ingest([os.path.join(path, 'keys')], store_path, processes=processes, chunk_size=3)
+            assert len(store) == len(expected)
+            assert dict((store.identifier(i), (store.n(i), store.e(i))) for i in range(len(store))) == expected
+            assert list(store.moduli()) == [store.n(i) for i in range(len(store))]
+            key = store[-1]
+            assert (key.n, key.e) == expected[key.identifier]
+            assert [key.identifier for key in store] == [store.identifier(i) for i in range(len(store))]
+            store.close()
+
+        print("\nTest: KeyStore reopen and extend")
+        store = KeyStore(os.path.join(path, 'store1'))
+        identifiers = [store.identifier(i) for i in range(len(store))]
+        store.extend([('extra', 2**1023 + 1, 65537), ('extra2', i2b(12345), i2b(3))])
+        store.close()
+        store = KeyStore(os.path.join(path, 'store1'))
+        assert len(store) == len(expected) + 2
+        assert [store.identifier(i) for i in range(len(expected))] == identifiers
+        assert (store.n(-2), store.e(-2), store.identifier(-2)) == (2**1023 + 1, 65537, 'extra')
+        assert (store.n(-1), store.e(-1)) == (12345, 3)
+        store.close()
+
+        store = KeyStore(os.path.join(path, 'empty'))
+        assert len(store) == 0 and list(store) == []
+    finally:
+        shutil.rmtree(path)
+
+
+def run():
+    log.level = 'info'
+
+    test_parse_keys()
+    test_keystore()
+
+if __name__ == "__main__":
+    run()
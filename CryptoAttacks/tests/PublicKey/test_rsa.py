@@ -3,16 +3,27 @@
 from __future__ import print_function
 from builtins import range, int, pow
 
+import atexit
 import os
+import pickle
+import shutil
 import subprocess
+import tempfile
 from random import randint
 
+from Crypto.Cipher import PKCS1_OAEP
+
+from CryptoAttacks.PublicKey.keyfactory import generate_keys
 from CryptoAttacks.PublicKey.rsa import *
 from CryptoAttacks.Utils import *
 from CryptoAttacks.Math import *
 
 from rsa_oracles import *
 
+# generated keys are reused by tests in this module only
+key_cache = tempfile.mkdtemp()
+atexit.register(shutil.rmtree, key_cache, True)
+
 
 def test_RSAKey():
     print("\nTest: RSAKey")
@@ -30,6 +41,120 @@ def test_RSAKey():
         tmp = random_bytes(randint(1, key.size//8-10))
         assert key.decrypt(key.encrypt(tmp)) == b2i(tmp)
 
+    texts = [randint(1, key.n - 1) for _ in range(10)] + [2, 3, 2]
+    ciphertexts = key.encrypt_many(texts)
+    assert ciphertexts == [pow(text, key.e, key.n) for text in texts]
+    assert ciphertexts == [key.encrypt(text) for text in texts]
+    assert key.decrypt_many(ciphertexts) == texts
+
+    assert key.size == 2048 and RSAKey(2**1024).size == 1032 and RSAKey(2**1024 - 1).size == 1024
+    assert key.pyrsa_key.n == key.n and key.pyrsa_key.has_private()
+    key_public = key.publickey()
+    assert not key_public.has_private() and not key_public.pyrsa_key.has_private()
+    assert pickle.loads(pickle.dumps(key, 2)).decrypt(ciphertexts[0]) == texts[0]
+
+    print("\nTest: RSAKey texts copy-on-write")
+    key.add_text_pair(ciphertexts[0], texts[0])
+    key.add_ciphertext(ciphertexts[1])
+    key_copy, key_public = key.copy(), key.publickey()
+    assert key_copy.texts == key_public.texts == key.texts
+    key_copy.add_plaintext(texts[1], position=1)
+    key_public.add_ciphertext(ciphertexts[2])
+    key_public.texts[0]['plain'] = 1
+    assert key.texts == [{'cipher': ciphertexts[0], 'plain': texts[0]}, {'cipher': ciphertexts[1]}]
+    assert key_copy.texts[1] == {'cipher': ciphertexts[1], 'plain': texts[1]} and len(key_copy.texts) == 2
+    assert len(key_public.texts) == 3 and key_public.texts[0]['plain'] == 1
+    key.clear_texts()
+
+
+def test_multi_prime():
+    print("\nTest: multi-prime RSAKey")
+    primes = sorted(random_prime(1024) for _ in range(4))
+    n = int(product(primes))
+    key = RSAKey.construct(n, 0x10001, primes=primes)
+    assert key.primes == primes and key.p == primes[0] and key.p * key.q == n
+    texts = [randint(1, n - 1) for _ in range(10)]
+    ciphertexts = key.encrypt_many(texts)
+    assert [key.decrypt(ciphertext) for ciphertext in ciphertexts] == texts
+    assert key.decrypt_many(ciphertexts) == texts
+    assert pickle.loads(pickle.dumps(key, 2)).decrypt_many(ciphertexts) == texts
+    assert key.publickey().primes is None and key.copy().primes == primes
+
+    assert factors_from_d(n, key.e, key.d) == primes
+    key2 = RSAKey(n, key.e, d=key.d)
+    assert key2.primes == primes and key2.decrypt(ciphertexts[0]) == texts[0]
+    assert factors_from_d(key2.p * key2.q, key.e, key.d) == primes
+    try:
+        RSAKey.construct(n + 2, primes=primes)
+        assert False
+    except Exception:
+        pass
+
+    # three primes, each shared by two keys
+    shared = [random_prime(256) for _ in range(6)]
+    keys = [RSAKey(int(shared[0] * shared[1] * shared[2])), RSAKey(int(shared[0] * shared[3] * shared[4])),
+            RSAKey(int(shared[1] * shared[3] * shared[5]))]
+    priv_keys = common_primes(keys)
+    assert [priv_key.n for priv_key in priv_keys] == [key.n for key in keys]
+    assert all(len(priv_key.primes) == 3 for priv_key in priv_keys)
+
+    p, q, r = random_prime(40), random_prime(40), random_prime(700)
+    priv_keys = ecm_factor([RSAKey(int(p * q * r))], B1=2000, curves=200, processes=1)
+    assert len(priv_keys) == 1 and priv_keys[0].primes == sorted([p, q, r])
+
+
+def test_TextStore():
+    print("\nTest: TextStore")
+    texts = TextStore([{'cipher': 5}, {'plain': 3}, {'cipher': 7, 'plain': 1}, {}])
+    assert len(texts) == 4
+    assert texts.indexes(cipher=True, plain=False) == [0]
+    assert texts.indexes(cipher=False, plain=True) == [1]
+    assert texts.indexes(cipher=False, plain=False) == [3]
+    assert texts.indexes() == [0, 1, 2, 3]
+
+    texts[0]['plain'] = 9
+    del texts[2]['cipher']
+    texts.set_cipher(-1, 11)
+    assert texts == [{'cipher': 5, 'plain': 9}, {'plain': 3}, {'plain': 1}, {'cipher': 11}]
+    assert 'cipher' not in texts[1] and texts[1].get('cipher') is None and texts.cipher(1) is None
+
+    texts.add_many(list(range(100, 120)))
+    texts.add_many(plaintexts=[1, None])
+    assert texts.add(ciphertext=2, plaintext=4) == len(texts) - 1 == 26
+    assert texts.indexes(cipher=True, plain=False) == [3] + list(range(4, 24))
+    assert texts.indexes(cipher=False, plain=True) == [1, 2, 24]
+    assert texts.export([0, 25, 26]) == ([5, None, 2], [9, None, 4])
+    assert pickle.loads(pickle.dumps(texts, 2)) == texts and texts.copy() == texts
+
+    key = RSAKey(101 * 103, texts=[{'cipher': 5}])
+    key.texts.append({'cipher': 6, 'plain': 7})
+    assert isinstance(key.texts, TextStore) and key.texts.to_dicts() == [{'cipher': 5}, {'cipher': 6, 'plain': 7}]
+    key.texts = [{'plain': 1}]
+    assert get_mutable_texts(key, None) == [] and key.texts.indexes(plain=True) == [0]
+
+    # list of dicts idioms
+    texts = TextStore([{'cipher': 5}, {'plain': 3}, {'cipher': 7, 'plain': 1}])
+    copied = texts[:]
+    assert isinstance(copied, TextStore) and copied == texts
+    copied.set_plain(0, 4)
+    assert texts.plain(0) is None
+    assert texts[0:1] == [{'cipher': 5}] and texts[1:] == [{'plain': 3}, {'cipher': 7, 'plain': 1}]
+    assert texts[::-2] == [{'cipher': 7, 'plain': 1}, {'cipher': 5}] and texts[5:] == []
+
+    texts[0] = {'plain': 8}
+    texts[-1] = {'cipher': 2}
+    assert texts == [{'plain': 8}, {'plain': 3}, {'cipher': 2}]
+    assert texts.indexes(cipher=True) == [2] and texts.indexes(plain=True) == [0, 1]
+    try:
+        texts[3] = {'cipher': 1}
+        assert False
+    except IndexError:
+        pass
+
+    texts.extend([{'cipher': 5}, {'cipher': 6, 'plain': 9}])
+    assert texts[3:] == [{'cipher': 5}, {'cipher': 6, 'plain': 9}]
+    assert texts.cipher(3) == 5 and texts.indexes(cipher=True, plain=False) == [2, 3]
+
 
 def test_small_e_msg():
     key = RSAKey.import_key("private_key_1024_small_e.pem")
@@ -52,6 +177,16 @@ def test_small_e_msg():
         assert recovered_plaintext[0] == plaintext
         key.clear_texts()
 
+    for processes in [1, 2]:
+        print("\nTest: small_e_msg(processes={}), plaintext**e exceeds modulus many times".format(processes))
+        plaintexts = [int(gmpy2.iroot(randint(10**5, 3 * 10**5) * key.n, key.e)[0]) for _ in range(3)]
+        for plaintext in plaintexts:
+            key.add_ciphertext(key.encrypt(plaintext))
+        key.add_ciphertext(randint(1, key.n - 1))
+        recovered_plaintext = small_e_msg(key, max_times=4 * 10**5, processes=processes)
+        assert recovered_plaintext == plaintexts
+        key.clear_texts()
+
 
 def signing_oracle(plaintext):
     global key_to_oracle
@@ -95,6 +230,53 @@ def test_blinding():
 
     key_to_oracle = None
 
+    print("\nTest: blinding, many texts, batch and concurrent oracles")
+    queries = []
+
+    def batch_oracle(values):
+        queries.append(values)
+        return key.decrypt_many(values)
+
+    def concurrent_oracle(value):
+        queries.append([value])
+        return key.decrypt(value)
+
+    plaintexts = [randint(1, 2**64) for _ in range(20)]
+    for plaintext in plaintexts:
+        key.add_ciphertext(key.encrypt(plaintext))
+    key.add_plaintext(plaintexts[0])
+    assert blinding(key, decryption_oracle=batch_oracle, batch_oracle=True) == dict(enumerate(plaintexts))
+    assert len(queries) == 1 and len(queries[0]) == 20
+    # blinds are from whole range, not small numbers
+    assert all(value.bit_length() > key.n.bit_length() - 32 for value in queries[0])
+
+    assert blinding(key, signing_oracle=concurrent_oracle, concurrency=8) == {20: key.decrypt(plaintexts[0])}
+    key.clear_texts()
+    for plaintext in plaintexts:
+        key.add_plaintext(plaintext)
+    signatures = blinding(key, signing_oracle=concurrent_oracle, concurrency=8)
+    assert [signatures[i] for i in range(20)] == key.decrypt_many(plaintexts)
+    key.clear_texts()
+
+    # results as generator, zero is valid result
+    plaintexts[3] = 0
+    for plaintext in plaintexts:
+        key.add_ciphertext(key.encrypt(plaintext))
+    assert blinding(key, decryption_oracle=lambda values: (key.decrypt(value) for value in values),
+                    batch_oracle=True) == dict(enumerate(plaintexts))
+    key.clear_texts()
+
+    key.add_ciphertext(key.encrypt(plaintexts[0]))
+    for broken_oracle in [lambda values: None, lambda values: [], lambda values: (None for _ in values)]:
+        try:
+            blinding(key, decryption_oracle=broken_oracle, batch_oracle=True)
+            assert False
+        except AssertionError:
+            raise
+        except Exception:
+            pass
+    key.clear_texts()
+
 
 def test_wiener(tries=10):
     print("\nTest: wiener")
@@ -117,6 +299,23 @@ def test_wiener(tries=10):
             print("Not recovered")
 
 
+def test_wiener_extended(tries=5):
+    print("\nTest: wiener_extended")
+    n_size = 1024
+    for processes in [1, 2]:
+        for _ in range(tries):
+            p, q = [gmpy2.next_prime(random.getrandbits(n_size // 2) | (1 << (n_size // 2 - 1))) for _ in range(2)]
+            phi = (p - 1) * (q - 1)
+            root = gmpy2.iroot(p * q, 4)[0]
+            while True:
+                d = random.randint(root << 3, root << 4)
+                if gmpy2.gcd(phi, d) == 1:
+                    break
+            key = RSAKey.construct(int(p * q), int(invmod(d, phi)))
+            key_recovered = wiener_extended(key.publickey(), bits=4, processes=processes)
+            assert key_recovered and key_recovered.d == d
+
+
 def test_common_primes():
     print("\nTest: common primes")
     keys_path = "./common_prime/"
@@ -129,6 +328,40 @@ def test_common_primes():
     assert len(priv_keys) != 0
 
 
+def test_ecm_factor():
+    print("\nTest: ecm_factor")
+    keys = []
+    for _ in range(3):
+        p = random_prime(40)
+        q = random_prime(700)
+        keys.append(RSAKey.construct(int(p*q), 0x10001, p=int(p)))
+    keys.append(RSAKey.construct(int(keys[0].p * random_prime(700)), 0x10001))
+    priv_keys = ecm_factor([key.publickey() for key in keys], B1=2000, curves=200)
+    assert len(priv_keys) == len(keys)
+    for key, priv_key in zip(keys[:-1], priv_keys):
+        assert priv_key.d == key.d
+
+    priv_keys = ecm_factor([keys[0].publickey()], B1=2000, curves=200, processes=1)
+    assert len(priv_keys) == 1 and priv_keys[0].d == keys[0].d
+
+
+def test_siqs_factor():
+    print("\nTest: siqs_factor")
+    for n_size in [100, 128]:
+        p = random_prime(n_size // 2)
+        q = random_prime(n_size // 2)
+        key = RSAKey.construct(int(p*q), 0x10001, p=int(p))
+        key_recovered = siqs_factor(key.publickey(), processes=1)
+        assert key_recovered and key_recovered.d == key.d
+
+    key_recovered = siqs_factor(key.publickey(), processes=2)
+    assert key_recovered and key_recovered.d == key.d
+
+    # too small factor base and sieve, gives up instead of sieving forever
+    assert siqs_factor(key.publickey(), factor_base_size=100, sieve_size=64, processes=1,
+                       max_polynomials=100) is None
+
+
 def test_hastad():
     print("\nTest: hastad")
     for n_size in [1024, 2048, 4096]:
@@ -136,8 +369,8 @@ def test_hastad():
             print("Test: e={}".format(e))
             msg = randint(1000, 1 << (n_size-25))
             keys = []
-            for _ in range(e):
-                tmp = RSAKey.generate(n_size, e=e).publickey()
+            for tmp in generate_keys('small_e', n_size, amount=e, e=e, seed='hastad', cache=key_cache):
+                tmp = tmp.publickey()
                 ciphertext = tmp.encrypt(msg)
                 tmp.texts.append({'cipher': ciphertext})
                 keys.append(tmp)
@@ -145,6 +378,74 @@ def test_hastad():
             assert msg_recovered == msg
 
 
+def small_key(n_size, e):
+    while True:
+        p, q = random_prime(n_size // 2), random_prime(n_size // 2)
+        phi = (p - 1) * (q - 1)
+        if p != q and gmpy2.gcd(e, phi) == 1:
+            return RSAKey.construct(int(p * q), e, int(invmod(e, phi)))
+
+
+def test_hastad_linear():
+    print("\nTest: hastad_linear")
+    e = 3
+    keys = [small_key(512, e).publickey() for _ in range(3)]
+    paddings = [(randint(2, 2**64), randint(0, 2**64)) for _ in keys]
+    msg = random.getrandbits(300)
+    for key, (a, b) in zip(keys, paddings):
+        key.texts.append({'cipher': key.encrypt((a * msg + b) % key.n)})
+    assert hastad_linear(keys, paddings, message_bits=300) == msg
+    for key, (a, b) in zip(keys, paddings):
+        assert key.texts[0]['plain'] == (a * msg + b) % key.n
+
+    # padding shares factor with modulus
+    private = small_key(512, e)
+    a = random_prime(64) * factors_from_d(private.n, private.e, private.d)[0]
+    msg = random.getrandbits(150)
+    ciphertext = private.encrypt(a * msg + 7)
+    assert hastad_linear([private.publickey()], [(a, 7)], ciphertexts=[ciphertext]) == msg
+
+
+def test_stereotyped_message():
+    print("\nTest: stereotyped_message")
+    key = small_key(512, 3).publickey()
+    known = random.getrandbits(500)
+    known &= ~(((1 << 100) - 1) << 200)
+    secrets = [random.getrandbits(100) for _ in range(2)]
+    for secret in secrets:
+        key.add_ciphertext(key.encrypt(known + (secret << 200)))
+    key.add_ciphertext(key.encrypt(random.getrandbits(500)))
+    recovered = stereotyped_message(key, known, 100, 200)
+    assert recovered == [known + (secret << 200) for secret in secrets]
+    assert key.texts[0]['plain'] == recovered[0] and key.texts[2].get('plain') is None
+
+
+def test_partial_key_exposure():
+    print("\nTest: partial_key_exposure")
+    for e in [3, 5]:
+        key = small_key(512, e)
+        bits = 180
+        key_recovered = partial_key_exposure(key.publickey(), key.d % 2**bits, bits)
+        assert key_recovered and key_recovered.d == key.d
+    assert partial_key_exposure(key.publickey(), (key.d + 1) % 2**bits, bits) is None
+
+
+def test_franklin_reiter():
+    print("\nTest: franklin_reiter")
+    for e in [3, 17, 1025]:
+        key = generate_keys('small_e', 1024, e=e, seed='franklin_reiter', cache=key_cache)[0].publickey()
+        msg = randint(1, key.n - 1)
+        a, b = randint(1, key.n - 1), randint(0, key.n - 1)
+        key.add_ciphertext(key.encrypt(msg))
+        key.add_ciphertext(key.encrypt((a * msg + b) % key.n))
+        assert franklin_reiter(key, (a, b)) == msg
+        assert key.texts[0]['plain'] == msg and key.texts[1]['plain'] == (a * msg + b) % key.n
+
+        ciphertexts = [key.encrypt(msg + 1), key.encrypt(msg + 1 + b)]
+        assert franklin_reiter(key, (1, b), ciphertexts=ciphertexts) == msg + 1
+        assert franklin_reiter(key, (1, b + 1), ciphertexts=ciphertexts) is None
+
+
 def test_faulty():
     print("\nTest: faulty")
     for _ in range(5):
@@ -175,6 +476,31 @@ def test_faulty():
         assert key_recovered is None
 
 
+def test_faulty_scan():
+    print("\nTest: faulty_scan")
+    key = RSAKey.generate(1024)
+    messages = [randint(2, key.n - 1) for _ in range(50)]
+    signatures = key.decrypt_many(messages)
+
+    key_recovered, stats = faulty_scan(key.publickey(), zip(signatures, messages), batch_size=8)
+    assert key_recovered is None and stats['signatures'] == stats['valid'] == len(messages)
+
+    # one signature broken modulo p and one modulo q in the same batch, product of the batch is 0 modulo n
+    for no, prime in [(20, key.q), (22, key.p)]:
+        signatures[no] = crt([signatures[no] % prime, randint(1, key.n // prime)], [prime, key.n // prime]) % key.n
+    path = tempfile.mktemp()
+    try:
+        with open(path, 'w') as f:
+            f.write("# signature message\n")
+            for signature, message in zip(signatures, messages):
+                f.write("{:x} {:x}\n".format(signature, message))
+        key_recovered, stats = faulty_scan(key.publickey(), path, batch_size=8)
+    finally:
+        os.remove(path)
+    assert key_recovered and key_recovered.d == key.d
+    assert stats['faulty'] in [20, 22] and stats['signatures'] == 24 and stats['valid'] == 22
+
+
 def test_parity():
     key = RSAKey.import_key("private_key_1024.pem")
 
@@ -193,6 +519,96 @@ def test_parity():
     assert msgs_recovered[1] == b2i(plaintext2)
     key.texts = []
 
+    print("\nTest: parity(concurrency=4)")
+    plaintexts = [randint(1, key.n - 1) for _ in range(6)]
+    key_public = key.publickey()
+    for plaintext in plaintexts:
+        key_public.add_ciphertext(key.encrypt(plaintext))
+    msgs_recovered = parity(lambda ciphertext: key.decrypt(ciphertext) & 1, key_public, concurrency=4)
+    assert [msgs_recovered[i] for i in range(len(plaintexts))] == plaintexts
+
+
+def test_lsb_half():
+    key = RSAKey.import_key("private_key_1024.pem")
+    for bits in [1, 5, 8, 16]:
+        print("\nTest: lsb(bits={})".format(bits))
+        plaintexts = [randint(1, key.n - 1) for _ in range(3)] + [1, key.n - 1]
+        key_public = key.publickey()
+        for plaintext in plaintexts:
+            key_public.add_ciphertext(key.encrypt(plaintext))
+        msgs_recovered = lsb(lambda ciphertext: key.decrypt(ciphertext) & ((1 << bits) - 1), key_public,
+                             bits=bits, concurrency=2)
+        assert [msgs_recovered[i] for i in range(len(plaintexts))] == plaintexts
+
+    print("\nTest: half")
+    plaintexts = [randint(1, key.n - 1) for _ in range(3)] + [1, key.n // 2, key.n // 2 + 1, key.n - 1]
+    key_public = key.publickey()
+    for plaintext in plaintexts:
+        key_public.add_ciphertext(key.encrypt(plaintext))
+    msgs_recovered = half(lambda ciphertext: int(key.decrypt(ciphertext) > key.n // 2), key_public)
+    assert [msgs_recovered[i] for i in range(len(plaintexts))] == plaintexts
+
+
+def test_bleichenbacher_pkcs15():
+    key = RSAKey.import_key("private_key_1024.pem")
+    k = (key.n.bit_length() + 7) // 8
+    queries = {'count': 0}
+
+    def pkcs15_oracle(ciphertext):
+        queries['count'] += 1
+        return key.decrypt(ciphertext) >> (8 * (k - 2)) == 2
+
+    for concurrency, trimmers in [(1, True), (4, True), (1, False)]:
+        print("\nTest: bleichenbacher_pkcs15(concurrency={}, trimmers={})".format(concurrency, trimmers))
+        plaintext = b2i(add_rsa_encryption_padding("Some plaintext " + random_str(10), size=key.size))
+        key_public = key.publickey()
+        key_public.add_ciphertext(key.encrypt(plaintext))
+        queries['count'] = 0
+        msgs_recovered = bleichenbacher_pkcs15(pkcs15_oracle, key_public, concurrency=concurrency, trimmers=trimmers)
+        assert msgs_recovered[0] == plaintext
+        assert key_public.texts[0]['plain'] == plaintext
+        print("Oracle queries: {}".format(queries['count']))
+
+    print("\nTest: bleichenbacher_pkcs15, not conforming ciphertext")
+    plaintext = randint(2, key.n - 1)
+    key_public = key.publickey()
+    key_public.add_ciphertext(key.encrypt(plaintext))
+    msgs_recovered = bleichenbacher_pkcs15(pkcs15_oracle, key_public, concurrency=4)
+    assert msgs_recovered[0] == plaintext
+
+
+def test_manger():
+    key = RSAKey.import_key("private_key_1024.pem")
+    k = (key.n.bit_length() + 7) // 8
+    queries = {'count': 0}
+
+    def oaep_oracle(ciphertext):
+        queries['count'] += 1
+        return key.decrypt(ciphertext) >> (8 * (k - 1)) == 0
+
+    for concurrency in [1, 4]:
+        print("\nTest: manger(concurrency={})".format(concurrency))
+        ciphertexts = [b2i(PKCS1_OAEP.new(key.pyrsa_key).encrypt("Some plaintext " + random_str(10)))
+                       for _ in range(3)]
+        key_public = key.publickey()
+        for ciphertext in ciphertexts:
+            key_public.add_ciphertext(ciphertext)
+        queries['count'] = 0
+        msgs_recovered = manger(oaep_oracle, key_public, concurrency=concurrency)
+        for text_no, ciphertext in enumerate(ciphertexts):
+            assert msgs_recovered[text_no] == key.decrypt(ciphertext)
+            assert key_public.texts[text_no]['plain'] == key.decrypt(ciphertext)
+        print("Oracle queries: {}".format(queries['count']))
+        assert queries['count'] < len(ciphertexts) * (key.size + 300)
+
+    print("\nTest: manger, first byte not zero")
+    plaintexts = [key.n - 1, randint(1 << (8 * (k - 1)), key.n - 1)]
+    key_public = key.publickey()
+    for plaintext in plaintexts:
+        key_public.add_ciphertext(key.encrypt(plaintext))
+    msgs_recovered = manger(oaep_oracle, key_public)
+    assert [msgs_recovered[i] for i in range(len(plaintexts))] == plaintexts
+
 
 def test_bleichenbacher_signature_forgery():
     key = RSAKey.import_key("private_key_1024_small_e.pem")
@@ -240,18 +656,58 @@ def test_bleichenbacher_signature_forgery():
             assert verify_signature2 == 'True'
         key.texts = []
 
+    print("\nTest bleichenbacher_signature_forgery(key, garbage='middle'), 4096 bits, e=3 and e=5")
+    for e in [3, 5]:
+        key = generate_keys('small_e', 4096, e=e, seed='bleichenbacher', cache=key_cache)[0]
+        forged = 0
+        for _ in range(20):
+            message = "Some plaintext " + random_str(10)
+            key.texts = []
+            key.add_plaintext(b2i(message))
+            forged_signatures = bleichenbacher_signature_forgery(key, garbage='middle', hash_function='sha256')
+            if 0 in forged_signatures:
+                plaintext = i2b(pow(forged_signatures[0], e, key.n), size=4096)
+                separator = plaintext.index('\x00', 2)
+                assert plaintext[:3] == '\x00\x01\xff' and separator > 2
+                assert plaintext[separator + 20:] == hashlib.sha256(message).digest()
+                forged += 1
+        # only suffixes with number of trailing zero bits not divisible by e can't be forged
+        assert forged >= 5
+
+    key = RSAKey(key.n, 4, texts=[{'plain': b2i("Some plaintext")}])
+    try:
+        bleichenbacher_signature_forgery(key, garbage='middle', hash_function='sha256')
+        assert False
+    except AssertionError:
+        raise
+    except Exception:
+        pass
+
 
 def run():
     log.level = 'info'
 
     test_RSAKey()
+    test_multi_prime()
+    test_TextStore()
     test_blinding()
     test_small_e_msg()
     test_faulty()
+    test_faulty_scan()
     test_hastad()
+    test_hastad_linear()
+    test_stereotyped_message()
+    test_partial_key_exposure()
+    test_franklin_reiter()
     test_common_primes()
+    test_ecm_factor()
+    test_siqs_factor()
     test_wiener()
+    test_wiener_extended()
     test_parity()
+    test_lsb_half()
+    test_bleichenbacher_pkcs15()
+    test_manger()
     test_bleichenbacher_signature_forgery()
 
 if __name__ == "__main__":
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+
+from __future__ import print_function
+
+import json
+import os
+import shutil
+import tempfile
+
+from CryptoAttacks.PublicKey.rsa import RSAKey
+from CryptoAttacks.PublicKey.scanner import *
+from CryptoAttacks.Math import *
+from CryptoAttacks.Utils import *
+
+
+def make_corpus(path):
+    """Write keys with known weaknesses to path
+
+    Returns:
+        dict: file name: set of checks that should find it
+    """
+    expected = {}
+
+    def write(name, n, e, checks, format='PEM'):
+        with open(os.path.join(path, name), 'wb') as f:
+            f.write(RSAKey(n, e).export_key(format))
+        expected[name] = set(checks)
+
+    for i in range(3):
+        p, q = random_prime(64), random_prime(64)
+        write('good{}.pem'.format(i), p * q, 65537, [])
+
+    write('good.der', random_prime(64) * random_prime(64), 65537, [], format='DER')
+    p = random_prime(64)
+    write('common1.pem', p * random_prime(64), 65537, ['common_primes'])
+    write('common2.der', p * random_prime(64), 65537, ['common_primes'], format='DER')
+
+    write('small_e.pem', random_prime(64) * random_prime(64), 3, ['small_e'])
+    p, q = random_prime(64), random_prime(64)
+    write('duplicate1.pem', p * q, 65537, ['duplicate_modulus', 'common_primes'])
+    write('duplicate2.pem', p * q, 65537, ['duplicate_modulus', 'common_primes'])
+
+    p, q = random_prime(64), random_prime(64)
+    d = 1337
+    while gcd(d, (p - 1) * (q - 1)) != 1:
+        d += 2
+    write('wiener.pem', p * q, invmod(d, (p - 1) * (q - 1)), ['wiener'])
+
+    write('small_factor.pem', 65521 * random_prime(120), 65537, ['small_factor'])
+    p = random_prime(64)
+    write('fermat.pem', p * gmpy2.next_prime(p), 65537, ['fermat'])
+
+    # many keys in one file, identifiers are path:index
+    for name, format, separator in [('authorized_keys.pub', 'OpenSSH', '\n'), ('bundle.pem', 'PEM', '\n')]:
+        keys = [RSAKey(random_prime(64) * random_prime(64), 65537), RSAKey(random_prime(64) * random_prime(64), 3)]
+        with open(os.path.join(path, name), 'wb') as f:
+            f.write(separator.join(key.export_key(format) for key in keys) + '\n')
+        expected['{}:0'.format(name)] = set()
+        expected['{}:1'.format(name)] = set(['small_e'])
+
+    with open(os.path.join(path, 'broken.pem'), 'w') as f:
+        f.write('-----BEGIN PUBLIC KEY-----\nnot a key\n-----END PUBLIC KEY-----\n')
+    with open(os.path.join(path, 'notes.txt'), 'w') as f:
+        f.write('not scanned')
+    return expected
+
+
+def test_scan():
+    path = tempfile.mkdtemp()
+    try:
+        os.mkdir(os.path.join(path, 'keys'))
+        expected = make_corpus(os.path.join(path, 'keys'))
+        lonely_prime = random_prime(64)
+        with open(os.path.join(path, 'keys', 'lonely.pem'), 'wb') as f:
+            f.write(RSAKey(lonely_prime * random_prime(64), 65537).export_key('PEM'))
+        expected['lonely.pem'] = set()
+        cache = os.path.join(path, 'cache.jsonl')
+        output = os.path.join(path, 'findings.jsonl')
+
+        for processes in [1, 2]:
+            print("\nTest: scan(processes={})".format(processes))
+            findings, stats = scan([os.path.join(path, 'keys')], processes=processes)
+            found = dict((name, set()) for name in expected)
+            for finding in findings:
+                found[os.path.basename(finding['path'])].add(finding['check'])
+            assert found == expected
+            assert stats['files']['keys'] == len(expected)
+            assert stats['files']['errors'] == 1
+
+        print("\nTest: scan with cache and output")
+        findings, stats = scan([os.path.join(path, 'keys')], checks=['wiener', 'common_primes'],
+                               output=output, cache=cache)
+        assert stats['wiener']['keys'] == len(expected) and stats['wiener']['cached'] == 0
+        assert stats['common_primes']['keys'] == len(expected)
+
+        findings_cached, stats = scan([os.path.join(path, 'keys')], checks=['wiener', 'common_primes'],
+                                      output=output, cache=cache)
+        assert stats['wiener']['keys'] == 0 and stats['wiener']['cached'] == len(expected)
+        assert stats['common_primes']['keys'] == 0
+        assert sorted(findings_cached) == sorted(findings)
+
+        with open(output) as f:
+            lines = [json.loads(line) for line in f]
+        assert lines[:-1] == json.loads(json.dumps(findings_cached))
+        assert 'wiener' in lines[-1]['stats']
+
+        # only new moduli are checked, also against moduli from earlier scans
+        shutil.copy(os.path.join(path, 'keys', 'good0.pem'), os.path.join(path, 'keys', 'good0_copy.pem'))
+        with open(os.path.join(path, 'keys', 'partner.pem'), 'wb') as f:
+            f.write(RSAKey(lonely_prime * random_prime(64), 65537).export_key('PEM'))
+        findings, stats = scan([os.path.join(path, 'keys')], checks=['wiener', 'common_primes'], cache=cache)
+        assert stats['wiener']['keys'] == 1
+        assert stats['common_primes']['keys'] == 1 and stats['common_primes']['cached'] == len(expected) + 1
+        common = dict((os.path.basename(finding['path']), finding['result']) for finding in findings
+                      if finding['check'] == 'common_primes')
+        assert set(common) == set(['common1.pem', 'common2.der', 'duplicate1.pem', 'duplicate2.pem', 'good0.pem',
+                                   'good0_copy.pem', 'lonely.pem', 'partner.pem'])
+        assert common['lonely.pem'] == common['partner.pem'] == {'factor': lonely_prime}
+        assert sorted(findings) == sorted(scan([os.path.join(path, 'keys')], checks=['wiener', 'common_primes'])[0])
+    finally:
+        shutil.rmtree(path)
+
+
+def run():
+    log.level = 'info'
+
+    test_scan()
+
+if __name__ == "__main__":
+    run()
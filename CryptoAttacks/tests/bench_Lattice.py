@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+from __future__ import print_function
+
+import sys
+import time
+
+from CryptoAttacks.Lattice import *
+from CryptoAttacks.Utils import *
+
+
+def bench(name, function, *args, **kwargs):
+    start = time.time()
+    result = function(*args, **kwargs)
+    print("{:<50} {:>10.4f}s".format(name, time.time() - start))
+    return result
+
+
+def knapsack_basis(n, bits):
+    return [[1 if i == j else 0 for j in range(n)] + [random.getrandbits(bits)] for i in range(n)]
+
+
+def qary_basis(n, bits):
+    """Basis of {x: x = A*y mod q} for random n/2 x n/2 matrix A"""
+    q = random.getrandbits(bits) | 1
+    half = n // 2
+    basis = [[1 if i == j else 0 for j in range(half)] + [random.randint(0, q - 1) for _ in range(n - half)]
+             for i in range(half)]
+    return basis + [[0] * half + [q if i == j else 0 for j in range(n - half)] for i in range(n - half)]
+
+
+def bench_lll(max_dimension=100, bits=256):
+    print("\nBench: lll ({} bits)".format(bits))
+    for n in [10, 20, 40, 60, 80, 100, 120, 160]:
+        if n > max_dimension:
+            break
+        basis = knapsack_basis(n, bits)
+        bench("lll, knapsack, dimension {}".format(n), lll, basis)
+        if n <= 20:
+            bench("lll exact, knapsack, dimension {}".format(n), lll, basis, method='exact')
+        if n <= 40:
+            bench("lll, q-ary, dimension {}".format(n), lll, qary_basis(n, bits))
+
+
+def bench_bkz(dimension=40, bits=128):
+    print("\nBench: bkz ({} bits, dimension {})".format(bits, dimension))
+    basis = lll(knapsack_basis(dimension, bits))
+    for block_size in [2, 5, 10, 15, 20]:
+        reduced = bench("bkz, block size {}".format(block_size), bkz, basis, block_size)
+        print("{:<50} {:>10}".format("  ||b_0||**2", sum(x * x for x in reduced[0])))
+
+
+def bench_small_roots(bits=512):
+    print("\nBench: small_roots ({} bits modulus, e=3 stereotyped message)".format(bits))
+    n = random_prime(bits // 2) * random_prime(bits // 2)
+    for unknown_bits in [60, 100, 130, 150]:
+        root = random.getrandbits(unknown_bits)
+        f = [0, random.randint(0, n - 1), random.randint(0, n - 1), 1]
+        f[0] = -(f[1] * root + f[2] * root**2 + root**3) % n
+        bench("small_roots, {} unknown bits".format(unknown_bits), small_roots, f, n, 2**unknown_bits)
+
+
+def run():
+    max_dimension = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    bench_lll(max_dimension)
+    bench_bkz()
+    bench_small_roots()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+from __future__ import print_function
+
+import sys
+import time
+
+from CryptoAttacks.Math import *
+from CryptoAttacks.Math import _gcd_python, _egcd_python
+from CryptoAttacks.Utils import *
+
+
+def bench(name, function, *args, **kwargs):
+    start = time.time()
+    result = function(*args, **kwargs)
+    print("{:<50} {:>10.4f}s".format(name, time.time() - start))
+    return result
+
+
+def bench_primes(max_bound=10**9):
+    print("\nBench: primes")
+    bound = 10**6
+    while bound <= max_bound:
+        bench("primes_up_to({:.0e})".format(bound), primes_up_to, bound)
+        bench("sum(1 for _ in iter_primes(stop={:.0e}))".format(bound),
+              lambda: sum(1 for _ in iter_primes(stop=bound)))
+        bound *= 10
+
+
+def bench_random_prime(tries=20):
+    print("\nBench: random_prime")
+
+    def plain_random_prime(bits):
+        p = random.getrandbits(bits) | 1
+        while not gmpy2.is_bpsw_prp(p):
+            p = random.getrandbits(bits) | 1
+        return p
+
+    for bits in [512, 1024, 2048]:
+        bench("{}x random.getrandbits+is_bpsw_prp ({} bits)".format(tries, bits),
+              lambda: [plain_random_prime(bits) for _ in range(tries)])
+        bench("{}x random_prime({})".format(tries, bits), lambda: [random_prime(bits) for _ in range(tries)])
+
+
+def bench_gcd(amount=1000):
+    print("\nBench: gcd, egcd, invmod, lcm")
+    for size in [2048, 4096]:
+        pairs = [(random.getrandbits(size), random_prime(size)) for _ in range(amount // 100)] * 100
+        bench("{}x euclid gcd ({} bits)".format(amount, size), lambda: [_gcd_python(a, b) for a, b in pairs])
+        bench("{}x gcd ({} bits)".format(amount, size), lambda: [gcd(a, b) for a, b in pairs])
+        bench("{}x euclid egcd ({} bits)".format(amount, size), lambda: [_egcd_python(a, b) for a, b in pairs])
+        bench("{}x egcd ({} bits)".format(amount, size), lambda: [egcd(a, b) for a, b in pairs])
+        bench("{}x euclid invmod ({} bits)".format(amount, size),
+              lambda: [_egcd_python(a, b)[1] % b for a, b in pairs])
+        bench("{}x invmod ({} bits)".format(amount, size), lambda: [invmod(a, b) for a, b in pairs])
+        bench("{}x euclid lcm ({} bits)".format(amount, size),
+              lambda: [a // _gcd_python(a, b) * b for a, b in pairs])
+        bench("{}x lcm ({} bits)".format(amount, size), lambda: [lcm(a, b) for a, b in pairs])
+
+
+def bench_batch_invmod(amount=10000):
+    print("\nBench: batch_invmod")
+    for size in [1024, 2048, 4096]:
+        n = random_prime(size // 2) * random_prime(size // 2)
+        values = [random.randint(1, n - 1) for _ in range(amount)]
+        bench("{}x invmod ({} bits)".format(amount, size), lambda: [invmod(value, n) for value in values])
+        bench("batch_invmod of {} values ({} bits)".format(amount, size), batch_invmod, values, n)
+
+
+def bench_crt(solutions=20):
+    print("\nBench: crt")
+
+    def naive_crt(a, n):
+        prod = reduce(lambda x, y: x * y, n)
+        sum_crt = 0
+        for n_i, a_i in zip(n, a):
+            p = prod // n_i
+            sum_crt += a_i * invmod(p, n_i) * p
+        return sum_crt % prod
+
+    for amount in [10, 100, 1000, 4000]:
+        modules = [random_prime(64) for _ in range(amount)]
+        remainders = [[random.randint(0, module - 1) for module in modules] for _ in range(solutions)]
+        if amount <= 1000:
+            bench("{}x naive crt, {} modules".format(solutions, amount),
+                  lambda: [naive_crt(a, modules) for a in remainders])
+        bench("{}x crt, {} modules".format(solutions, amount), lambda: [crt(a, modules) for a in remainders])
+        solver = bench("CRT({} modules)".format(amount), CRT, modules)
+        bench("{}x CRT.solve, {} modules".format(solutions, amount),
+              lambda: [solver.solve(a) for a in remainders])
+
+
+def run():
+    max_bound = int(float(sys.argv[1])) if len(sys.argv) > 1 else 10**8
+    bench_primes(max_bound)
+    bench_random_prime()
+    bench_gcd()
+    bench_batch_invmod()
+    bench_crt()
+
+
+if __name__ == "__main__":
+    run()
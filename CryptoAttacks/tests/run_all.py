@@ -6,7 +6,13 @@ import subprocess
 from Block import test_ecb
 from Block import test_cbc
 from PublicKey import test_rsa
+from PublicKey import test_scanner
+from PublicKey import test_keystore
+from PublicKey import test_keyfactory
 import test_Hash
+import test_Math
+import test_Lattice
+import test_Polynomial
 
 SAGE_TESTS = True
 
@@ -29,6 +35,12 @@ print("TEST PUBLIC KEY")
 os.chdir('../PublicKey/')
 print("Test rsa")
 test_rsa.run()
+print("\nTest scanner")
+test_scanner.run()
+print("\nTest keystore")
+test_keystore.run()
+print("\nTest keyfactory")
+test_keyfactory.run()
 print("\n")
 # --------------------------------------------------
 
@@ -38,6 +50,21 @@ test_Hash.run()
 print("\n")
 # --------------------------------------------------
 
+print("TEST MATH")
+test_Math.run()
+print("\n")
+# --------------------------------------------------
+
+print("TEST LATTICE")
+test_Lattice.run()
+print("\n")
+# --------------------------------------------------
+
+print("TEST POLYNOMIAL")
+test_Polynomial.run()
+print("\n")
+# --------------------------------------------------
+
 print("TEST ELLIPTIC CURVES")
 os.chdir('./EllipticCurve')
 if SAGE_TESTS:
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+from __future__ import print_function
+
+import warnings
+
+from CryptoAttacks.Lattice import *
+from CryptoAttacks.Lattice import _integral_gso
+from CryptoAttacks.Math import *
+from CryptoAttacks.Utils import *
+
+
+def knapsack_basis(weights, total, scale):
+    n = len(weights)
+    basis = [[2 if i == j else 0 for j in range(n)] + [scale * weights[i]] for i in range(n)]
+    return basis + [[1] * n + [scale * total]]
+
+
+def polynomial_product(f, g):
+    result = [0] * (len(f) + len(g) - 1)
+    for i, a in enumerate(f):
+        for j, b in enumerate(g):
+            result[i + j] += a * b
+    return result
+
+
+def test_lll():
+    print("Test: lll")
+    assert lll([[1, 1, 1], [-1, 0, 2], [3, 5, 6]]) == [[0, 1, 0], [1, 0, 1], [-1, 0, 2]]
+    assert lll([]) == [] and lll([[5, 3]]) == [[5, 3]]
+
+    for n, bits in [(10, 64), (20, 256), (8, 2000)]:
+        basis = [[1 if i == j else 0 for j in range(n)] + [random.getrandbits(bits)] for i in range(n)]
+        reduced = {}
+        for method in ['float', 'exact', None]:
+            if method == 'float' and bits > 1000:
+                continue
+            reduced[method] = lll(basis, method=method)
+            assert is_lll_reduced(reduced[method], 0.98, 0.51)
+            assert _integral_gso(reduced[method])[0][-1] == _integral_gso(basis)[0][-1]
+        assert not is_lll_reduced(basis, 0.98, 0.51)
+        assert is_lll_reduced(reduced['exact'])
+
+    # rows of very different magnitudes, like in Coppersmith method
+    n = random_prime(512) * random_prime(512)
+    x = 2**200
+    f = [random.randint(0, n - 1) for _ in range(3)] + [1]
+    basis = [[n**2 * x**i if i == j else 0 for j in range(7)] for i in range(3)]
+    basis += [[0] * j + [n * c * x**(i + j) for i, c in enumerate(f)] + [0] * (3 - j) for j in range(3)]
+    basis += [[c * x**i for i, c in enumerate(polynomial_product(f, f))]]
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        reduced = lll(basis, method='float')
+    # no numpy overflow warnings
+    assert not [warning for warning in caught if issubclass(warning.category, RuntimeWarning)]
+    assert is_lll_reduced(reduced, 0.98, 0.51)
+    assert _integral_gso(reduced)[0][-1] == _integral_gso(basis)[0][-1]
+
+    try:
+        lll([[1, 2], [2, 4]], method='exact')
+        assert False
+    except ValueError:
+        pass
+
+
+def test_subset_sum():
+    print("Test: lll, bkz on low density subset sum")
+    n = 24
+    weights = [random.getrandbits(96) for _ in range(n)]
+    secret = [random.randint(0, 1) for _ in range(n)]
+    basis = knapsack_basis(weights, sum(w * s for w, s in zip(weights, secret)), 2**48)
+    solution = [2 * s - 1 for s in secret] + [0]
+    for reduced in [lll(basis), bkz(basis, block_size=8)]:
+        assert solution in reduced or [-x for x in solution] in reduced
+
+
+def test_bkz():
+    print("Test: bkz")
+    n = 30
+    basis = [[1 if i == j else 0 for j in range(n)] + [random.getrandbits(80)] for i in range(n)]
+    reduced_lll = lll(basis)
+    reduced_bkz = bkz(basis, block_size=10)
+    assert is_lll_reduced(reduced_bkz, 0.98, 0.51)
+    assert _integral_gso(reduced_bkz)[0][-1] == _integral_gso(basis)[0][-1]
+    assert sum(x * x for x in reduced_bkz[0]) <= sum(x * x for x in reduced_lll[0])
+    assert bkz([[1, 1, 1], [-1, 0, 2], [3, 5, 6]], block_size=3)[0] == [0, 1, 0]
+
+
+def test_small_roots():
+    print("Test: small_roots")
+    n = random_prime(256) * random_prime(256)
+    root = random.getrandbits(100)
+    f = [0, random.randint(0, n - 1), random.randint(0, n - 1), 1]
+    f[0] = -(f[1] * root + f[2] * root**2 + root**3) % n
+    assert root in small_roots(f, n, bound=2**100)
+    assert root in small_roots([c * 5 for c in f], n, epsilon=0.1)
+
+    # factoring with known high bits of p
+    p, q = random_prime(256), random_prime(256)
+    p_high = p - p % 2**90
+    assert small_roots([p_high, 1], p * q, bound=2**90, beta=0.49) == [p - p_high]
+    assert small_roots([p_high + 2**91, 1], p * q, bound=2**90, beta=0.49) == []
+
+    m, t, bound = coppersmith_parameters(2**512, 3, bound=2**100)
+    assert (m, t, bound) == (3, 0, 2**100)
+    try:
+        small_roots(f, n, bound=2**200)
+        assert False
+    except Exception:
+        pass
+
+
+def run():
+    log.level = 'info'
+    test_lll()
+    test_subset_sum()
+    test_bkz()
+    test_small_roots()
+
+
+if __name__ == "__main__":
+    run()
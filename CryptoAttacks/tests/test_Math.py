@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+
+from __future__ import print_function
+
+import itertools
+from fractions import Fraction
+
+from CryptoAttacks.Math import *
+from CryptoAttacks.Math import _gcd_python
+from CryptoAttacks.Utils import *
+
+
+def test_primes():
+    print("Test: primes_up_to, iter_primes")
+    reference = [x for x in range(2, 20000) if gmpy2.is_prime(x)]
+    assert list(primes_up_to(19999)) == reference
+    assert list(primes_up_to(19999, segment_size=7)) == reference
+    assert list(itertools.islice(iter_primes(segment_size=13), 1000)) == reference[:1000]
+    for start, stop in [(0, 0), (0, 3), (2, 3), (3, 4), (100, 1000), (1000, 19999)]:
+        assert list(iter_primes(start, stop, segment_size=5)) == [x for x in reference if start <= x < stop]
+    assert len(primes_up_to(10**6)) == 78498
+
+
+def test_random_prime():
+    print("Test: prime_candidates, random_prime")
+    start = 10**30 + 1
+    candidates = prime_candidates(start, 5000)
+    assert len(candidates) < 1000
+    assert [x for x in candidates if gmpy2.is_prime(x)] == \
+        [x for x in range(start, start + 10000, 2) if gmpy2.is_prime(x)]
+
+    for size in [8, 30, 256, 1024]:
+        prime = random_prime(size)
+        assert gmpy2.is_prime(prime) and prime < 2**size
+
+
+def test_gcd():
+    print("Test: gcd, lcm, egcd, invmod")
+    assert gcd(12, 18, 30) == 6
+    assert lcm(4, 6, 10) == 60
+    assert gcd(Fraction(1, 2), Fraction(1, 3)) == Fraction(1, 6)
+    for size in [64, 2048, 4096]:
+        a, b, c = [random.getrandbits(size) | 1 for _ in range(3)]
+        g = random.getrandbits(size // 2)
+        assert gcd(a*g, b*g) == _gcd_python(a*g, b*g)
+        assert lcm(a, b) == a*b // _gcd_python(a, b)
+        assert lcm(a*g, b*g) * gcd(a*g, b*g) == a*b*g*g
+
+        d, s, t = egcd(a, b)
+        assert d == _gcd_python(a, b) and s*a + t*b == d
+        d, s, t, u = egcd(a*g, b*g, c)
+        assert d == gcd(a*g, b*g, c) and s*a*g + t*b*g + u*c == d
+
+        p = random_prime(size)
+        assert (invmod(a, p) * a) % p == 1
+    try:
+        invmod(6, 9)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_batch_invmod():
+    print("Test: batch_invmod")
+    assert batch_invmod([], 7) == []
+    for size in [64, 2048]:
+        n = random_prime(size) * random_prime(size)
+        values = [random.randint(1, n - 1) for _ in range(100)]
+        assert batch_invmod(values, n) == [invmod(value, n) for value in values]
+    assert batch_invmod([5], 7) == [3]
+    try:
+        batch_invmod([2, 3, 4], 9)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_root_mod_power_of_two():
+    print("Test: root_mod_power_of_two")
+    for e in [3, 5, 17, 65537]:
+        for bits in [1, 2, 3, 64, 1000, 4096]:
+            value = random.getrandbits(bits) | 1
+            x = root_mod_power_of_two(value, e, bits)
+            assert 0 < x < 2**bits and pow(x, e, 2**bits) == value % 2**bits
+    try:
+        root_mod_power_of_two(4, 3, 10)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_crt():
+    print("Test: crt, CRT")
+    for amount in [1, 2, 3, 7, 100, 2000]:
+        modules = [random_prime(64) for _ in range(amount)]
+        x = random.randint(0, product(modules) - 1)
+        assert crt([x % module for module in modules], modules) == x
+
+    modules = [p**3 for p in primes_up_to(10000)[1:]]
+    solver = CRT(modules)
+    for _ in range(5):
+        x = random.randint(0, solver.product - 1)
+        assert solver.solve([x % module for module in modules]) == x
+
+    try:
+        crt([1, 2], [6, 9])
+        assert False
+    except ValueError:
+        pass
+
+
+def run():
+    log.level = 'info'
+    test_primes()
+    test_random_prime()
+    test_gcd()
+    test_batch_invmod()
+    test_root_mod_power_of_two()
+    test_crt()
+
+
+if __name__ == "__main__":
+    run()
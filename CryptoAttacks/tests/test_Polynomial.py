@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+from __future__ import print_function
+
+from CryptoAttacks.Polynomial import *
+from CryptoAttacks.Polynomial import _half_gcd, _apply
+from CryptoAttacks.Utils import *
+
+
+def random_poly(degree, n):
+    return poly([random.randint(0, n - 1) for _ in range(degree)] + [random.randint(1, n - 1)], n)
+
+
+def schoolbook_mul(f, g, n):
+    result = [0] * (len(f) + len(g) - 1)
+    for i, a in enumerate(f):
+        for j, b in enumerate(g):
+            result[i + j] += a * b
+    return poly(result, n)
+
+
+def euclid_gcd(f, g, n):
+    while g:
+        f, g = g, poly_divmod(f, g, n)[1]
+    return poly_monic(f, n)
+
+
+def test_arithmetic():
+    print("Test: poly_mul, poly_divmod")
+    p = random_prime(128)
+    n = p * random_prime(128)
+    assert poly([n + 1, 2, n, 0, 2 * n], n) == [1, 2]
+    assert poly_mul([], [1, 2], n) == [] and poly_add([1, 2], [n - 1, n - 2], n) == []
+    for degree_f, degree_g in [(3, 5), (20, 30), (100, 17), (200, 200)]:
+        f, g = random_poly(degree_f, n), random_poly(degree_g, n)
+        assert poly_mul(f, g, n) == schoolbook_mul(f, g, n)
+        assert poly_mul(f, f, n) == schoolbook_mul(f, f, n)
+    assert poly_pow([1, 1], 5, n) == [1, 5, 10, 10, 5, 1]
+
+    for degree_f, degree_g in [(2, 5), (10, 3), (100, 3), (100, 50), (300, 100), (300, 20), (50, 50)]:
+        f, g = random_poly(degree_f, n), random_poly(degree_g, n)
+        quotient, remainder = poly_divmod(f, g, n)
+        assert poly_degree(remainder) < poly_degree(g)
+        assert poly_add(poly_mul(quotient, g, n), remainder, n) == f
+
+    f = random_poly(10, n)
+    assert poly_eval(f, 3, n) == sum(c * 3**i for i, c in enumerate(f)) % n
+    try:
+        poly_divmod(f, [1, p], n)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_gcd():
+    print("Test: poly_gcd")
+    n = random_prime(128) * random_prime(128)
+    for degree in [0, 1, 5, 70, 150, 300]:
+        common = random_poly(degree, n)
+        f, g = poly_mul(common, random_poly(200, n), n), poly_mul(common, random_poly(150, n), n)
+        assert poly_gcd(f, g, n) == euclid_gcd(f, g, n) == poly_monic(common, n)
+        assert poly_gcd(g, f, n) == poly_monic(common, n)
+    assert poly_gcd([], [], n) == [] and poly_gcd([], [2], n) == [1]
+
+    a, b = random_poly(400, n), random_poly(399, n)
+    matrix = _half_gcd(a, b, n)
+    c, d = _apply(matrix, [(a, b)], n)[0]
+    assert poly_degree(c) >= 200 > poly_degree(d)
+    assert poly_gcd(c, d, n) == euclid_gcd(a, b, n) == [1]
+
+
+def run():
+    log.level = 'info'
+    test_arithmetic()
+    test_gcd()
+
+
+if __name__ == "__main__":
+    run()
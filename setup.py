@@ -18,4 +18,5 @@ setup(name='CryptoAttacks',
         packages=find_packages(),
         zip_safe=False,
         cmdclass={'build_py': build_py},
-        install_requires=['future', 'pycrypto', 'gmpy2', 'BeautifulSoup', 'requests'])
+        install_requires=['future', 'pycrypto', 'gmpy2', 'BeautifulSoup', 'requests'],
+        extras_require={'numpy': ['numpy']})